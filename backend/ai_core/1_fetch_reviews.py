@@ -4,23 +4,24 @@
 # Hackathon Projesi - AI Destekli Yorum Analizi
 
 import requests
-import json
 import argparse
-import re
 import time
+import itertools
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
 from urllib.parse import urlparse, parse_qs
-from selenium import webdriver
-from selenium.webdriver.common.by import By
-from selenium.webdriver.support.ui import WebDriverWait
-from selenium.webdriver.support import expected_conditions as EC
-from selenium.webdriver.chrome.options import Options
-from selenium.webdriver.chrome.service import Service
-from webdriver_manager.chrome import ChromeDriverManager
-import bs4
-from bs4 import BeautifulSoup
 
 # Hepsiburada scraper modülünü import et
-from hepsiburada_scraper import fetch_reviews_hepsiburada
+from hepsiburada_scraper import iter_reviews_hepsiburada
+from http_client import build_session
+from http_cache import ResponseCache, get_response_cache
+from rate_control import (AdaptiveRateController, MAX_RETRIES, RETRY_STATUSES, THROTTLE_STATUSES,
+                          backoff_delay, parse_retry_after)
+from driver_pool import lease_driver
+from review_dedup import ReviewDeduplicator
+import review_db
+from artifact_store import product_key, set_latest, update_manifest
+from page_waits import install_wait_hooks, wait_for_change, polite_pause
 
 # TRENDYOL API YAKLAŞIMI
 # URL'den alınan product_slug ve merchant_id'yi kullanarak sayfa sayfa yorum çeker
@@ -36,6 +37,9 @@ HEADERS = {
     "Origin": "https://www.trendyol.com"
 }
 
+# API sayfalarını paralel çekerken kullanılacak en fazla worker sayısı
+API_MAX_WORKERS = 6
+
 def extract_product_info_from_url(url):
     """
     Trendyol URL'sinden ürün slug'ını ve merchant ID'yi güvenilir şekilde çıkarır.
@@ -70,393 +74,469 @@ def extract_product_info_from_url(url):
         print(f"URL ayrıştırma hatası: {e}")
         return None, None
 
-def fetch_reviews_api(product_slug, merchant_id, max_pages=10):
+def _fetch_api_page(session, product_slug, merchant_id, page, cache=None, controller=None, revalidate=False):
     """
-    Trendyol API kullanarak yorumları çeker (YENİ YÖNTEM)
-    Bu fonksiyon resmi API'yi kullanarak hızlı ve güvenilir veri çekimi yapar
+    Tek bir API sayfasını çeker ve ('productReviews' bölümü, sayfa durumu) döndürür.
+    cache verilirse taze kayıt doğrudan kullanılır, eski kayıt ETag/Last-Modified
+    ile yeniden doğrulanır. revalidate=True iken taze kayıt da yeniden doğrulanır (artımlı mod). 429/5xx ve network hatalarında Retry-After'a uyarak
+    üstel geri çekilme + jitter ile MAX_RETRIES kez tekrar denenir; istek hızı
+    controller (AIMD) tarafından ayarlanır. Başarısız sayfalarda veri None döner.
     """
+    state = {'attempts': 0, 'status': None, 'waited': 0.0, 'source': 'network', 'error': None}
+    cache_key = cache.make_key(product_slug, merchant_id, page) if cache else None
+    entry, fresh = cache.lookup(cache_key, revalidate) if cache else (None, False)
+    if fresh and not revalidate:
+        state['source'] = 'cache'
+        return entry['body']['result'].get('productReviews', {}), state
+
+    url = API_URL.format(product_slug=product_slug, merchantId=merchant_id, page=page)
+    print(f"API URL: {url}")
+
+    resp = None
+    for attempt in range(MAX_RETRIES + 1):
+        if controller:
+            controller.acquire()
+        state['attempts'] = attempt + 1
+        started = time.time()
+        try:
+            resp = session.get(url, headers=ResponseCache.conditional_headers(entry), timeout=30)
+        except requests.exceptions.RequestException as e:
+            state['error'] = str(e)
+            print(f"Network hatası sayfa {page} (deneme {attempt + 1}): {e}")
+            resp = None
+        else:
+            state['status'] = resp.status_code
+            if resp.status_code not in RETRY_STATUSES:
+                if controller:
+                    controller.on_success(time.time() - started)
+                break
+
+        # Geçici hata: bekle ve tekrar dene
+        if attempt == MAX_RETRIES:
+            break
+        retry_after = parse_retry_after(resp.headers.get('Retry-After')) if resp is not None else None
+        if controller and resp is not None and resp.status_code in THROTTLE_STATUSES:
+            controller.on_throttle(retry_after)
+        delay = backoff_delay(attempt, retry_after)
+        state['waited'] = round(state['waited'] + delay, 2)
+        print(f"Sayfa {page}: {state['status'] or 'network hatası'}, {delay:.1f} sn sonra tekrar denenecek.")
+        time.sleep(delay)
+
+    if resp is None:
+        return None, state
+
+    # Sunucu içeriğin değişmediğini bildirdiyse önbellekteki yanıtı kullan
+    if resp.status_code == 304 and entry:
+        cache.revalidated(cache_key, entry)
+        state['source'] = 'revalidated'
+        return entry['body']['result'].get('productReviews', {}), state
+
+    # HTTP durum kodunu kontrol et
+    if resp.status_code != 200:
+        print(f"Sayfa {page} çekilemedi: {resp.status_code}")
+        print(f"Response: {resp.text[:200]}")
+        return None, state
+
+    # JSON yanıtını parse et ve hata olup olmadığını kontrol et
+    try:
+        data = resp.json()
+    except ValueError as e:
+        state['error'] = f"Geçersiz JSON: {e}"
+        return None, state
+    if not data.get('isSuccess') or 'result' not in data:
+        state['error'] = str(data.get('error'))
+        print(f"API'den başarısız yanıt alındı: {data.get('error')}")
+        return None, state
+
+    if cache:
+        cache.store(cache_key, data, resp.headers)
+    return data['result'].get('productReviews', {}), state
+
+
+def _parse_api_reviews(review_data):
+    """API sayfasındaki yorumları ortak yorum formatına çevirir"""
     reviews = []
-    page = 0
-    total_pages = 1
-    
+    for review in review_data.get('content', []):
+        if review.get('comment'):  # Boş yorumları atla
+            reviews.append({
+                'id': review.get('id'),
+                'comment': review.get('comment'),
+                'rate': review.get('rate'),
+                'user': review.get('userFullName', 'Anonim'),
+                'date': review.get('commentDateISOtype'),
+                'source': 'api_v2' # Kaynağı yeni API olarak işaretle
+            })
+    return reviews
+
+
+def _iter_api_pages(session, product_slug, merchant_id, page_numbers, max_workers,
+                    cache=None, controller=None, page_states=None, revalidate=False):
+    """
+    Verilen sayfa numaralarını paralel çeker ve (sayfa, yorumlar) çiftlerini sayfa
+    sırasıyla üretir; çekilemeyen sayfalarda yorumlar None olur.
+    Aynı anda en fazla 2 * max_workers sayfa beklemede tutulur, tüketici durursa
+    (generator kapatılırsa) bekleyen istekler iptal edilir.
+    page_states verilirse her sayfanın tekrar deneme durumu buraya yazılır.
+    """
+    page_numbers = iter(page_numbers)
+    pending = deque()
+    with ThreadPoolExecutor(max_workers=max(1, max_workers)) as executor:
+        def submit_next():
+            page = next(page_numbers, None)
+            if page is not None:
+                pending.append((page, executor.submit(_fetch_api_page, session, product_slug, merchant_id,
+                                                      page, cache, controller, revalidate)))
+
+        for _ in range(2 * max(1, max_workers)):
+            submit_next()
+        try:
+            while pending:
+                page, future = pending.popleft()
+                try:
+                    review_data, state = future.result()
+                except Exception as e:
+                    print(f"Genel hata sayfa {page}: {e}")
+                    review_data, state = None, {'attempts': 0, 'status': None, 'error': str(e)}
+
+                if page_states is not None:
+                    page_states[page] = state
+                submit_next()
+                yield page, (_parse_api_reviews(review_data) if review_data is not None else None)
+        finally:
+            for _, future in pending:
+                future.cancel()
+
+
+def iter_reviews_api(product_slug, merchant_id, max_pages=10, max_workers=API_MAX_WORKERS, cursor=None,
+                     use_cache=True, stats=None):
+    """
+    Trendyol API kullanarak yorumları çeker (YENİ YÖNTEM) ve sayfa sırasıyla tek tek üretir.
+    Önce 0. sayfadan toplam sayfa sayısı okunur, kalan sayfalar tek bir
+    bağlantı havuzu üzerinden sınırlı sayıda worker ile paralel çekilir.
+
+    cursor verilirse (artımlı mod) cursor'a ulaşılan sayfadan sonra durulur.
+    API yorumları en yeniden eskiye sıraladığı için sadece cursor'dan yeni yorumlar üretilir.
+
+    use_cache=True iken sayfalar disk önbelleğinden (http_cache) okunur. Artımlı modda taze kayıtlar da
+    sunucuya sorularak (ETag/Last-Modified) doğrulanır; aksi halde TTL içindeki bir yenileme yeni yorumları
+    görmeden cursor'ı tamamlanmış sayar.
+    İstek hızı AIMD kontrolcüsü ile ayarlanır; geçici hatalar sayfa bazında tekrar denenir.
+
+    stats sözlüğü verilirse çekim bitince doldurulur:
+    {'total_pages': API'nin bildirdiği sayfa sayısı, 'fetched_pages': çekilen sayfa sayısı,
+     'cache': önbellek sayaçları, 'pages': {sayfa: {attempts, status, waited, source, error}},
+     'final_rate': çekim sonundaki istek/saniye,
+     'complete': cursor'dan (tam modda son sayfaya) kadar hiçbir sayfa eksik kalmadıysa True}
+    complete False ise cursor ilerletilmemelidir; aksi halde atlanan yorumlar bir daha çekilmez.
+    """
+    if stats is None:
+        stats = {}
+    stats.update({'total_pages': 0, 'fetched_pages': 0, 'cache': None, 'pages': {}, 'final_rate': None,
+                  'complete': False})
+
     # API isteği için merchantId gerekli
     if not merchant_id:
         print("API isteği için merchantId gerekli, bu adım atlanıyor.")
-        return []
+        return
 
-    print(f"API ile yorumlar çekiliyor: {product_slug} (Merchant: {merchant_id})")
-    
-    # Sayfa sayfa yorumları çek
-    while page < total_pages and page < max_pages:
-        try:
-            # Sayfa numarasını URL'ye ekle
-            url = API_URL.format(product_slug=product_slug, merchantId=merchant_id, page=page)
-            print(f"API URL: {url}")
-            
-            # HTTP session oluştur ve header'ları ayarla
-            session = requests.Session()
-            session.headers.update(HEADERS)
-            
-            # API'ye istek gönder
-            resp = session.get(url, timeout=30)
-            
-            # HTTP durum kodunu kontrol et
-            if resp.status_code != 200:
-                print(f"Sayfa {page} çekilemedi: {resp.status_code}")
-                print(f"Response: {resp.text[:200]}")
-                break
-                
-            # JSON yanıtını parse et
-            data = resp.json()
-            
-            # Gelen yanıtta hata olup olmadığını kontrol et
-            if not data.get('isSuccess') or 'result' not in data:
-                print(f"API'den başarısız yanıt alındı: {data.get('error')}")
-                break
+    mode = "artımlı" if cursor else "tam"
+    print(f"API ile yorumlar çekiliyor ({mode}): {product_slug} (Merchant: {merchant_id})")
 
-            # Yorum verilerini al
-            review_data = data['result'].get('productReviews', {})
-            
-            if page == 0:
-                # Toplam sayfa sayısını yanıttan al
-                total_pages = min(review_data.get('totalPages', 1), max_pages)
-                print(f"Toplam {total_pages} sayfa bulundu.")
-            
-            # Yorumları işle
-            for review in review_data.get('content', []):
-                if review.get('comment'):  # Boş yorumları atla
-                    reviews.append({
-                        'comment': review.get('comment'),
-                        'rate': review.get('rate'),
-                        'user': review.get('userFullName', 'Anonim'),
-                        'date': review.get('commentDateISOtype'),
-                        'source': 'api_v2' # Kaynağı yeni API olarak işaretle
-                    })
-                    
-            print(f"{page + 1}/{total_pages} sayfa çekildi. (Toplam {len(reviews)} yorum)")
-            page += 1
-            time.sleep(1)  # Rate limiting için bekle
-            
-        except requests.exceptions.RequestException as e:
-            print(f"Network hatası sayfa {page}: {e}")
-            break
+    session = build_session(HEADERS, pool_size=max_workers)
+    cache = get_response_cache() if use_cache else None
+    controller = AdaptiveRateController()
+    count = 0
+    total_pages = 0
+
+    try:
+        # 1. Adım: İlk sayfadan toplam sayfa sayısını öğren
+        try:
+            first_page, stats['pages'][0] = _fetch_api_page(session, product_slug, merchant_id, 0,
+                                                            cache, controller, revalidate=cursor is not None)
         except Exception as e:
-            print(f"Genel hata sayfa {page}: {e}")
-            break
-    
-    return reviews
+            print(f"Genel hata sayfa 0: {e}")
+            return
 
+        if first_page is None:
+            return
 
-def fetch_reviews_selenium(url, max_reviews=100):
-    """Selenium ile web scraping yaparak yorumları çeker (GÜÇLENDİRİLMİŞ YÖNTEM)"""
-    reviews = []
+        stats['total_pages'] = first_page.get('totalPages', 1)
+        total_pages = min(stats['total_pages'], max_pages)
+        print(f"Toplam {total_pages} sayfa bulundu.")
+
+        # 2. Adım: Sayfaları sırayla üret; kalan sayfalar arka planda paralel çekilir
+        pages = _iter_api_pages(session, product_slug, merchant_id, range(1, total_pages), max_workers,
+                                cache, controller, stats['pages'], revalidate=cursor is not None)
+        # missed: cursor sayfasından önce çekilemeyen sayfa var; reached: cursor sayfasına (veya son sayfaya) ulaşıldı
+        missed = False
+        reached = False
+        try:
+            for page, page_reviews in itertools.chain([(0, _parse_api_reviews(first_page))], pages):
+                if page_reviews is None:
+                    missed = True
+                    continue
+                stats['fetched_pages'] += 1
+                for review in page_reviews:
+                    if cursor is None or _is_newer_than_cursor(review, cursor):
+                        count += 1
+                        yield review
+                if cursor is not None and _contains_cursor(page_reviews, cursor):
+                    reached = True
+                    break
+            else:
+                # Tüm sayfalar gezildi. Tam modda max_pages sınırı sadece en eski yorumları dışarıda bırakır;
+                # artımlı modda cursor'a ulaşmadan sınıra gelindiyse arada kalan yeni yorumlar eksiktir
+                reached = cursor is None or total_pages >= stats['total_pages']
+            stats['complete'] = reached and not missed
+        finally:
+            pages.close()
+    finally:
+        session.close()
+        stats['final_rate'] = controller.snapshot()
+        retried = {page: state for page, state in stats['pages'].items() if state['attempts'] > 1}
+        print(f"API ile toplam {count} yorum çekildi ({stats['fetched_pages']}/{total_pages} sayfa).")
+        if retried:
+            print(f"Tekrar denenen sayfalar: {retried}")
+        if cache:
+            stats['cache'] = cache.report()
+            print(f"Önbellek: {stats['cache']}")
+
+
+def fetch_reviews_api(product_slug, merchant_id, max_pages=10, max_workers=API_MAX_WORKERS, cursor=None,
+                      use_cache=True):
+    """
+    iter_reviews_api'nin liste döndüren hali.
+    Dönüş: iter_reviews_api'nin stats alanları + {'reviews': [...]}
+    """
+    result = {}
+    result['reviews'] = list(iter_reviews_api(product_slug, merchant_id, max_pages, max_workers, cursor,
+                                              use_cache, stats=result))
+    return result
+
+
+# ARTIMLI ÇEKME (HIGH-WATER MARK)
+# Her ürün için en yeni yorumun tarihi/id'si ve sayfa sayısı veritabanında (review_db) saklanır.
+# Yenilemede sadece bu cursor'dan yeni sayfalar çekilir; yorumlar veritabanına UPSERT edilir.
+
+def _is_newer_than_cursor(review, cursor):
+    """
+    Yorum cursor'dan yeni mi? Tarihi olmayan yorumlar yeni kabul edilir.
+    Cursor ile aynı tarihli yorumlar da yeni sayılır (cursor yorumunun kendisi hariç); zaten kayıtlı olanlar
+    veritabanına UPSERT ile yazıldığı için tekrar eklenmez.
+    """
+    if review.get('id') is not None and review.get('id') == cursor.get('newest_id'):
+        return False
+    newest_date = cursor.get('newest_date')
+    if not newest_date or not review.get('date'):
+        return True
+    return review['date'] >= newest_date
+
+
+def _contains_cursor(reviews, cursor):
+    """Sayfada cursor'a eşit veya daha eski bir yorum varsa True döner"""
+    return any(not _is_newer_than_cursor(review, cursor) for review in reviews)
+
+
+# SELENIUM KART ÇIKARMA AYARLARI
+# Yorum kartlarını bulmak için sırayla denenen selector'lar
+REVIEW_CARD_SELECTORS = [
+    '[data-testid="review-card"]',
+    '.review-card',
+    '.r-card',
+    '[class*="review"]',
+    '[class*="comment"]',
+    '.comment-item',
+    '.review-item'
+]
+
+# Kart içinde yorum metnini bulmak için özel Trendyol selector'ları
+TRENDYOL_COMMENT_SELECTORS = [
+    '[data-testid="review-comment"]',
+    '.review-comment',
+    '.comment-text',
+    '.r-card-text',
+    '[class*="comment"]',
+    '[class*="review-text"]',
+    '.review-content',
+    '.comment-content',
+    '[data-testid="comment"]'
+]
+
+# Yorum metni olamayacak içerikler
+SKIP_WORDS = ['sağlık beyanı', 'fotoğraflı', 'tümü']
+GENERIC_SKIP_WORDS = SKIP_WORDS + [
+    'boutique', 'merchant', 'storefront', 'culture', 'logged-in',
+    'isbuyer', 'channel', 'socialproof', 'abtesting'
+]
+
+# Tarayıcı içinde çalışan kart çıkarma betiği
+# Her scroll adımında tek bir execute_script ile daha önce işlenmemiş tüm kartları
+# {comment, rate, user, date} listesi olarak döndürür, ardından sayfayı kaydırıp
+# "Daha Fazla Göster" butonlarına tıklar. İşlenen kartlar data-ra-extracted ile işaretlenir.
+TRENDYOL_EXTRACT_JS = """
+const [cardSelectors, commentSelectors, skipWords, genericSkipWords, scroll] = arguments;
+const hasWord = (text, words) => {
+    const lower = text.toLowerCase();
+    return words.some(word => lower.includes(word));
+};
+const textOf = el => (el && el.innerText ? el.innerText.trim() : '');
+
+let cards = [];
+for (const selector of cardSelectors) {
+    const found = document.querySelectorAll(selector);
+    if (found.length) { cards = Array.from(found); break; }
+}
+
+const results = [];
+for (const card of cards) {
+    if (card.dataset.raExtracted) continue;
+
+    // 1. Adım: Özel Trendyol selector'ları
+    let comment = '';
+    for (const selector of commentSelectors) {
+        const text = textOf(card.querySelector(selector));
+        if (text.length > 5 && !hasWord(text, skipWords)) { comment = text; break; }
+    }
+    // 2. Adım: Genel text elementleri
+    if (!comment) {
+        for (const el of card.querySelectorAll('p, span, div, h3, h4, h5')) {
+            const text = textOf(el);
+            if (text.length > 10 && text.length < 500 && !hasWord(text, genericSkipWords)) { comment = text; break; }
+        }
+    }
+    // 3. Adım: Kartın en uzun satırı
+    if (!comment) {
+        const lines = textOf(card).split('\\n').map(line => line.trim()).filter(Boolean);
+        if (lines.length) {
+            const longest = lines.reduce((a, b) => (b.length > a.length ? b : a));
+            if (longest.length > 5 && longest.length < 500 && !hasWord(longest, skipWords)) comment = longest;
+        }
+    }
+    // Metni henüz yüklenmemiş kartlar bir sonraki adımda tekrar denenir
+    if (comment.length <= 3) continue;
+    card.dataset.raExtracted = '1';
+
+    const stars = Array.from(card.querySelectorAll('[class*="star"], [class*="rating"]'));
+    const rate = stars.filter(s => /filled|active/.test(s.getAttribute('class') || '')).length;
+    const user = textOf(card.querySelector('[class*="user"], [class*="author"]')) || 'Anonim';
+    const dateEl = card.querySelector('time, [class*="date"]');
+    const date = dateEl ? (dateEl.getAttribute('datetime') || textOf(dateEl)) : '';
+    results.push({comment, rate, user, date});
+}
+
+const height = document.body.scrollHeight;
+let clicked = 0;
+if (scroll) {
+    window.scrollTo(0, height);
+    for (const button of document.querySelectorAll('[class*="load"], [class*="more"], [class*="show"]')) {
+        if (button.offsetParent !== null && !button.disabled) { button.click(); clicked++; }
+    }
+}
+return {cards: results, count: cards.length, height, clicked};
+"""
+
+# Selenium scroll döngüsü ayarları
+MAX_SCROLL_STEPS = 50
+PAGE_LOAD_TIMEOUT = 15
+NO_CHANGE_LIMIT = 5
+
+
+def _extract_trendyol_cards(driver, scroll=True):
+    """Kart çıkarma betiğini tek bir WebDriver çağrısı ile çalıştırır"""
+    page = driver.execute_script(
+        TRENDYOL_EXTRACT_JS,
+        REVIEW_CARD_SELECTORS,
+        TRENDYOL_COMMENT_SELECTORS,
+        SKIP_WORDS,
+        GENERIC_SKIP_WORDS,
+        scroll
+    )
+    return page or {'cards': [], 'count': 0, 'height': 0, 'clicked': 0}
+
+
+def iter_reviews_selenium(url, max_reviews=100):
+    """
+    Selenium ile web scraping yaparak yorumları çeker (GÜÇLENDİRİLMİŞ YÖNTEM)
+    ve her scroll adımında bulunan yorumları hemen üretir.
+    Kartlar tarayıcı içinde çıkarılır: her scroll adımı chromedriver'a tek bir
+    istek atar, böylece maliyet sayfadaki kart sayısından bağımsız kalır.
+    """
+    count = 0
     
     print(f"Selenium ile yorumlar çekiliyor: {url}")
     
     try:
-        chrome_options = Options()
-        chrome_options.add_argument("--headless")
-        chrome_options.add_argument("--no-sandbox")
-        chrome_options.add_argument("--disable-dev-shm-usage")
-        chrome_options.add_argument("--disable-blink-features=AutomationControlled")
-        chrome_options.add_experimental_option("excludeSwitches", ["enable-automation"])
-        chrome_options.add_experimental_option('useAutomationExtension', False)
-        chrome_options.add_argument(f"user-agent={HEADERS['User-Agent']}")
-        
-        service = Service(ChromeDriverManager().install())
-        driver = webdriver.Chrome(service=service, options=chrome_options)
-        driver.execute_script("Object.defineProperty(navigator, 'webdriver', {get: () => undefined})")
-        
-        # URL'yi yorumlar sayfasına çevir
-        if '/yorumlar' not in url:
-            url = url.replace('?', '/yorumlar?')
+        # Havuzdan sıcak bir tarayıcı kirala; iş bitince temizlenip havuza döner
+        with lease_driver() as driver:
+            # URL'yi yorumlar sayfasına çevir
+            if '/yorumlar' not in url:
+                url = url.replace('?', '/yorumlar?')
         
-        driver.get(url)
-        wait = WebDriverWait(driver, 20)
+            install_wait_hooks(driver)
+            driver.get(url)
         
-        # Sayfanın yüklenmesini bekle
-        time.sleep(5)
-        
-        # Yorumları bulmak için farklı selector'ları dene
-        review_selectors = [
-            '[data-testid="review-card"]',
-            '.review-card',
-            '.r-card',
-            '[class*="review"]',
-            '[class*="comment"]',
-            '.comment-item',
-            '.review-item'
-        ]
-        
-        review_elements = []
-        for selector in review_selectors:
-            try:
-                elements = driver.find_elements(By.CSS_SELECTOR, selector)
-                if elements:
-                    print(f"Yorumlar bulundu: {selector} ile {len(elements)} adet")
-                    review_elements = elements
-                    break
-            except:
-                continue
-        
-        if not review_elements:
-            # Sayfayı scroll et ve tekrar dene
-            print("İlk denemede yorum bulunamadı, sayfa scroll ediliyor...")
-            driver.execute_script("window.scrollTo(0, document.body.scrollHeight);")
-            time.sleep(3)
-            
-            for selector in review_selectors:
-                try:
-                    elements = driver.find_elements(By.CSS_SELECTOR, selector)
-                    if elements:
-                        print(f"Scroll sonrası yorumlar bulundu: {selector} ile {len(elements)} adet")
-                        review_elements = elements
-                        break
-                except:
-                    continue
-        
-        # Yorumları işle
-        processed_count = 0
-        for element in review_elements:
-            try:
-                processed_count += 1
-                print(f"Element {processed_count}/{len(review_elements)} işleniyor...")
-                
-                # GÜÇLENDİRİLMİŞ YORUM ÇIKARMA SİSTEMİ
-                comment_text = ""
-                
-                # 1. Adım: Özel Trendyol selector'ları
-                trendyol_selectors = [
-                    '[data-testid="review-comment"]',
-                    '.review-comment',
-                    '.comment-text',
-                    '.r-card-text',
-                    '[class*="comment"]',
-                    '[class*="review-text"]',
-                    '.review-content',
-                    '.comment-content',
-                    '[data-testid="comment"]'
-                ]
-                
-                for selector in trendyol_selectors:
-                    try:
-                        comment_elem = element.find_element(By.CSS_SELECTOR, selector)
-                        text = comment_elem.text.strip()
-                        if len(text) > 5 and not any(word in text.lower() for word in ['sağlık beyanı', 'fotoğraflı', 'tümü']):
-                            comment_text = text
-                            print(f"Yorum bulundu ({selector}): {text[:50]}...")
-                            break
-                    except:
-                        continue
-                
-                # 2. Adım: Genel text elementleri (eğer özel selector'lar başarısızsa)
-                if not comment_text:
-                    try:
-                        # Element içindeki tüm text'leri topla
-                        all_texts = element.find_elements(By.CSS_SELECTOR, 'p, span, div, h3, h4, h5')
-                        for text_elem in all_texts:
-                            text = text_elem.text.strip()
-                            if len(text) > 10 and len(text) < 500:  # Makul yorum uzunluğu
-                                # Alakasız içerikleri filtrele
-                                if not any(word in text.lower() for word in [
-                                    'sağlık beyanı', 'fotoğraflı', 'tümü',
-                                    'boutique', 'merchant', 'storefront', 'culture', 'logged-in',
-                                    'isbuyer', 'channel', 'socialproof', 'abtesting'
-                                ]):
-                                    comment_text = text
-                                    print(f"Genel text bulundu: {text[:50]}...")
-                                    break
-                    except:
-                        pass
-                
-                # 3. Adım: Element'in kendisinden text çıkar
-                if not comment_text:
-                    try:
-                        full_text = element.text.strip()
-                        # Text'i satırlara böl ve en uzun satırı al
-                        lines = [line.strip() for line in full_text.split('\n') if line.strip()]
-                        if lines:
-                            longest_line = max(lines, key=len)
-                            if len(longest_line) > 5 and len(longest_line) < 500:
-                                if not any(word in longest_line.lower() for word in [
-                                    'sağlık beyanı', 'fotoğraflı', 'tümü'
-                                ]):
-                                    comment_text = longest_line
-                                    print(f"En uzun satır bulundu: {longest_line[:50]}...")
-                    except:
-                        pass
-                
-                if comment_text and len(comment_text) > 3:  # Çok daha gevşek filtreleme
-                    # Puanı bul
-                    rate = 0
-                    try:
-                        star_elements = element.find_elements(By.CSS_SELECTOR, '[class*="star"], [class*="rating"]')
-                        if star_elements:
-                            rate = len([s for s in star_elements if 'filled' in s.get_attribute('class') or 'active' in s.get_attribute('class')])
-                    except:
-                        pass
-                    
-                    # Kullanıcı adını bul
-                    user_name = "Anonim"
-                    try:
-                        user_elements = element.find_elements(By.CSS_SELECTOR, '[class*="user"], [class*="author"]')
-                        if user_elements:
-                            user_name = user_elements[0].text.strip()
-                    except:
-                        pass
-                    
-                    # Tekrar eden yorumları kontrol et
-                    if not any(r['comment'] == comment_text for r in reviews):
-                        reviews.append({
-                            'comment': comment_text,
-                            'rate': rate,
-                            'user': user_name,
-                            'date': '',
-                            'source': 'selenium_improved'
-                        })
-                        print(f"Yorum eklendi ({len(comment_text)} karakter): {comment_text[:50]}...")
-                
-            except Exception as e:
-                print(f"Yorum işleme hatası: {e}")
-                continue
-            
-            if len(reviews) >= max_reviews:
-                break
-        
-        # Daha fazla yorum için sayfayı scroll et
-        if len(reviews) < max_reviews:
-            print("Daha fazla yorum için sayfa scroll ediliyor...")
-            last_height = driver.execute_script("return document.body.scrollHeight")
-            previous_review_count = len(reviews)
+            # İlk yorum kartları görünene veya sayfa boşta kalana kadar bekle
+            wait_for_change(driver, REVIEW_CARD_SELECTORS, previous_count=0, timeout=PAGE_LOAD_TIMEOUT)
+
+            dedup = ReviewDeduplicator()
+            last_height = None
             no_change_count = 0
-            
-            for scroll_attempt in range(50):  # 50 kez scroll dene (önceki çalışan versiyon)
-                print(f"Scroll denemesi {scroll_attempt + 1}/50...")
-                driver.execute_script("window.scrollTo(0, document.body.scrollHeight);")
-                time.sleep(1)  # Daha hızlı scroll
-                
-                # "Daha Fazla Göster" butonlarını tıkla
-                try:
-                    load_more_buttons = driver.find_elements(By.CSS_SELECTOR, '[class*="load"], [class*="more"], [class*="show"]')
-                    for button in load_more_buttons:
-                        if button.is_displayed() and button.is_enabled():
-                            driver.execute_script("arguments[0].click();", button)
-                            print("Daha fazla göster butonu tıklandı")
-                            time.sleep(1)
-                except:
-                    pass
-                
-                # Yeni yorumları kontrol et
-                for selector in review_selectors:
-                    try:
-                        new_elements = driver.find_elements(By.CSS_SELECTOR, selector)
-                        if len(new_elements) > len(review_elements):
-                            print(f"Yeni yorumlar bulundu: {len(new_elements)} adet")
-                            review_elements = new_elements
-                            
-                            # TÜM elementlerden yorumları çıkar (yeni + eski)
-                            for new_element in review_elements:
-                                try:
-                                    # Aynı güçlendirilmiş yorum çıkarma sistemini kullan
-                                    comment_text = ""
-                                    
-                                    # 1. Adım: Özel Trendyol selector'ları
-                                    for selector_name in trendyol_selectors:
-                                        try:
-                                            comment_elem = new_element.find_element(By.CSS_SELECTOR, selector_name)
-                                            text = comment_elem.text.strip()
-                                            if len(text) > 5 and not any(word in text.lower() for word in ['sağlık beyanı', 'fotoğraflı', 'tümü']):
-                                                comment_text = text
-                                                break
-                                        except:
-                                            continue
-                                    
-                                    # 2. Adım: Genel text elementleri
-                                    if not comment_text:
-                                        try:
-                                            all_texts = new_element.find_elements(By.CSS_SELECTOR, 'p, span, div, h3, h4, h5')
-                                            for text_elem in all_texts:
-                                                text = text_elem.text.strip()
-                                                if len(text) > 10 and len(text) < 500:
-                                                    if not any(word in text.lower() for word in [
-                                                        'sağlık beyanı', 'fotoğraflı', 'tümü',
-                                                        'boutique', 'merchant', 'storefront', 'culture', 'logged-in',
-                                                        'isbuyer', 'channel', 'socialproof', 'abtesting'
-                                                    ]):
-                                                        comment_text = text
-                                                        break
-                                        except:
-                                            pass
-                                    
-                                    # 3. Adım: Element'in kendisinden text çıkar
-                                    if not comment_text:
-                                        try:
-                                            full_text = new_element.text.strip()
-                                            lines = [line.strip() for line in full_text.split('\n') if line.strip()]
-                                            if lines:
-                                                longest_line = max(lines, key=len)
-                                                if len(longest_line) > 5 and len(longest_line) < 500:
-                                                    if not any(word in longest_line.lower() for word in [
-                                                        'sağlık beyanı', 'fotoğraflı', 'tümü'
-                                                    ]):
-                                                        comment_text = longest_line
-                                        except:
-                                            pass
-                                    
-                                    if comment_text and len(comment_text) > 3:  # Çok daha gevşek filtreleme
-                                        # Tekrar eden yorumları kontrol et
-                                        if not any(r['comment'] == comment_text for r in reviews):
-                                            reviews.append({
-                                                'comment': comment_text,
-                                                'rate': 0,
-                                                'user': 'Anonim',
-                                                'date': '',
-                                                'source': 'selenium_scroll'
-                                            })
-                                            print(f"Scroll ile yorum eklendi ({len(comment_text)} karakter): {comment_text[:50]}...")
-                                            
-                                            # Limit kaldırıldı - tüm yorumları topla
-                                            pass
-                                except Exception as e:
-                                    continue
-                            
-                            # Limit kaldırıldı - tüm yorumları topla
-                            pass
-                    except:
+
+            for step in range(MAX_SCROLL_STEPS):
+                # Yeni kartları çıkar, sonra sayfayı kaydır ve "Daha Fazla Göster" butonlarına tıkla
+                page = _extract_trendyol_cards(driver, scroll=True)
+
+                added = 0
+                for card in page['cards']:
+                    comment_text = card['comment']
+                    # Tekrar eden yorumları kontrol et
+                    if not dedup.add(comment_text):
                         continue
-                
-                new_height = driver.execute_script("return document.body.scrollHeight")
-                current_review_count = len(reviews)
-                print(f"Scroll {scroll_attempt + 1}: {current_review_count} yorum toplandı")
-                
-                # Eğer son 5 scroll'da yorum sayısı artmadıysa dur
-                if scroll_attempt >= 5 and current_review_count == previous_review_count:
+                    yield {
+                        'comment': comment_text,
+                        'rate': card.get('rate') or 0,
+                        'user': card.get('user') or 'Anonim',
+                        'date': card.get('date') or '',
+                        'source': 'selenium_script'
+                    }
+                    added += 1
+                    count += 1
+                    if count >= max_reviews:
+                        break
+
+                print(f"Scroll {step + 1}/{MAX_SCROLL_STEPS}: {added} yeni yorum, toplam {count} yorum toplandı")
+                if page['clicked']:
+                    print(f"{page['clicked']} adet 'Daha fazla göster' butonu tıklandı")
+
+                if count >= max_reviews:
+                    break
+
+                # Eğer son adımlarda yorum sayısı artmadıysa dur
+                if added == 0:
                     no_change_count += 1
-                    if no_change_count >= 5:
+                    if step >= NO_CHANGE_LIMIT and no_change_count >= NO_CHANGE_LIMIT:
                         print("Yorum sayısı artmıyor, scroll durduruluyor...")
                         break
+                    if count and page['height'] == last_height:
+                        print("Sayfa sonuna ulaşıldı, scroll durduruluyor...")
+                        break
                 else:
                     no_change_count = 0
-                
-                previous_review_count = current_review_count
-                
-                if new_height == last_height:
-                    print("Sayfa sonuna ulaşıldı, scroll durduruluyor...")
-                    break
-                last_height = new_height
-                
-                if len(reviews) >= max_reviews:
-                    break
+                last_height = page['height']
+
+                # Yeni kartlar gelene veya ağ trafiği durana kadar bekle
+                wait_for_change(driver, REVIEW_CARD_SELECTORS, previous_count=page['count'])
+                polite_pause()
+
+        print(f"Selenium ile toplam {count} yorum çekildi")
 
-        driver.quit()
-        print(f"Selenium ile toplam {len(reviews)} yorum çekildi")
-        
     except Exception as e:
         print(f"Selenium başlatma/çalışma hatası: {e}")
-        if 'driver' in locals() and driver:
-            driver.quit()
-    
-    return reviews
+
+
+def fetch_reviews_selenium(url, max_reviews=100):
+    """iter_reviews_selenium'un liste döndüren hali"""
+    return list(iter_reviews_selenium(url, max_reviews))
 
 
 def detect_website_type(url):
@@ -468,61 +548,136 @@ def detect_website_type(url):
     else:
         return 'unknown'
 
-def fetch_reviews(url=None, max_pages=10, max_reviews=100):
-    """Ana yorum çekme fonksiyonu"""
-    reviews = []
-    
-    # 1. Adım: URL'den gerekli bilgileri çıkar
-    if not url:
-        print("URL parametresi gerekli.")
-        return []
-    
-    # 2. Adım: Web sitesi türünü tespit et
+def _iter_trendyol_reviews(url, max_pages, max_reviews, api_workers, incremental, use_cache, fetch_info):
+    """
+    Trendyol için önce API (kayıtlı cursor varsa artımlı), başarısız olursa Selenium.
+    API'nin bildirdiği sayfa sayısı fetch_info['total_pages'] alanına yazılır; cursor,
+    yorumlar veritabanına yazıldıktan sonra fetch_reviews tarafından güncellenir.
+    """
+    product_slug, merchant_id = extract_product_info_from_url(url)
+    if not product_slug:
+        print("URL'den ürün bilgisi alınamadı.")
+        return
+
+    key = product_key(url)
+    cursor = review_db.load_cursor(key) if incremental else None
+
+    api_stats = {}
+    new_count = 0
+    for review in iter_reviews_api(product_slug, merchant_id, max_pages, max_workers=api_workers,
+                                   cursor=cursor, use_cache=use_cache, stats=api_stats):
+        new_count += 1
+        yield review
+
+    if api_stats['total_pages']:
+        fetch_info['total_pages'] = api_stats['total_pages']
+        fetch_info['complete'] = api_stats['complete']
+        known_count = review_db.count_reviews(key)
+        print(f"{new_count} yeni yorum çekildi, veritabanında {known_count} kayıtlı yorum var.")
+        if new_count or known_count:
+            return
+
+    print("API ile yorum alınamadı, Selenium yedek yöntemine geçiliyor...")
+    yield from iter_reviews_selenium(url, max_reviews)
+
+
+def iter_reviews(url, max_pages=10, max_reviews=100, api_workers=API_MAX_WORKERS, incremental=True,
+                 use_cache=True, fetch_info=None):
+    """
+    URL'nin sitesine göre yorumları çekildikçe üretir; tekrar eden yorumlar akış sırasında elenir.
+    Sonraki aşamalar (veritabanına yazma, index) çekme bitmeden yorumları işlemeye başlayabilir.
+    """
+    if fetch_info is None:
+        fetch_info = {}
     website_type = detect_website_type(url)
     print(f"Tespit edilen web sitesi: {website_type}")
-    
+
     if website_type == 'hepsiburada':
         print("Hepsiburada için özel scraper kullanılıyor...")
-        reviews = fetch_reviews_hepsiburada(url, max_reviews)
+        source = iter_reviews_hepsiburada(url, max_reviews)
     elif website_type == 'trendyol':
-        print("Trendyol için mevcut scraper kullanılıyor...")
-        product_slug, merchant_id = extract_product_info_from_url(url)
-        
-        if not product_slug:
-            print("URL'den ürün bilgisi alınamadı.")
-            return []
-
-        # Trendyol için Selenium ile yorumları çek
-        reviews = fetch_reviews_selenium(url, max_reviews)
+        print("Trendyol için API öncelikli scraper kullanılıyor...")
+        source = _iter_trendyol_reviews(url, max_pages, max_reviews, api_workers, incremental, use_cache,
+                                        fetch_info)
     else:
         print(f"Desteklenmeyen web sitesi: {website_type}")
-        return []
-
-    # Sonuçları kaydet
-    if reviews:
-        # Tekrar eden yorumları son bir kez temizle
-        unique_reviews = list({r['comment']: r for r in reviews}.values())
-        print(f"\nToplam {len(unique_reviews)} adet benzersiz yorum bulundu ve kaydediliyor.")
-        with open('reviews.json', 'w', encoding='utf-8') as f:
-            json.dump(unique_reviews, f, ensure_ascii=False, indent=2)
-        print("Yorumlar 'reviews.json' dosyasına başarıyla kaydedildi.")
+        return
+
+    dedup = ReviewDeduplicator()
+    for review in source:
+        if dedup.add(review['comment']):
+            yield review
+
+
+def fetch_reviews(url=None, max_pages=10, max_reviews=100, api_workers=API_MAX_WORKERS, incremental=True,
+                  use_cache=True, collect=True):
+    """
+    Ana yorum çekme fonksiyonu
+    Benzersiz yorumlar çekildikçe yorum veritabanına (review_db) toplu UPSERT ile yazılır;
+    ürün manifest'i güncellenir ve en son ürün olarak işaretlenir.
+    incremental=True iken Trendyol API yolu ürünün kayıtlı cursor'ından yeni yorumları çeker.
+    collect=True iken ürünün veritabanındaki tüm yorumları, False iken (bellekte liste
+    tutulmaz) bu çekimde yazılan yorum sayısı döner.
+    """
+    # URL'den gerekli bilgileri çıkar
+    if not url:
+        print("URL parametresi gerekli.")
+        return [] if collect else 0
+
+    key = product_key(url)
+    site = detect_website_type(url)
+    review_db.upsert_product(key, url, site)
+
+    fetch_info = {}
+    with review_db.ReviewSink(key) as sink:
+        for review in iter_reviews(url, max_pages, max_reviews, api_workers, incremental, use_cache,
+                                   fetch_info):
+            sink.write(review)
+
+    # Cursor, yazılan yorumlar arasındaki en yeni yorumdan (tarih index'i ile) hesaplanır.
+    # Cursor'dan önceki bir sayfa çekilemediyse veya cursor'a ulaşılamadıysa (max_pages) cursor ilerletilmez;
+    # bir sonraki çekim eski cursor'dan başlar ve eksik kalan yorumları tekrar dener.
+    if fetch_info.get('total_pages'):
+        if fetch_info.get('complete'):
+            review_db.save_cursor(key, fetch_info['total_pages'])
+        else:
+            print("Uyarı: Bazı sayfalar çekilemedi veya cursor'a ulaşılamadı, cursor güncellenmedi. "
+                  "Eksik yorumlar bir sonraki çekimde tekrar denenir (gerekirse --full-refresh --max-pages ile).")
+    fetched_at = time.strftime('%Y-%m-%dT%H:%M:%S')
+    review_db.mark_product(key, fetched_at=fetched_at)
+    total = review_db.count_reviews(key)
+
+    update_manifest(key, url=url, site=site, review_count=total, fetched_at=fetched_at)
+    set_latest(key)
+    if total:
+        print(f"\nBu çekimde {sink.count} benzersiz yorum yazıldı, ürünün toplam {total} yorumu var.")
+        print(f"Ürün anahtarı: {key}")
     else:
         print("\nHiç yorum çekilemedi.")
-    
-    return reviews
+
+    if collect:
+        return list(review_db.iter_product_reviews(key))
+    return sink.count
 
 def main():
     parser = argparse.ArgumentParser(description='E-ticaret sitelerinden ürün yorumlarını çeker (Trendyol, Hepsiburada)')
     parser.add_argument('--url', required=True, help='Ürün URL\'si (Trendyol veya Hepsiburada)')
     parser.add_argument('--max-pages', type=int, default=10, help='API için maksimum sayfa sayısı')
     parser.add_argument('--max-reviews', type=int, default=100, help='Selenium için maksimum yorum sayısı')
+    parser.add_argument('--api-workers', type=int, default=API_MAX_WORKERS, help='API sayfalarını paralel çeken worker sayısı')
+    parser.add_argument('--full-refresh', action='store_true', help='Kayıtlı cursor\'ı yok say ve tüm sayfaları yeniden çek')
+    parser.add_argument('--no-cache', action='store_true', help='API yanıt önbelleğini kullanma')
     
     args = parser.parse_args()
     
     fetch_reviews(
         url=args.url,
         max_pages=args.max_pages,
-        max_reviews=args.max_reviews
+        max_reviews=args.max_reviews,
+        api_workers=args.api_workers,
+        incremental=not args.full_refresh,
+        use_cache=not args.no_cache,
+        collect=False
     )
 
 if __name__ == "__main__":
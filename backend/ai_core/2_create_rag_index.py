@@ -3,13 +3,37 @@
 # Sentence Transformers ve FAISS kullanarak hızlı arama sağlar
 # Hackathon Projesi - AI Destekli Yorum Analizi
 
-import json
+import argparse
+import functools
+import itertools
 import os
-from sentence_transformers import SentenceTransformer
+import random
+import sys
+import time
 import faiss
 import numpy as np
 
-def chunk_text(text, max_length=200):
+import review_db
+from review_stream import iter_reviews_file
+from ann_index import (DEFAULT_METRIC, DEFAULT_STORAGE, METRICS, STORAGE_CODES, build_index, factory_string,
+                       index_ids, plan_index, prepare_vectors, same_layout, supports_removal)
+from chunk_store import CHUNK_STORE_VERSION, MAX_CHUNKS_PER_REVIEW, ChunkStoreWriter, chunk_id
+from embedding_backends import EMBEDDING_BACKEND, EMBEDDING_MODEL, embedding_identity, load_embedding_model
+from embedding_cache import EmbeddingCache
+from embedding_engine import EmbeddingEngine
+from artifact_store import (CHUNKS_FILE, INDEX_FILE, STATS_FILE, load_manifest, product_dir, resolve_product,
+                            update_manifest, write_json_atomic)
+
+# Bellekte birlikte işlenen metin parçası sayısı
+# Grup içindeki yeni parçalar tek seferde vektörleştirilir; motor bunları uzunluğa göre sıralayıp
+# ENCODE_BATCH_SIZE'lık model gruplarına böler, büyük gruplarda süreç havuzunu kullanır (embedding_engine.py)
+# Embedding modeli ve arka ucu (torch / onnx / onnx-int8) embedding_backends.py'de seçilir
+CHUNK_GROUP_SIZE = 4096
+
+# Parça uzunluğu değişirse parça id'leri farklı metinleri gösterir; index sıfırdan oluşturulur
+CHUNK_MAX_LENGTH = 200
+
+def chunk_text(text, max_length=CHUNK_MAX_LENGTH):
     """
     Yorumu anlamlı ve kısa parçalara böler. Noktalama ve uzunluk dikkate alınır.
     Bu fonksiyon uzun yorumları AI modelinin işleyebileceği boyutlara böler.
@@ -36,45 +60,275 @@ def chunk_text(text, max_length=200):
     # Boş parçaları filtrele
     return [c for c in chunks if c]
 
+def iter_chunks(reviews):
+    """
+    Yorum akışındaki her yorumu parçalara böler; (parça id'si, yorum id'si, yorum, parça) dörtlülerini
+    tek tek üretir. Yorum id'si veritabanı rowid'sidir, eski düzende yorumun akıştaki sırası kullanılır.
+    Yorumlar artan id sırasıyla geldiği için parça id'leri de artan sıradadır.
+    """
+    for ordinal, review in enumerate(reviews):
+        text = review.get('comment', '')
+        if text:
+            review_id = review.get('rowid', ordinal)
+            for chunk_no, chunk in enumerate(chunk_text(text)[:MAX_CHUNKS_PER_REVIEW]):
+                yield chunk_id(review_id, chunk_no), review_id, review, chunk
+
+def batched(items, size):
+    """Akışı size elemanlık listeler halinde gruplar"""
+    iterator = iter(items)
+    while True:
+        batch = list(itertools.islice(iterator, size))
+        if not batch:
+            return
+        yield batch
+
+@functools.lru_cache(maxsize=1)
+def load_engine():
+    """
+    Embedding modelini ve vektörleştirme motorunu ilk ihtiyaçta yükler; tüm parçalar önbellekteyse model hiç yüklenmez.
+    Batch boyutu, thread ve süreç sayısı ENCODE_BATCH_SIZE / ENCODE_THREADS / ENCODE_WORKERS ile ayarlanır.
+    """
+    return EmbeddingEngine(load_embedding_model(EMBEDDING_MODEL, EMBEDDING_BACKEND))
+
+def encode_texts(texts):
+    return load_engine().encode(texts)
+
+def load_previous_index(index_path, manifest, plan):
+    """
+    Artımlı güncelleme için önceki index'i yükler. Index yoksa ya da embedding modeli veya arka ucu, parça uzunluğu
+    veya index planı (tür / küme sayısı / metrik / depolama) değiştiyse None döner ve index sıfırdan oluşturulur.
+    """
+    if not os.path.exists(index_path):
+        return None
+    if manifest.get('embedding_model') != EMBEDDING_MODEL or manifest.get('chunk_max_length') != CHUNK_MAX_LENGTH:
+        return None
+    # Arka uç kaydı olmayan eski manifest'ler torch ile oluşturulmuştur
+    if manifest.get('embedding_backend', 'torch') != EMBEDDING_BACKEND:
+        return None
+    if not same_layout(manifest.get('index_plan'), plan):
+        return None
+    return faiss.read_index(index_path)
+
+def rebuild_index(plan, dim, reviews, cache, train_vectors=None):
+    """Index'i yorum akışındaki tüm parçalarla yeniden kurar; embedding'ler önbellekten okunur"""
+    index = build_index(plan, dim, train_vectors)
+    for batch in batched(iter_chunks(reviews), CHUNK_GROUP_SIZE):
+        ids = np.array([cid for cid, _, _, _ in batch], dtype=np.int64)
+        embeddings = cache.encode([chunk for _, _, _, chunk in batch], encode_texts)
+        index.add_with_ids(prepare_vectors(embeddings, plan['metric']), ids)
+    return index
+
+def sample_reviews(reviews, size, seed=0):
+    """Yorum akışından rastgele size yorum seçer (reservoir sampling); akış belleğe alınmaz"""
+    rng = random.Random(seed)
+    sample = []
+    for i, review in enumerate(reviews):
+        if i < size:
+            sample.append(review)
+        else:
+            j = rng.randint(0, i)
+            if j < size:
+                sample[j] = review
+    return sample
+
+def training_vectors(reviews, size, cache):
+    """Örnek yorumların parçalarından IVF eğitimi için en fazla size embedding üretir"""
+    texts = [chunk for _, _, _, chunk in itertools.islice(iter_chunks(reviews), size)]
+    if not texts:
+        return None
+    return cache.encode(texts, encode_texts)
+
+def contains_sorted(sorted_ids, ids):
+    """ids içindeki her id'nin sıralı sorted_ids dizisinde olup olmadığını döndürür (ikili arama)"""
+    if not len(sorted_ids):
+        return np.zeros(len(ids), dtype=bool)
+    found = np.minimum(np.searchsorted(sorted_ids, ids), len(sorted_ids) - 1)
+    return sorted_ids[found] == ids
+
+class ReviewStats:
+    """Yorum akışından geçerken puan istatistiklerini toplar (veritabanı dışı eski düzen için)"""
+
+    def __init__(self):
+        self.review_count = 0
+        self.rated_count = 0
+        self.rating_sum = 0
+        self.distribution = {str(star): 0 for star in range(1, 6)}
+
+    def track(self, reviews):
+        for review in reviews:
+            self.review_count += 1
+            rate = review.get('rate') or 0
+            if isinstance(rate, (int, float)) and 1 <= rate <= 5:
+                self.rated_count += 1
+                self.rating_sum += rate
+                self.distribution[str(int(round(rate)))] += 1
+            yield review
+
+    def to_dict(self, chunk_count):
+        average = round(self.rating_sum / self.rated_count, 1) if self.rated_count else 0
+        return {
+            'review_count': self.review_count,
+            'rated_count': self.rated_count,
+            'average_rating': average,
+            'rating_distribution': self.distribution,
+            'chunk_count': chunk_count
+        }
+
 def main():
-    # Script'in bulunduğu dizini al
-    script_dir = os.path.dirname(os.path.abspath(__file__))
+    parser = argparse.ArgumentParser(description='Yorumlardan FAISS arama indexi oluşturur')
+    parser.add_argument('--product', help="Ürün anahtarı veya en son çekilen ürün için 'latest'")
+    parser.add_argument('--product-url', help='Ürün URL\'si (anahtar URL\'den üretilir)')
+    parser.add_argument('--metric', choices=METRICS, default=DEFAULT_METRIC,
+                        help='Benzerlik metriği: l2 veya cosine (normalize + iç çarpım)')
+    parser.add_argument('--storage', choices=list(STORAGE_CODES), default=DEFAULT_STORAGE,
+                        help='Vektör depolama: float32, fp16 veya int8 (skaler nicemleme)')
+    args = parser.parse_args()
     
-    # 1. Yorumları oku - JSON dosyasından yorum verilerini yükle
-    reviews_path = os.path.join(script_dir, 'reviews.json')
-    with open(reviews_path, 'r', encoding='utf-8') as f:
-        reviews = json.load(f)
+    # Ürün belirtildiyse ürünün depo dizini, belirtilmediyse script'in bulunduğu dizin kullanılır
+    try:
+        key = resolve_product(args.product, args.product_url)
+    except ValueError as e:
+        parser.error(str(e))
+    if (args.product or args.product_url) and not key:
+        print("Ürün bulunamadı, önce yorumları çekin.")
+        sys.exit(1)
+    data_dir = product_dir(key, create=True) if key else os.path.dirname(os.path.abspath(__file__))
     
-    # 2. Chunk'lara ayır - Yorumları anlamlı parçalara böl
-    all_chunks = []
-    for review in reviews:
-        text = review.get('comment', '')
-        if text:
-            chunks = chunk_text(text)
-            all_chunks.extend(chunks)
+    # 1. Yorumları oku - ürün için veritabanından, eski düzende reviews.jsonl/reviews.json'dan akış olarak
+    stats = ReviewStats()
+    reviews = review_db.iter_product_reviews(key) if key else stats.track(iter_reviews_file(data_dir))
     
-    print(f"Toplam {len(all_chunks)} metin parçası oluşturuldu.")
+    # 2. Index türünü derlem boyutuna göre seç - küçükte tam arama, ortada HNSW, büyükte IVF-PQ
+    # Eşikler parça sayısına göredir; parçalar embedding'siz bir ön geçişle sayılır (uzun yorumlar birden çok parça verir)
+    chunk_count = sum(1 for _ in iter_chunks(review_db.iter_product_reviews(key) if key
+                                             else iter_reviews_file(data_dir)))
+    plan = plan_index(chunk_count, args.metric, args.storage)
     
-    # 3. Embedding modeli yükle - Sentence Transformers ile vektörleştirme
-    # all-MiniLM-L6-v2 modeli hızlı ve etkili embedding sağlar
-    model = SentenceTransformer('all-MiniLM-L6-v2')
-    embeddings = model.encode(all_chunks, show_progress_bar=True, convert_to_numpy=True)
+    # 3. Önceki index'i yükle - ürün modunda index parça id'leriyle artımlı güncellenir,
+    # sadece yeni parçalar eklenir, artık olmayanlar silinir
+    cache = EmbeddingCache(embedding_identity())
+    index_path = os.path.join(data_dir, INDEX_FILE)
+    index = load_previous_index(index_path, load_manifest(key), plan) if key else None
+    train_vectors = None
+    if index is not None:
+        previous_ids = np.sort(index_ids(index))
+        print(f"Önceki index yüklendi ({len(previous_ids)} parça), artımlı güncelleniyor.")
+    else:
+        previous_ids = np.empty(0, dtype=np.int64)
+        if plan['train_size']:
+            # IVF kümeleri ve int8 kodlayıcısı rastgele örnek yorumların parçalarıyla eğitilir; embedding'ler önbelleğe de yazılır
+            sample = (review_db.sample_reviews(key, plan['train_size']) if key
+                      else sample_reviews(iter_reviews_file(data_dir), plan['train_size']))
+            train_vectors = training_vectors(sample, plan['train_size'], cache)
+            if train_vectors is not None and len(train_vectors) < plan['nlist']:
+                plan = plan_index(0, args.metric, args.storage)
+    print(f"Index planı: {plan['type']}, {plan['metric']}, {plan['storage']} ({chunk_count} parça).")
     
-    # 4. FAISS indeksi oluştur - Hızlı benzerlik araması için
-    dim = embeddings.shape[1]  # Embedding boyutunu al
-    index = faiss.IndexFlatL2(dim)  # L2 mesafesi kullanarak düz index
-    index.add(embeddings)  # Embedding'leri index'e ekle
+    # 4. Chunk'lara ayır, index'te olmayanları vektörleştir ve FAISS indeksine ekle
+    # Embedding'ler önce kalıcı önbellekte aranır; model sadece önbellekte olmayan metinler için çalışır
+    # Bellekte aynı anda sadece bir grup (CHUNK_GROUP_SIZE parça) tutulur
+    total_chunks = 0
+    added_chunks = 0
+    current_ids = []  # grup grup parça id'leri - silinen parçaları bulmak için
+    # Ürün modunda parçalar (index sırası, yorum rowid'si, metin) gruplar halinde veritabanına yazılır, bellekte tutulmaz
+    chunk_sink = review_db.ChunkSink(key) if key else None
+    chunks_path = os.path.join(data_dir, CHUNKS_FILE)
+    writer = ChunkStoreWriter(chunks_path)
+    try:
+        for batch in batched(iter_chunks(reviews), CHUNK_GROUP_SIZE):
+            ids = np.array([cid for cid, _, _, _ in batch], dtype=np.int64)
+            current_ids.append(ids)
+            new = ~contains_sorted(previous_ids, ids)
+            if new.any():
+                embeddings = cache.encode([batch[i][3] for i in np.flatnonzero(new)], encode_texts)
+                embeddings = prepare_vectors(embeddings, plan['metric'])  # cosine için normalize
+                if index is None:
+                    dim = embeddings.shape[1]  # Embedding boyutunu al
+                    index = build_index(plan, dim, train_vectors)  # plana göre parça id'li index
+                    train_vectors = None
+                index.add_with_ids(embeddings, ids[new])  # Embedding'leri id'leriyle index'e ekle
+                added_chunks += int(new.sum())
+            
+            # Parçaları id sırasıyla parça deposuna ekle
+            for cid, review_id, review, chunk in batch:
+                position = writer.add(chunk, review_id, review.get('rate'), review.get('date'), chunk_id=cid)
+                if chunk_sink:
+                    chunk_sink.write(position, review.get('rowid'), chunk)
+            total_chunks = len(writer)
+            print(f"{total_chunks} metin parçası işlendi ({added_chunks} yeni).")
+        
+        if total_chunks == 0:
+            print("Hiç metin parçası oluşturulamadı, index oluşturulmadı.")
+            sys.exit(1)  # yarım parça deposu aşağıda iptal edilir
+        
+        # Artık olmayan parçaları (silinen yorumlar) index'ten çıkar
+        # HNSW silmeyi desteklemez; index önbellekteki embedding'lerle yeniden kurulur (model çalışmaz)
+        current_ids = np.concatenate(current_ids)
+        removed_ids = np.setdiff1d(previous_ids, current_ids, assume_unique=True)
+        if len(removed_ids):
+            if supports_removal(index):
+                index.remove_ids(removed_ids)
+            else:
+                if plan['train_size']:
+                    train_vectors = training_vectors(review_db.sample_reviews(key, plan['train_size']),
+                                                     plan['train_size'], cache)
+                index = rebuild_index(plan, index.d, review_db.iter_product_reviews(key), cache, train_vectors)
+    except BaseException:
+        writer.abort()
+        if chunk_sink:
+            chunk_sink.abort()
+        raise
+    finally:
+        cache.close()
+        if load_engine.cache_info().currsize:
+            load_engine().close()  # süreç havuzu varsa kapatılır
     
-    # Index'i dosyaya kaydet
-    index_path = os.path.join(script_dir, 'index.faiss')
-    faiss.write_index(index, index_path)
-    print(f"FAISS indeksi '{index_path}' olarak kaydedildi.")
+    if load_engine.cache_info().currsize:
+        print(load_engine().report())
+    print(f"Toplam {total_chunks} metin parçası: {added_chunks} eklendi, {len(removed_ids)} silindi "
+          f"(embedding önbelleği: {cache.stats['hits']} isabet, {cache.stats['misses']} vektörleştirme).")
     
-    # 5. Chunks'ı kaydet - Metin parçalarını JSON formatında sakla
-    chunks_path = os.path.join(script_dir, 'chunks.json')
-    with open(chunks_path, 'w', encoding='utf-8') as f:
-        json.dump(all_chunks, f, ensure_ascii=False, indent=2)
+    # 5-6. Index'i ve parça depolarını kaydet - ikisi de önce geçici dosyalara yazılır, sonra art arda yerine taşınır;
+    # sorgu servisi ürünü ancak manifest'teki indexed_at değişince (aşağıda, en son) yeniden yükler.
+    # Index'te değişiklik yoksa index dosyasına dokunulmaz
+    index_changed = bool(added_chunks or len(removed_ids) or not len(previous_ids))
+    try:
+        writer.finish()
+        if index_changed:
+            faiss.write_index(index, f'{index_path}.tmp')
+    except BaseException:
+        writer.abort()
+        if chunk_sink:
+            chunk_sink.abort()
+        raise
+    writer.install()
+    if index_changed:
+        os.replace(f'{index_path}.tmp', index_path)
+        print(f"FAISS indeksi '{index_path}' olarak kaydedildi.")
+    else:
+        print("Index'te değişiklik yok, mevcut FAISS indeksi kullanılıyor.")
     print(f"Tüm metin parçaları '{chunks_path}' olarak kaydedildi.")
+    
+    # 7. İstatistikleri ve manifest'i kaydet
+    # Ürün modunda parçalar (ön filtreleme için) veritabanına yazılır, istatistikler SQL ile hesaplanır
+    if key:
+        chunk_sink.commit()
+        product_stats = dict(review_db.product_stats(key), chunk_count=total_chunks)
+    else:
+        product_stats = stats.to_dict(total_chunks)
+    write_json_atomic(os.path.join(data_dir, STATS_FILE), product_stats)
+    if key:
+        indexed_at = time.strftime('%Y-%m-%dT%H:%M:%S')
+        review_db.mark_product(key, indexed_at=indexed_at)
+        update_manifest(key, indexed_at=indexed_at, chunk_count=total_chunks,
+                        embedding_model=EMBEDDING_MODEL, embedding_backend=EMBEDDING_BACKEND,
+                        chunk_max_length=CHUNK_MAX_LENGTH,
+                        index_type=type(index).__name__, chunk_store_version=CHUNK_STORE_VERSION,
+                        index_plan={'type': plan['type'], 'nlist': plan['nlist'], 'metric': plan['metric'],
+                                    'storage': plan['storage'], 'factory': factory_string(plan, index.d)},
+                        search_params=plan['search_params'],
+                        last_update={'added': added_chunks, 'removed': int(len(removed_ids))})
+        print(f"Ürün '{key}' sorgulamaya hazır.")
 
 if __name__ == "__main__":
     main()
@@ -6,49 +6,89 @@
 import argparse
 import json
 import os
+import time
+from concurrent.futures import ThreadPoolExecutor
 import faiss
 import numpy as np
-from sentence_transformers import SentenceTransformer
 from dotenv import load_dotenv
 import google.generativeai as genai
 
-def load_index_and_chunks():
+import review_db
+from ann_index import apply_search_params, index_metric, prepare_vectors
+from answer_cache import ANSWER_CACHE_ENABLED, AnswerCache, answer_scope
+from artifact_store import (CHUNKS_FILE, INDEX_FILE, LEGACY_CHUNKS_FILE, STATS_FILE, is_indexed, load_manifest,
+                            product_dir, resolve_product, use_legacy)
+from chunk_store import NO_DATE, chunks_for_ids, open_chunks
+from context_builder import CONTEXT_TOKEN_BUDGET, build_contexts, chunk_text
+from embedding_backends import embedding_identity, load_embedding_model
+
+# İstatistiklerde gösterilecek son ay sayısı
+TREND_PERIODS = 6
+
+# Yanıt üreten Gemini modeli
+GEMINI_MODEL = 'gemini-1.5-pro'
+
+# Toplu sorularda aynı anda yapılan en fazla Gemini çağrısı - ortam değişkeni ile değiştirilebilir
+LLM_CONCURRENCY = int(os.getenv('LLM_CONCURRENCY', '4'))
+
+# Ürün henüz indekslenmemişse kullanılan çıkış kodu - çağıran taraf çekme + index adımlarını çalıştırır
+EXIT_NOT_INDEXED = 3
+
+def load_index_and_chunks(data_dir=None):
     """
     FAISS index'ini ve metin parçalarını yükler
     Bu fonksiyon önceden oluşturulmuş vektör index'ini ve metin parçalarını okur
+    data_dir verilmezse script'in bulunduğu dizin kullanılır
+    Parçalar chunks.bin'den mmap ile açılır (sadece kullanılan parçalar okunur);
+    eski dizinlerde chunks.json yüklenir
     """
     # Script'in bulunduğu dizini al
-    script_dir = os.path.dirname(os.path.abspath(__file__))
-    
-    # Index ve chunks dosya yollarını belirle
-    index_path = os.path.join(script_dir, 'index.faiss')
-    chunks_path = os.path.join(script_dir, 'chunks.json')
+    data_dir = data_dir or os.path.dirname(os.path.abspath(__file__))
     
     # FAISS index'ini yükle
-    index = faiss.read_index(index_path)
+    index = faiss.read_index(os.path.join(data_dir, INDEX_FILE))
     
-    # Metin parçalarını JSON'dan yükle
-    with open(chunks_path, 'r', encoding='utf-8') as f:
-        chunks = json.load(f)
+    # Metin parçalarını aç
+    chunks = open_chunks(data_dir, CHUNKS_FILE, LEGACY_CHUNKS_FILE)
     
     return index, chunks
 
+def index_version(key, data_dir):
+    """
+    Yanıt önbelleği için index sürümü: manifest'teki indexed_at ve index dosyasının değişiklik zamanı.
+    Ürün yeniden indekslenince değişir; böylece eski index'le üretilmiş yanıtlar kullanılmaz.
+    """
+    try:
+        mtime = os.stat(os.path.join(data_dir, INDEX_FILE)).st_mtime_ns
+    except FileNotFoundError:
+        mtime = None
+    indexed_at = load_manifest(key).get('indexed_at') if key else None
+    return f'{indexed_at}:{mtime}'
+
+def load_stored_stats(data_dir):
+    """Index oluşturulurken kaydedilen yorum istatistiklerini yükler; yoksa None"""
+    stats_path = os.path.join(data_dir, STATS_FILE)
+    if not os.path.exists(stats_path):
+        return None
+    with open(stats_path, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
 def get_top_chunks(question, model, index, chunks, top_k=5):
     """
     Soruya en uygun metin parçalarını bulur
     Bu fonksiyon semantic search ile en alakalı yorum parçalarını döndürür
     """
-    # Soruyu vektörleştir
-    q_vec = model.encode([question], convert_to_numpy=True)
+    # Soruyu vektörleştir - cosine index'lerde soru vektörü de normalize edilir
+    q_vec = prepare_vectors(model.encode([question], convert_to_numpy=True), index_metric(index))
     
     # FAISS ile en yakın parçaları ara
     D, I = index.search(q_vec, top_k)
     
-    # En alakalı parçaları döndür
-    top_chunks = [chunks[i] for i in I[0]]
+    # En alakalı parçaları döndür (-1: index'te yeterli parça yok)
+    top_chunks = chunks_for_ids(chunks, I[0])
     return top_chunks
 
-def build_improved_prompt(question, top_chunks, product_stats):
+def build_improved_prompt(question, top_chunks, product_stats, total_chunks=None):
     """
     Gemini için geliştirilmiş bir prompt oluşturur
     Bu fonksiyon AI modeline gönderilecek detaylı ve yapılandırılmış prompt hazırlar
@@ -57,9 +97,15 @@ def build_improved_prompt(question, top_chunks, product_stats):
         question (str): Kullanıcının sorusu
         top_chunks (list): RAG ile çekilmiş en ilgili yorum parçaları
         product_stats (dict): Ortalama puan, yorum sayısı gibi istatistiksel veriler
+        total_chunks (int): Ürünün toplam parça sayısı (top_chunks bunların bir seçkisiyse)
     """
-    # Tüm yorumları numaralandırarak göster
+    # Seçilen yorumları numaralandırarak göster
     context = '\n'.join(f'{i+1}. {c}' for i, c in enumerate(top_chunks))
+    if total_chunks and total_chunks > len(top_chunks):
+        count_line = (f"**TOPLAM YORUM SAYISI:** {total_chunks} yorum parçası var; soruyla en alakalı "
+                      f"{len(top_chunks)} tanesi yukarıda gösterilmiştir.\n\n")
+    else:
+        count_line = f"**TOPLAM YORUM SAYISI:** {len(top_chunks)} adet yorum bulunmaktadır.\n\n"
     
     # Detaylı prompt oluştur
     prompt = (
@@ -69,10 +115,11 @@ def build_improved_prompt(question, top_chunks, product_stats):
         f"- Ortalama Puan: {product_stats.get('ortalamaPuan', 'N/A')} / 5\n"
         f"- Toplam Değerlendirme Sayısı: {product_stats.get('toplamDegerlendirme', 'N/A')}\n"
         f"- Pozitif Yorumlar: {product_stats.get('pozitifYorumlar', 'N/A')}\n"
-        f"- Negatif Yorumlar: {product_stats.get('negatifYorumlar', 'N/A')}\n\n"
+        f"- Negatif Yorumlar: {product_stats.get('negatifYorumlar', 'N/A')}\n"
+        f"{format_rating_details(product_stats)}\n"
         "**KULLANICI YORUMLARI:**\n"
         f"{context}\n\n"
-        f"**TOPLAM YORUM SAYISI:** {len(top_chunks)} adet yorum bulunmaktadır.\n\n"
+        f"{count_line}"
         "--- GÖREV ve KURALLAR ---\n"
         "1. **Sadece Sağlanan Bilgiyi Kullan:** Cevabını SADECE yukarıdaki bilgilere dayandır.\n"
         "2. **Kısa ve Öz Ol:** Maksimum 3-4 paragraf yaz.\n"
@@ -87,15 +134,80 @@ def build_improved_prompt(question, top_chunks, product_stats):
     )
     return prompt
 
+def format_rating_details(product_stats):
+    """Puan dağılımı ve aylık trendi prompt satırlarına çevirir; bilgi yoksa boş döner"""
+    lines = []
+    distribution = product_stats.get('puanDagilimi')
+    if distribution:
+        lines.append('- Puan Dağılımı: ' + ', '.join(f'{star}★: {count}' for star, count in sorted(distribution.items(), reverse=True)))
+    trend = product_stats.get('aylikTrend')
+    if trend:
+        lines.append('- Aylık Trend: ' + ', '.join(
+            f"{item['donem']} ({item['yorumSayisi']} yorum, {item['ortalamaPuan']}/5)" for item in trend))
+    return ''.join(line + '\n' for line in lines)
+
 def build_prompt(question, top_chunks):
     """Eski prompt fonksiyonu - geriye uyumluluk için"""
     return build_improved_prompt(question, top_chunks, {})
 
-def extract_product_stats(chunks):
+def rating_stats(review_ids, rates, dates, trend_periods=TREND_PERIODS):
+    """
+    Parça sütunlarından (yorum id, puan, tarih) ürün istatistiklerini vektörel olarak hesaplar.
+    Birden fazla parçaya bölünmüş yorumlar tek sayılır; puanı 1-5 dışında olanlar puansız kabul edilir.
+    Aylık trend: son trend_periods ayın yorum sayısı ve ortalama puanı.
+    """
+    review_ids = np.asarray(review_ids)
+    rates = np.asarray(rates, dtype=np.float64)
+    dates = np.asarray(dates)
+
+    # Her yorumun ilk parçası; id'si bilinmeyen parçalar ayrı yorum sayılır
+    known = np.flatnonzero(review_ids >= 0)
+    _, first = np.unique(review_ids[known], return_index=True)
+    first = np.sort(np.concatenate([known[first], np.flatnonzero(review_ids < 0)]))
+    rates = rates[first]
+    dates = dates[first]
+
+    rated = ~np.isnan(rates) & (rates >= 1) & (rates <= 5)
+    stars = np.rint(rates[rated]).astype(np.int64)
+    histogram = np.bincount(stars, minlength=6)[1:6]
+
+    stats = {
+        'ortalamaPuan': round(float(rates[rated].mean()), 1) if rated.any() else 0,
+        'toplamDegerlendirme': int(len(first)),
+        'pozitifYorumlar': int(histogram[3:].sum()),
+        'negatifYorumlar': int(histogram[:2].sum()),
+        'nötrYorumlar': int(histogram[2]),
+        'puansizYorumlar': int((~rated).sum()),
+        'puanDagilimi': {str(star): int(count) for star, count in enumerate(histogram, 1)},
+        'aylikTrend': []
+    }
+
+    # Aylık trend - tarih sütunu gün cinsinden, numpy datetime64 ile aya yuvarlanır
+    dated = rated & (dates != NO_DATE)
+    if dated.any():
+        months = dates[dated].astype('datetime64[D]').astype('datetime64[M]')
+        periods, inverse = np.unique(months, return_inverse=True)
+        counts = np.bincount(inverse)
+        sums = np.bincount(inverse, weights=rates[dated])
+        for period, count, total in list(zip(periods, counts, sums))[-trend_periods:]:
+            stats['aylikTrend'].append({
+                'donem': str(period),
+                'yorumSayisi': int(count),
+                'ortalamaPuan': round(float(total / count), 1)
+            })
+    return stats
+
+def extract_product_stats(chunks, positions=None):
     """
     Yorumlardan ürün istatistiklerini çıkarır
-    Bu fonksiyon yorumların tonunu ve puanlarını analiz eder
+    Parça deposunda (chunks.bin) puan/tarih sütunları varsa istatistikler bu sütunlardan
+    vektörel hesaplanır; positions verilirse sadece o parçalar kullanılır.
+    Eski düz metin listelerinde kelime tabanlı ton analizi yapılır.
     """
+    if hasattr(chunks, 'rates'):
+        select = slice(None) if positions is None else np.asarray(positions, dtype=np.int64)
+        return rating_stats(chunks.review_ids[select], chunks.rates[select], chunks.dates[select])
+
     stats = {
         'ortalamaPuan': 0,
         'toplamDegerlendirme': len(chunks),
@@ -109,13 +221,14 @@ def extract_product_stats(chunks):
     
     # Her yorum parçasını analiz et
     for chunk in chunks:
-        # Rating bilgisi varsa topla
-        if 'rate' in chunk and chunk['rate'] > 0:
-            total_rating += chunk['rate']
+        # Rating bilgisi varsa topla - düz metin parçalarında puan yoktur ('strateji' gibi metinler 'rate' içerebilir)
+        rate = chunk.get('rate') if isinstance(chunk, dict) else None
+        if isinstance(rate, (int, float)) and rate > 0:
+            total_rating += rate
             rating_count += 1
         
         # Yorum tonunu analiz et - Basit kelime tabanlı analiz
-        text = chunk.lower()
+        text = chunk_text(chunk).lower()
         positive_words = ['güzel', 'iyi', 'beğendim', 'memnun', 'kaliteli', 'tavsiye', 'harika', 'mükemmel']
         negative_words = ['kötü', 'berbat', 'memnun değil', 'kırık', 'bozuk', 'iade']
         
@@ -140,55 +253,271 @@ def add_review_count_to_response(response_text, total_chunks, used_chunks):
     review_count_info = f"\n\n---\n📊 **Test Bilgisi**: Bu analiz {used_chunks}/{total_chunks} yorumdan oluşturulmuştur."
     return response_text + review_count_info
 
+def configure_gemini():
+    """.env'deki API anahtarıyla Gemini modelini hazırlar; anahtar yoksa None döner"""
+    load_dotenv()
+    api_key = os.getenv('GEMINI_API_KEY')
+    if not api_key:
+        return None
+    genai.configure(api_key=api_key)
+    return genai.GenerativeModel(GEMINI_MODEL)
+
+def select_chunks(store, key=None, min_rating=None, max_rating=None, since=None):
+    """
+    Puan/tarih ön filtresi: uyan yorumların parçaları veritabanındaki index'lerle bulunur.
+    (parçalar, depodaki sıraları) döner; filtre yoksa tüm parçalar ve None.
+    """
+    if key and (min_rating is not None or max_rating is not None or since):
+        positions = [p for p in review_db.chunk_positions(key, min_rating, max_rating, since) if p < len(store)]
+        return [store[position] for position in positions], positions
+    return store, None
+
+def format_review(i, chunk):
+    """Prompt'taki yorum satırı; eski chunks.json'daki sözlük biçimli yorumlarda puan ve kullanıcı da gösterilir"""
+    if isinstance(chunk, dict):
+        review_text = f"YORUM {i+1}: "
+        if 'comment' in chunk:
+            review_text += chunk['comment']
+        if 'rate' in chunk and chunk['rate'] > 0:
+            review_text += f" (Puan: {chunk['rate']}/5)"
+        if 'user' in chunk and chunk['user'] != 'Anonim':
+            review_text += f" (Kullanıcı: {chunk['user']})"
+        return review_text
+    return f"YORUM {i+1}: {chunk}"
+
+def stream_response(gemini, prompt, on_token, timings=None, start=None):
+    """
+    Gemini yanıtını akış olarak alır, her metin parçasını on_token'a iletir ve tüm metni döndürür.
+    timings verilirse ilk metin parçasına kadar geçen süre start'tan itibaren ttft_ms olarak yazılır.
+    """
+    start = start or time.perf_counter()
+    parts = []
+    for chunk in gemini.generate_content(prompt, stream=True):
+        # Son parça sadece bitiş bilgisi taşıyabilir (metni yoktur)
+        if not chunk.parts:
+            continue
+        text = chunk.text if parts else chunk.text.lstrip()
+        if not text:
+            continue
+        if not parts and timings is not None:
+            timings['ttft_ms'] = round((time.perf_counter() - start) * 1000, 1)
+        parts.append(text)
+        on_token(text)
+    return ''.join(parts)
+
+def answer_questions(questions, gemini, model, index, store, data_dir, key=None, min_rating=None, max_rating=None,
+                     since=None, stored_stats=None, token_budget=None, answer_cache=None, version=None,
+                     concurrency=None, on_token=None):
+    """
+    Soruları aynı ürünün yorumlarıyla yanıtlar: filtre, bağlam seçimi, istatistik, prompt ve Gemini çağrısı.
+    Hem komut satırı hem de sürekli çalışan sorgu servisi (query_service.py) tarafından kullanılır.
+    Sorular tek batch'te vektörleştirilir ve adaylar tek index.search ile bulunur; Gemini çağrıları en fazla
+    concurrency (varsayılan LLM_CONCURRENCY) tanesi aynı anda olacak şekilde paralel yapılır.
+    Prompt'a tüm parçalar değil, token bütçesine sığan en alakalı ve birbirinden farklı parçalar girer
+    (context_builder.py). Soru sırasıyla (yanıt, bağlam bilgisi, süreler) listesi döner; süreler (ms):
+    prompt_ms (ortak LLM öncesi hazırlık), llm_ms, total_ms, önbellekten gelenlerde cache_ms.
+    stored_stats verilmezse eski chunks.json düzeninde stats.json dosyadan okunur.
+    answer_cache (AnswerCache) verilirse aynı ürün, index sürümü (version) ve filtrelerle sorulmuş benzer
+    bir sorunun yanıtı Gemini çağrılmadan döner; bağlam bilgisinde cached / similarity alanları bulunur.
+    on_token verilirse yanıtlar Gemini'den akış olarak alınır ve her metin parçası geldikçe
+    on_token(soru sırası, metin) çağrılır (sondaki yorum sayısı bilgisi de dahil); sürelere ilk parçanın
+    süresi (ttft_ms) yazılır.
+    """
+    start = time.perf_counter()
+    questions = list(questions)
+    q_vecs = model.encode(questions, convert_to_numpy=True)
+    results = [None] * len(questions)
+    timings = [{} for _ in questions]
+
+    # Anlamsal yanıt önbelleği - soru vektörleri bağlam seçiminde de kullanılır
+    scope = None
+    if answer_cache is not None:
+        version = version or index_version(key, data_dir)
+        scope = answer_scope(min_rating=None if min_rating is None else float(min_rating),
+                             max_rating=None if max_rating is None else float(max_rating),
+                             since=since or None, token_budget=token_budget or CONTEXT_TOKEN_BUDGET)
+        for i, question in enumerate(questions):
+            cached = answer_cache.lookup(key or '', version, scope, question, q_vecs[i])
+            if not cached:
+                continue
+            if on_token is not None:
+                on_token(i, cached['answer'])
+            elapsed = round((time.perf_counter() - start) * 1000, 1)
+            timings[i].update(cache_ms=elapsed, total_ms=elapsed)
+            if on_token is not None:
+                timings[i]['ttft_ms'] = elapsed
+            results[i] = (cached['answer'], dict(cached['context'] or {}, cached=True,
+                                                 similarity=cached['similarity'], cached_question=cached['question']))
+
+    pending = [i for i, result in enumerate(results) if result is None]
+    if pending:
+        chunks, positions = select_chunks(store, key, min_rating, max_rating, since)
+
+        # Soruya en alakalı parçaları seç - MMR ile çeşitlendirilir, tekrarlar elenir, token bütçesi doldurulur
+        contexts = build_contexts([questions[i] for i in pending], model, index, store, allowed=positions,
+                                  token_budget=token_budget, q_vecs=q_vecs[pending])
+
+        # Ürün istatistiklerini çıkar - istatistikler seçilen parçalardan değil tüm (filtrelenmiş) yorumlardan hesaplanır
+        product_stats = extract_product_stats(store, positions)
+        if not hasattr(store, 'rates'):
+            # Eski chunks.json'da puan bilgisi yok; index oluşturulurken kaydedilen değerler kullanılır
+            if stored_stats is None:
+                stored_stats = load_stored_stats(data_dir)
+            if stored_stats:
+                product_stats['ortalamaPuan'] = stored_stats['average_rating']
+                product_stats['toplamDegerlendirme'] = stored_stats['review_count']
+
+        # Geliştirilmiş prompt kullan
+        prompts = {}
+        for i, context in zip(pending, contexts):
+            top_chunks = [format_review(n, store[position]) for n, position in enumerate(context['positions'])]
+            prompts[i] = build_improved_prompt(questions[i], top_chunks, product_stats, total_chunks=len(chunks))
+        contexts = dict(zip(pending, contexts))
+        prompt_ms = round((time.perf_counter() - start) * 1000, 1)
+
+        def generate(i):
+            # Gemini ile yanıt al
+            llm_start = time.perf_counter()
+            if on_token is None:
+                response_text = gemini.generate_content(prompts[i]).text
+            else:
+                response_text = stream_response(gemini, prompts[i], lambda text: on_token(i, text), timings[i], start)
+            timings[i].update(prompt_ms=prompt_ms, llm_ms=round((time.perf_counter() - llm_start) * 1000, 1))
+
+            # Cevabın sonuna prompt'a giren parça sayısını ekle
+            context = contexts[i]
+            context_info = {'chunks': len(context['positions']), 'total_chunks': len(chunks),
+                            'candidates': context['candidates'], 'duplicates': context['duplicates'],
+                            'tokens': context['tokens'], 'budget': context['budget']}
+            final_response = add_review_count_to_response(response_text.strip(), len(chunks),
+                                                          len(context['positions']))
+            if on_token is not None:
+                on_token(i, final_response[len(response_text.strip()):])
+            if answer_cache is not None:
+                answer_cache.store(key or '', version, scope, questions[i], q_vecs[i], final_response, context_info)
+            timings[i]['total_ms'] = round((time.perf_counter() - start) * 1000, 1)
+            return final_response, dict(context_info, cached=False)
+
+        workers = max(1, min(concurrency or LLM_CONCURRENCY, len(pending)))
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            for i, result in zip(pending, pool.map(generate, pending)):
+                results[i] = result
+
+    return [(answer, context_info, timing) for (answer, context_info), timing in zip(results, timings)]
+
+def answer_question(question, gemini, model, index, store, data_dir, key=None, min_rating=None, max_rating=None,
+                    since=None, stored_stats=None, timings=None, token_budget=None, answer_cache=None,
+                    version=None, on_token=None):
+    """
+    Tek soruyu yanıtlar (answer_questions); (yanıt, bağlam bilgisi) döner.
+    timings sözlüğü verilirse LLM öncesi hazırlık ve LLM süreleri (ms) yazılır.
+    on_token verilirse yanıt parçaları geldikçe on_token(metin) çağrılır.
+    """
+    answer, context_info, question_timings = answer_questions(
+        [question], gemini, model, index, store, data_dir, key, min_rating, max_rating, since,
+        stored_stats=stored_stats, token_budget=token_budget, answer_cache=answer_cache, version=version,
+        on_token=(lambda i, text: on_token(text)) if on_token is not None else None)[0]
+    if timings is not None:
+        timings.update(question_timings)
+    return answer, context_info
+
+def write_event(event_type, **fields):
+    """Akış modunda stdout'a bir NDJSON satırı yazar (server.js satır satır okur)"""
+    print(json.dumps({'type': event_type, **fields}, ensure_ascii=False), flush=True)
+
 def main():
     parser = argparse.ArgumentParser()
-    parser.add_argument('--question', required=True, help='Kullanıcı sorusu')
+    parser.add_argument('--question', action='append', default=[],
+                        help='Kullanıcı sorusu (birden fazla soru için tekrarlanabilir)')
+    parser.add_argument('--questions-file', help='Her satırında bir soru bulunan dosya (toplu yanıtlama)')
+    parser.add_argument('--product', help="Ürün anahtarı veya en son çekilen ürün için 'latest'")
+    parser.add_argument('--product-url', help='Ürün URL\'si (anahtar URL\'den üretilir)')
+    parser.add_argument('--min-rating', type=float, help='Sadece bu puan ve üstündeki yorumları kullan (ürün modu)')
+    parser.add_argument('--max-rating', type=float, help='Sadece bu puan ve altındaki yorumları kullan (ürün modu)')
+    parser.add_argument('--since', help='Sadece bu tarihten (YYYY-MM-DD) sonraki yorumları kullan (ürün modu)')
+    parser.add_argument('--token-budget', type=int, help='Prompt\'a giren yorumlar için token bütçesi')
+    parser.add_argument('--no-answer-cache', action='store_true', help='Benzer sorular için kayıtlı yanıtları kullanma')
+    parser.add_argument('--stream', action='store_true',
+                        help='Yanıtı geldikçe NDJSON satırları olarak yaz ({"type": "token"} ... {"type": "done"})')
+    parser.add_argument('--concurrency', type=int, help=f'Toplu sorularda aynı anda en fazla Gemini çağrısı '
+                                                        f'(varsayılan {LLM_CONCURRENCY})')
     args = parser.parse_args()
+    start = time.perf_counter()
+
+    questions = list(args.question)
+    if args.questions_file:
+        with open(args.questions_file, 'r', encoding='utf-8') as f:
+            questions += [line.strip() for line in f if line.strip()]
+    if not questions:
+        parser.error('--question veya --questions-file gereklidir')
+    if args.stream and len(questions) > 1:
+        parser.error('--stream tek soruyla kullanılabilir')
+
+    # Ürün belirtildiyse önceden indekslenmiş olmalı; değilse çağıran taraf çekip indekslemeli
+    # 'latest' istendiği halde henüz ürün çekilmemişse eski tek dosyalı index kullanılır
+    data_dir = None
+    key = None
+    if (args.product or args.product_url) and not use_legacy(args.product, args.product_url):
+        try:
+            key = resolve_product(args.product, args.product_url)
+        except ValueError as e:
+            parser.error(str(e))
+        if not key or not is_indexed(key):
+            print(f"Ürün henüz indekslenmemiş: {key or args.product}", flush=True)
+            exit(EXIT_NOT_INDEXED)
+        data_dir = product_dir(key)
 
     # .env'den API anahtarını yükle
-    load_dotenv()
-    api_key = os.getenv('GEMINI_API_KEY')
-    if not api_key:
+    gemini = configure_gemini()
+    if gemini is None:
         print('Gemini API anahtarı .env dosyasında bulunamadı.', flush=True)
         exit(1)
-    genai.configure(api_key=api_key)
 
-    # Model ve indexleri yükle
-    model = SentenceTransformer('all-MiniLM-L6-v2')
-    index, chunks = load_index_and_chunks()
-
-    # Tüm yorumları detaylı formatla
-    all_reviews = []
-    for i, chunk in enumerate(chunks):
-        if isinstance(chunk, dict):
-            # Dictionary formatındaki yorumları detaylı göster
-            review_text = f"YORUM {i+1}: "
-            if 'comment' in chunk:
-                review_text += chunk['comment']
-            if 'rate' in chunk and chunk['rate'] > 0:
-                review_text += f" (Puan: {chunk['rate']}/5)"
-            if 'user' in chunk and chunk['user'] != 'Anonim':
-                review_text += f" (Kullanıcı: {chunk['user']})"
-            all_reviews.append(review_text)
-        elif isinstance(chunk, str):
-            all_reviews.append(f"YORUM {i+1}: {chunk}")
-    
-    # Tüm yorumları birleştir
-    top_chunks = all_reviews
-    
-    # Ürün istatistiklerini çıkar
-    product_stats = extract_product_stats(chunks)
-    
-    # Geliştirilmiş prompt kullan
-    prompt = build_improved_prompt(args.question, top_chunks, product_stats)
+    # Model ve indexleri yükle - arka uç (torch / onnx / onnx-int8) EMBEDDING_BACKEND ile seçilir
+    model = load_embedding_model()
+    # Sürüm index'ten önce okunur: arada yeniden indekslenirse yanıt eski sürüme yazılır ve bir daha kullanılmaz
+    data_dir = data_dir or os.path.dirname(os.path.abspath(__file__))
+    version = index_version(key, data_dir)
+    index, chunks = load_index_and_chunks(data_dir)
+    if key:
+        # IVF index'lerinde taranacak küme sayısı (nprobe) gibi ayarlar index oluşturulurken seçilir
+        apply_search_params(index, load_manifest(key).get('search_params'))
 
-    # Gemini ile yanıt al
-    gemini = genai.GenerativeModel('gemini-1.5-pro')
-    response = gemini.generate_content(prompt)
-    
-    # Cevabın sonuna yorum sayısını ekle
-    final_response = add_review_count_to_response(response.text.strip(), len(chunks), len(top_chunks))
-    print(final_response)
+    answer_cache = AnswerCache(embedding_identity()) if ANSWER_CACHE_ENABLED and not args.no_answer_cache else None
+    timings = {'load_ms': round((time.perf_counter() - start) * 1000, 1)}
+    if len(questions) > 1:
+        # Toplu yanıtlama: sonuçlar tek satır JSON olarak yazılır (server.js son satırı okur)
+        try:
+            results = answer_questions(questions, gemini, model, index, chunks, data_dir, key, args.min_rating,
+                                       args.max_rating, args.since, token_budget=args.token_budget,
+                                       answer_cache=answer_cache, version=version, concurrency=args.concurrency)
+        finally:
+            if answer_cache is not None:
+                answer_cache.close()
+        timings['total_ms'] = round((time.perf_counter() - start) * 1000, 1)
+        print(json.dumps({'product': key, 'timings': timings, 'results': [
+            {'question': question, 'answer': answer, 'context': context_info, 'timings': question_timings}
+            for question, (answer, context_info, question_timings) in zip(questions, results)]}, ensure_ascii=False))
+        return
+
+    on_token = (lambda text: write_event('token', text=text)) if args.stream else None
+    try:
+        final_response, context_info = answer_question(questions[0], gemini, model, index, chunks, data_dir, key,
+                                                       args.min_rating, args.max_rating, args.since,
+                                                       timings=timings, token_budget=args.token_budget,
+                                                       answer_cache=answer_cache, version=version,
+                                                       on_token=on_token)
+    finally:
+        if answer_cache is not None:
+            answer_cache.close()
+    if not args.stream:
+        print(final_response)
+        return
+    # İlk parça ve toplam süre script başından (model ve index yükleme dahil) ölçülür
+    if 'ttft_ms' in timings:
+        timings['ttft_ms'] = round(timings['ttft_ms'] + timings['load_ms'], 1)
+    timings['total_ms'] = round((time.perf_counter() - start) * 1000, 1)
+    write_event('done', answer=final_response, context=context_info, timings=timings)
 
 if __name__ == "__main__":
     main()
@@ -1,36 +1,51 @@
 import argparse
-import json
 import os
 import faiss
-import numpy as np
-from sentence_transformers import SentenceTransformer
 
-def load_index_and_chunks():
-    # Script'in bulunduğu dizini al
-    script_dir = os.path.dirname(os.path.abspath(__file__))
-    
-    index_path = os.path.join(script_dir, 'index.faiss')
-    chunks_path = os.path.join(script_dir, 'chunks.json')
+from ann_index import apply_search_params, index_metric, prepare_vectors
+from artifact_store import (CHUNKS_FILE, INDEX_FILE, LEGACY_CHUNKS_FILE, is_indexed, load_manifest,
+                            product_dir, resolve_product)
+from chunk_store import chunks_for_ids, open_chunks
+from embedding_backends import load_embedding_model
+
+def load_index_and_chunks(key=None):
+    # Ürün belirtildiyse ürünün depo dizini (products/<key>/), belirtilmediyse script'in bulunduğu dizin
+    data_dir = product_dir(key) if key else os.path.dirname(os.path.abspath(__file__))
     
-    index = faiss.read_index(index_path)
-    with open(chunks_path, 'r', encoding='utf-8') as f:
-        chunks = json.load(f)
+    index = faiss.read_index(os.path.join(data_dir, INDEX_FILE))
+    if key:
+        # Üretimdeki gibi index oluşturulurken seçilen arama ayarları (nprobe, efSearch...) uygulanır
+        apply_search_params(index, load_manifest(key).get('search_params'))
+    # chunks.bin varsa mmap ile açılır, yoksa chunks.json yüklenir
+    chunks = open_chunks(data_dir, CHUNKS_FILE, LEGACY_CHUNKS_FILE)
     return index, chunks
 
 def get_top_chunks(question, model, index, chunks, top_k=5):
-    q_vec = model.encode([question], convert_to_numpy=True)
+    q_vec = prepare_vectors(model.encode([question], convert_to_numpy=True), index_metric(index))
     D, I = index.search(q_vec, top_k)
-    top_chunks = [chunks[i] for i in I[0]]
+    top_chunks = chunks_for_ids(chunks, I[0])
     return top_chunks
 
 def main():
     parser = argparse.ArgumentParser()
     parser.add_argument('--question', required=True, help='Kullanıcı sorusu')
+    parser.add_argument('--product', help="Ürün anahtarı veya en son çekilen ürün için 'latest'")
+    parser.add_argument('--product-url', help='Ürün URL\'si (anahtar URL\'den üretilir)')
     args = parser.parse_args()
 
+    key = None
+    if args.product or args.product_url:
+        try:
+            key = resolve_product(args.product, args.product_url)
+        except ValueError as e:
+            parser.error(str(e))
+        if not key or not is_indexed(key):
+            print(f"Ürün henüz indekslenmemiş: {key or args.product}")
+            exit(1)
+
     # Model ve indexleri yükle
-    model = SentenceTransformer('all-MiniLM-L6-v2')
-    index, chunks = load_index_and_chunks()
+    model = load_embedding_model()
+    index, chunks = load_index_and_chunks(key)
 
     # En alakalı 5 chunk'ı bul
     top_chunks = get_top_chunks(args.question, model, index, chunks, top_k=5)
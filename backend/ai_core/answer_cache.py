@@ -0,0 +1,151 @@
+# Akilli Yorum Asistani - Anlamsal Yanıt Önbelleği
+# Bu dosya Gemini yanıtlarını soru embedding'iyle birlikte SQLite'ta saklar
+# Aynı ürün ve index sürümünde benzerliği eşiğin üstünde olan bir soru daha önce yanıtlandıysa Gemini çağrılmaz
+# Ürün yeniden indekslenince (index sürümü değişince) ürünün eski yanıtları geçersiz olur; TTL ve LRU ile sınırlanır
+# Hackathon Projesi - AI Destekli Yorum Analizi
+
+import json
+import os
+import sqlite3
+import threading
+import time
+
+import numpy as np
+
+CACHE_PATH = os.getenv('ANSWER_CACHE_PATH',
+                       os.path.join(os.path.dirname(os.path.abspath(__file__)), 'answers.db'))
+
+# Önbellek ayarları - ortam değişkenleri ile değiştirilebilir
+# Eşik: soru embedding'leri arasındaki cosine benzerliği; düşük eşik farklı soruları aynı sayabilir
+# ("kargo hızlı mı" / "kargo yavaş mı"), bu yüzden yüksek tutulur
+ANSWER_CACHE_ENABLED = os.getenv('ANSWER_CACHE', '1') != '0'
+ANSWER_CACHE_THRESHOLD = float(os.getenv('ANSWER_CACHE_THRESHOLD', '0.92'))
+ANSWER_CACHE_TTL = int(os.getenv('ANSWER_CACHE_TTL', '86400'))              # saniye
+ANSWER_CACHE_MAX_ENTRIES = int(os.getenv('ANSWER_CACHE_MAX_ENTRIES', '5000'))
+BUSY_TIMEOUT_MS = 10000
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS answers (
+    id INTEGER PRIMARY KEY,
+    product TEXT NOT NULL,
+    index_version TEXT NOT NULL,
+    scope TEXT NOT NULL,
+    model TEXT NOT NULL,
+    question TEXT NOT NULL,
+    vector BLOB NOT NULL,
+    answer TEXT NOT NULL,
+    context TEXT,
+    created_at REAL NOT NULL,
+    last_used_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS answers_lookup ON answers (product, index_version, scope, model);
+CREATE INDEX IF NOT EXISTS answers_last_used ON answers (last_used_at);
+"""
+
+
+def normalize_question(question):
+    """Büyük/küçük harf ve boşluk farklarını yok sayar (aynı soru her zaman isabet eder)"""
+    return ' '.join(question.casefold().split())
+
+
+def answer_scope(**options):
+    """Yanıtı etkileyen seçenekler (puan/tarih filtresi, token bütçesi); farklı kapsamdaki yanıtlar paylaşılmaz"""
+    return json.dumps({name: value for name, value in options.items() if value is not None}, sort_keys=True)
+
+
+class AnswerCache:
+    """
+    Ürün + index sürümü + kapsam + embedding modeli başına soru/yanıt kayıtları.
+    lookup soru vektörüne en benzer kaydı bulur; benzerlik eşiğin altındaysa None döner.
+    Bağlantı sorgu servisinin thread'leri arasında paylaşılır, erişim kilitle sıralanır.
+    Sayaçlar bu süreçteki isabet/ıskalama sayılarını tutar.
+    """
+
+    def __init__(self, model_name, path=None, threshold=ANSWER_CACHE_THRESHOLD, ttl=ANSWER_CACHE_TTL,
+                 max_entries=ANSWER_CACHE_MAX_ENTRIES):
+        self.model_name = model_name
+        self.threshold = threshold
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.stats = {'hits': 0, 'misses': 0, 'stores': 0, 'invalidated': 0, 'evictions': 0}
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path or CACHE_PATH, timeout=BUSY_TIMEOUT_MS / 1000, check_same_thread=False)
+        self._conn.execute('PRAGMA journal_mode=WAL')
+        self._conn.execute('PRAGMA synchronous=NORMAL')
+        self._conn.executescript(SCHEMA)
+
+    def lookup(self, product, index_version, scope, question, vector):
+        """
+        En benzer önceki soruyu arar. İsabette {'answer', 'context', 'question', 'similarity'} döner.
+        Süresi dolmuş kayıtlar dikkate alınmaz.
+        """
+        vector = _unit(vector)
+        normalized = normalize_question(question)
+        with self._lock:
+            rows = self._conn.execute(
+                'SELECT id, question, vector, answer, context FROM answers '
+                'WHERE product = ? AND index_version = ? AND scope = ? AND model = ? AND created_at >= ?',
+                (product, index_version, scope, self.model_name, time.time() - self.ttl)
+            ).fetchall()
+            if not rows:
+                self.stats['misses'] += 1
+                return None
+            vectors = np.vstack([np.frombuffer(row[2], dtype=np.float32) for row in rows])
+            similarities = vectors @ vector
+            for i, row in enumerate(rows):
+                if normalize_question(row[1]) == normalized:
+                    similarities[i] = 1.0
+            best = int(np.argmax(similarities))
+            if similarities[best] < self.threshold:
+                self.stats['misses'] += 1
+                return None
+            row = rows[best]
+            with self._conn:
+                self._conn.execute('UPDATE answers SET last_used_at = ? WHERE id = ?', (time.time(), row[0]))
+            self.stats['hits'] += 1
+        return {'answer': row[3], 'context': json.loads(row[4]) if row[4] else None,
+                'question': row[1], 'similarity': round(float(similarities[best]), 4)}
+
+    def store(self, product, index_version, scope, question, vector, answer, context=None):
+        """
+        Yanıtı kaydeder. Ürünün başka index sürümüne ait kayıtları (yeniden indekslemeden önceki yanıtlar)
+        ve süresi dolanlar silinir; toplam kayıt sayısı sınırı aşılırsa en uzun süredir kullanılmayanlar atılır.
+        """
+        now = time.time()
+        with self._lock, self._conn:
+            invalidated = self._conn.execute('DELETE FROM answers WHERE product = ? AND index_version != ?',
+                                             (product, index_version)).rowcount
+            self._conn.execute('DELETE FROM answers WHERE created_at < ?', (now - self.ttl,))
+            self._conn.execute(
+                'INSERT INTO answers (product, index_version, scope, model, question, vector, answer, context, '
+                'created_at, last_used_at) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)',
+                (product, index_version, scope, self.model_name, question, _unit(vector).tobytes(), answer,
+                 json.dumps(context, ensure_ascii=False) if context is not None else None, now, now)
+            )
+            evicted = self._conn.execute(
+                'DELETE FROM answers WHERE id IN (SELECT id FROM answers ORDER BY last_used_at DESC LIMIT -1 OFFSET ?)',
+                (self.max_entries,)
+            ).rowcount
+            self.stats['stores'] += 1
+            self.stats['invalidated'] += invalidated
+            self.stats['evictions'] += evicted
+
+    def invalidate(self, product):
+        """Ürünün tüm yanıtlarını siler"""
+        with self._lock, self._conn:
+            self.stats['invalidated'] += self._conn.execute('DELETE FROM answers WHERE product = ?',
+                                                            (product,)).rowcount
+
+    def close(self):
+        self._conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+
+def _unit(vector):
+    vector = np.asarray(vector, dtype=np.float32).reshape(-1)
+    return vector / max(float(np.linalg.norm(vector)), 1e-12)
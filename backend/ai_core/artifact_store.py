@@ -0,0 +1,168 @@
+# Akilli Yorum Asistani - Ürün Bazlı Veri Deposu
+# Bu dosya her ürünün metin parçalarını, FAISS index'ini ve istatistiklerini ayrı bir dizinde tutar
+# Dizin düzeni: products/<ürün anahtarı>/{chunks.bin, index.faiss, stats.json, manifest.json}
+# Yorumların kendisi aynı ürün anahtarıyla yorum veritabanında (review_db) tutulur
+# Daha önce indekslenmiş ürünler yeniden çekilmeden sorgulanabilir, birden çok ürün yan yana durabilir
+# Hackathon Projesi - AI Destekli Yorum Analizi
+
+import hashlib
+import json
+import os
+import re
+import time
+from urllib.parse import urlparse, parse_qs
+
+PRODUCTS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'products')
+
+# Ürün deposundan önceki tek dosyalı düzen: index.faiss / chunks / reviews.json ai_core dizinindedir
+LEGACY_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# Ürün dizinindeki dosya adları
+CHUNKS_FILE = 'chunks.bin'          # mmap ile açılan parça deposu (chunk_store)
+LEGACY_CHUNKS_FILE = 'chunks.json'  # eski düz JSON listesi
+INDEX_FILE = 'index.faiss'
+STATS_FILE = 'stats.json'
+MANIFEST_FILE = 'manifest.json'
+
+# En son çekilen ürünün anahtarını tutan işaretçi dosyası
+LATEST_POINTER = 'latest.json'
+LATEST = 'latest'
+
+# Ürün kodları: Trendyol "-p-123456", Hepsiburada "-p-HBCV0000108KND"
+PRODUCT_CODE_PATTERN = re.compile(r'-p-([A-Za-z0-9]+)')
+
+# Geçerli ürün anahtarı (product_key çıktısı): küçük harf, rakam, '-' ve '_'; dizin adı olarak güvenlidir
+PRODUCT_KEY_PATTERN = re.compile(r'[a-z0-9][a-z0-9_-]*')
+
+
+def product_key(url):
+    """
+    Ürün URL'sinden dizin adı olarak kullanılabilir kararlı bir anahtar üretir.
+    Site adı + ürün kodu (+ satıcı) kullanılır; ürün kodu bulunamazsa URL'nin hash'i kullanılır.
+    """
+    parsed = urlparse(url.strip())
+    host = (parsed.hostname or '').lower()
+    site = host.replace('www.', '').split('.')[0] or 'site'
+
+    query = parse_qs(parsed.query)
+    seller = (query.get('merchantId') or query.get('magaza') or [None])[0]
+
+    match = PRODUCT_CODE_PATTERN.search(parsed.path)
+    if match:
+        code = match.group(1).lower()
+    else:
+        code = hashlib.sha1(f'{host}{parsed.path.rstrip("/")}'.encode('utf-8')).hexdigest()[:16]
+
+    key = f'{site}-{code}'
+    if seller:
+        key += '-' + re.sub(r'[^a-zA-Z0-9]+', '-', seller).strip('-').lower()
+    return key
+
+
+def is_valid_key(key):
+    """Anahtar product_key biçiminde mi (ör. '../x' gibi depo dışına çıkan değerler geçersizdir)"""
+    return isinstance(key, str) and PRODUCT_KEY_PATTERN.fullmatch(key) is not None
+
+
+def product_dir(key, create=False):
+    """Ürünün artefakt dizinini döndürür; geçersiz anahtarda ValueError"""
+    if not is_valid_key(key):
+        raise ValueError(f'Geçersiz ürün anahtarı: {key!r}')
+    path = os.path.join(PRODUCTS_DIR, key)
+    if create:
+        os.makedirs(path, exist_ok=True)
+    return path
+
+
+def artifact_path(key, name, create=False):
+    """Ürün dizinindeki bir dosyanın tam yolunu döndürür"""
+    return os.path.join(product_dir(key, create), name)
+
+
+def write_json_atomic(path, data):
+    """JSON verisini geçici dosyaya yazıp atomik olarak yerine taşır"""
+    tmp_path = f'{path}.tmp'
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(data, f, ensure_ascii=False, indent=2)
+    os.replace(tmp_path, path)
+
+
+def _read_json(path):
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def load_manifest(key):
+    """Ürünün manifest'ini yükler; yoksa boş sözlük döner"""
+    return _read_json(artifact_path(key, MANIFEST_FILE)) or {}
+
+
+def update_manifest(key, **fields):
+    """Manifest'e verilen alanları ekler/günceller ve güncel manifest'i döndürür"""
+    manifest = load_manifest(key)
+    manifest.update(fields)
+    manifest['key'] = key
+    manifest['updated_at'] = time.strftime('%Y-%m-%dT%H:%M:%S')
+    write_json_atomic(artifact_path(key, MANIFEST_FILE, create=True), manifest)
+    return manifest
+
+
+def is_indexed(key):
+    """Ürün için sorgulamaya hazır index ve metin parçaları varsa True döner"""
+    if not load_manifest(key).get('indexed_at'):
+        return False
+    return all(os.path.exists(artifact_path(key, name)) for name in (INDEX_FILE, CHUNKS_FILE))
+
+
+def set_latest(key):
+    """En son işlenen ürünü işaretler (ürün belirtilmeyen sorgular için)"""
+    os.makedirs(PRODUCTS_DIR, exist_ok=True)
+    write_json_atomic(os.path.join(PRODUCTS_DIR, LATEST_POINTER), {'key': key})
+
+
+def get_latest():
+    """En son işaretlenen ürünün anahtarını döndürür; yoksa None"""
+    pointer = _read_json(os.path.join(PRODUCTS_DIR, LATEST_POINTER))
+    key = pointer.get('key') if pointer else None
+    return key if is_valid_key(key) else None
+
+
+def resolve_product(product=None, product_url=None):
+    """
+    Komut satırı argümanlarından ürün anahtarını çözer.
+    product 'latest' ise en son ürün kullanılır; ikisi de verilmezse None döner.
+    product anahtar biçiminde değilse ValueError (HTTP'de 400) verilir.
+    """
+    if product_url:
+        return product_key(product_url)
+    if product == LATEST:
+        return get_latest()
+    if product and not is_valid_key(product):
+        raise ValueError(f'Geçersiz ürün anahtarı: {product!r}')
+    return product
+
+
+def use_legacy(product=None, product_url=None):
+    """
+    Eski tek dosyalı index kullanılmalı mı: ürün belirtilmemişse ya da 'latest' istendiği halde henüz
+    hiç ürün çekilmemişse (latest.json yok) ve LEGACY_DIR'de index.faiss varsa True döner.
+    """
+    if product_url or (product and product != LATEST):
+        return False
+    if product == LATEST and get_latest():
+        return False
+    return os.path.exists(os.path.join(LEGACY_DIR, INDEX_FILE))
+
+
+def list_products():
+    """Depodaki tüm ürünlerin manifest'lerini döndürür"""
+    if not os.path.isdir(PRODUCTS_DIR):
+        return []
+    manifests = []
+    for key in sorted(os.listdir(PRODUCTS_DIR)):
+        if is_valid_key(key) and os.path.isdir(product_dir(key)):
+            manifests.append(dict(load_manifest(key), key=key))
+    return manifests
@@ -0,0 +1,170 @@
+# Akilli Yorum Asistani - ANN Index Karşılaştırma Aracı
+# Bu dosya Flat, IVF-Flat, IVF-PQ (yeniden sıralamalı ve sıralamasız) ve HNSW index'lerini (float32 / fp16 / int8 depolamayla) farklı derlem boyutlarında karşılaştırır
+# Her yapılandırma için kurulum süresi, sorgu başına gecikme ve tam aramaya göre recall@k ölçülür
+# ann_index.py'deki eşikler ve nprobe değerleri bu raporla belirlenir (ANN_BENCHMARK.md)
+# Hackathon Projesi - AI Destekli Yorum Analizi
+
+import argparse
+import platform
+import sqlite3
+import time
+
+import faiss
+import numpy as np
+
+from ann_index import (HNSW_NEIGHBORS, MAX_TRAIN_SAMPLE, METRICS, PQ_BITS, PQ_DIMS_PER_CODE, SQ_TRAIN_SAMPLE,
+                       TRAIN_POINTS_PER_LIST, factory_string, ivf_nlist, plan_index, prepare_vectors)
+from embedding_cache import CACHE_PATH
+
+DIM = 384  # all-MiniLM-L6-v2
+
+
+def load_cached_embeddings(limit, path=CACHE_PATH):
+    """Embedding önbelleğindeki gerçek yorum vektörlerini yükler (yoksa boş dizi)"""
+    try:
+        conn = sqlite3.connect(path)
+        rows = conn.execute('SELECT vector FROM embeddings LIMIT ?', (limit,)).fetchall()
+        conn.close()
+    except sqlite3.Error:
+        return np.empty((0, DIM), dtype=np.float32)
+    if not rows:
+        return np.empty((0, DIM), dtype=np.float32)
+    return np.vstack([np.frombuffer(row[0], dtype=np.float32) for row in rows])
+
+
+def synthetic_embeddings(count, dim=DIM, latent_dim=48, reviews_per_topic=20, noise=1.15, seed=0):
+    """
+    Cümle embedding'lerine benzeyen sentetik veri: düşük boyutlu bir uzayda konu merkezleri (konu başına
+    ortalama reviews_per_topic nokta) etrafında gürültülü noktalar, rastgele bir dönüşümle dim boyuta
+    taşınıp birim uzunluğa normalize edilir.
+    Gerçek embedding'lerin iç boyutu da vektör boyutundan çok düşüktür; izotropik gürültü ANN için gerçekçi değildir.
+    """
+    rng = np.random.default_rng(seed)
+    topics = max(1, count // reviews_per_topic)
+    centers = rng.standard_normal((topics, latent_dim)).astype(np.float32)
+    labels = rng.integers(0, topics, count)
+    latent = centers[labels] + noise * rng.standard_normal((count, latent_dim)).astype(np.float32)
+    projection, _ = np.linalg.qr(rng.standard_normal((dim, latent_dim)).astype(np.float32))
+    vectors = latent @ projection.T + 0.02 * rng.standard_normal((count, dim)).astype(np.float32)
+    vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+    return vectors
+
+
+def recall_at_k(found, truth, k):
+    """Tam aramadaki ilk k sonucun ne kadarının bulunduğu (ortalama)"""
+    hits = sum(len(np.intersect1d(f[:k], t[:k])) for f, t in zip(found, truth))
+    return hits / (k * len(truth))
+
+
+def time_queries(index, queries, k):
+    """Sorguları tek tek arar (sunucudaki gibi); sorgu başına ortalama ms ve sonuçları döndürür"""
+    results = np.empty((len(queries), k), dtype=np.int64)
+    start = time.perf_counter()
+    for i in range(len(queries)):
+        _, I = index.search(queries[i:i + 1], k)
+        results[i] = I[0]
+    return (time.perf_counter() - start) * 1000 / len(queries), results
+
+
+INDEX_TYPES = ('flat', 'ivf_flat', 'ivf_pq', 'ivf_pq_rf', 'hnsw')
+# IVF-PQ + RFlat için denenecek yeniden sıralama katsayıları (k_factor_rf)
+REFINE_K_FACTORS = (2, 4, 8, 16)
+# Skaler nicemleme karşılaştırması için: --index-types flat,flat_fp16,flat_int8,hnsw,hnsw_fp16,hnsw_int8
+STORAGE_VARIANTS = ('flat_fp16', 'flat_int8', 'hnsw_fp16', 'hnsw_int8')
+
+
+def configurations(size, index_types=INDEX_TYPES):
+    """Boyut için denenecek (tür, factory, arama parametresi adı, değerler) listesi"""
+    nlist = ivf_nlist(size)
+    probes = sorted({p for p in (1, 4, 8, 16, nlist // 32, nlist // 16, nlist // 8) if 1 <= p <= nlist})
+    ef_values = [16, 32, 64, 128]
+    # Yeniden sıralamalı IVF-PQ'da iki parametre birlikte değişir; değerler ParameterSpace tanımı olarak verilir
+    refine_values = [f'nprobe={p},k_factor_rf={f}' for p in (nlist // 16, nlist // 8, nlist // 4) if p >= 1
+                     for f in REFINE_K_FACTORS]
+    candidates = [
+        ('flat', 'Flat', None, [None]),
+        ('ivf_flat', f'IVF{nlist},Flat', 'nprobe', probes),
+        ('ivf_pq', f'IVF{nlist},PQ{DIM // PQ_DIMS_PER_CODE}x{PQ_BITS}np', 'nprobe', probes),
+        ('ivf_pq_rf', factory_string({'type': 'ivf_pq', 'nlist': nlist}, DIM).replace('IDMap,', ''), None,
+         refine_values),
+        ('hnsw', f'HNSW{HNSW_NEIGHBORS}', 'efSearch', ef_values),
+    ]
+    # Üretimdeki tanımlar IDMap ile sarılıdır; burada id gerekmediği için IDMap kaldırılır
+    for variant in STORAGE_VARIANTS:
+        index_type, storage = variant.split('_')
+        factory = factory_string({'type': index_type, 'storage': storage}, DIM).replace('IDMap,', '')
+        candidates.append((variant, factory, 'efSearch' if index_type == 'hnsw' else None,
+                           ef_values if index_type == 'hnsw' else [None]))
+    return [candidate for candidate in candidates if candidate[0] in index_types]
+
+
+def run(sizes, queries_count, k, use_cache, index_types=INDEX_TYPES, metric='l2'):
+    max_size = max(sizes)
+    data = load_cached_embeddings(max_size + queries_count) if use_cache else np.empty((0, DIM))
+    synthetic = len(data) < max_size + queries_count
+    source = ('sentetik kümelenmiş vektörler (48 boyutlu uzayda konu başına ~20 nokta, birim uzunluk)'
+              if synthetic else 'önbellekteki gerçek embedding\'ler')
+
+    print('# ANN index karşılaştırması\n')
+    print(f'- Veri: {source}, boyut {DIM}')
+    print(f'- Sorgu: {queries_count} sorgu, tek tek, k={k}')
+    print(f'- Metrik: {metric}' + (' (normalize edilmiş vektörler, iç çarpım)' if metric == 'cosine' else ''))
+    print(f'- Ortam: {platform.processor() or platform.machine()}, faiss {faiss.__version__}, '
+          f'{faiss.omp_get_max_threads()} thread\n')
+
+    for size in sizes:
+        # Sentetik veri her boyut için ayrı üretilir, böylece konu yoğunluğu boyuttan bağımsız kalır
+        if synthetic:
+            data = synthetic_embeddings(size + queries_count)
+        queries = prepare_vectors(data[:queries_count], metric)
+        vectors = prepare_vectors(data[queries_count:queries_count + size], metric)
+        faiss_metric = faiss.METRIC_INNER_PRODUCT if metric == 'cosine' else faiss.METRIC_L2
+        flat = faiss.IndexFlat(DIM, faiss_metric)
+        flat.add(vectors)
+        _, truth = flat.search(queries, k)
+
+        print(f'## {size} parça (plan: {plan_index(size)["type"]})\n')
+        print('| Index | Parametre | Kurulum (s) | Bellek (MB) | Gecikme (ms/sorgu) | recall@%d |' % k)
+        print('|---|---|---|---|---|---|')
+        for _, factory, param, values in configurations(size, index_types):
+            start = time.perf_counter()
+            index = faiss.index_factory(DIM, factory, faiss_metric)
+            if not index.is_trained:
+                if factory.startswith('IVF'):
+                    train_size = min(MAX_TRAIN_SAMPLE, faiss.extract_index_ivf(index).nlist * TRAIN_POINTS_PER_LIST, size)
+                else:
+                    train_size = min(SQ_TRAIN_SAMPLE, size)
+                sample = vectors[np.random.default_rng(1).choice(size, train_size, replace=False)]
+                index.train(sample)
+            index.add(vectors)
+            build_time = time.perf_counter() - start
+            memory = len(faiss.serialize_index(index)) / 2 ** 20
+
+            for value in values:
+                if param:
+                    faiss.ParameterSpace().set_index_parameter(index, param, value)
+                elif value:
+                    faiss.ParameterSpace().set_index_parameters(index, value)
+                latency, found = time_queries(index, queries, k)
+                label = f'{param}={value}' if param else (value or '-')
+                print(f'| {factory} | {label} | {build_time:.1f} | {memory:.0f} | {latency:.2f} | '
+                      f'{recall_at_k(found, truth, k):.3f} |')
+        print()
+
+
+def main():
+    parser = argparse.ArgumentParser(description='FAISS index türlerini recall@k ve gecikmeye göre karşılaştırır')
+    parser.add_argument('--sizes', default='10000,50000,200000', help='Virgülle ayrılmış parça sayıları')
+    parser.add_argument('--queries', type=int, default=200, help='Sorgu sayısı')
+    parser.add_argument('-k', type=int, default=10, help='recall@k için k')
+    parser.add_argument('--synthetic', action='store_true', help='Önbellekteki embedding\'ler yerine sentetik veri kullan')
+    parser.add_argument('--index-types', default=','.join(INDEX_TYPES),
+                        help=f'Karşılaştırılacak index türleri ({", ".join(INDEX_TYPES + STORAGE_VARIANTS)})')
+    parser.add_argument('--metric', choices=METRICS, default='l2', help='Benzerlik metriği')
+    args = parser.parse_args()
+    run([int(size) for size in args.sizes.split(',')], args.queries, args.k, not args.synthetic,
+        args.index_types.split(','), args.metric)
+
+
+if __name__ == '__main__':
+    main()
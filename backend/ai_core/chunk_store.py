@@ -0,0 +1,284 @@
+# Akilli Yorum Asistani - Bellek Eşlemeli (mmap) Metin Parçası Deposu
+# Bu dosya metin parçalarını index.faiss'in yanında tek bir ikili dosyada (chunks.bin) tutar
+# Açılış sadece başlığı okur; index.search'ün döndürdüğü k parça için sadece o k kayıt diskten okunur
+# Hackathon Projesi - AI Destekli Yorum Analizi
+#
+# Dosya düzeni (little-endian):
+#   başlık (128 byte, sürüm 1-2'de 64 byte): MAGIC, sürüm, parça sayısı ve bölümlerin dosya içindeki konumları
+#   blob:        tüm parçaların art arda UTF-8 metni
+#   offsets:     uint64[count + 1] - i. parça blob[offsets[i]:offsets[i + 1]]
+#   review_id:   int64[count]      - parçanın geldiği yorum (veritabanı satırı veya akıştaki sırası, -1: bilinmiyor)
+#   rate:        float32[count]    - yorumun puanı (NaN: bilinmiyor)
+#   date:        int32[count]      - yorumun tarihi, 1970-01-01'den beri gün (NO_DATE: bilinmiyor) - sürüm 2+
+#   chunk_id:    int64[count]      - parçanın FAISS id'si (artan sırada) - sürüm 3+; öncesinde id = sıra
+
+import array
+import datetime
+import json
+import mmap
+import os
+import re
+import struct
+
+import numpy as np
+
+MAGIC = b'RACHUNKS'
+CHUNK_STORE_VERSION = 3
+SUPPORTED_VERSIONS = (1, 2, 3)  # sürüm 1'de tarih, sürüm 1-2'de chunk_id sütunu yoktur
+
+# MAGIC, sürüm, parça sayısı, blob / offsets / review_id / rate / date / chunk_id bölümlerinin konumları
+HEADER = struct.Struct('<8sIIQQQQQQQ')
+HEADER_SIZE = 128
+# Sürüm 1-2 başlığı: chunk_id konumu yok, blob 64. byte'ta başlar
+LEGACY_HEADER = struct.Struct('<8sIIQQQQQQ')
+VERSION_FIELD = struct.Struct('<8sI')
+
+NO_DATE = -2 ** 31
+
+# Parça id'si = yorum id'si << CHUNK_ID_BITS | yorumdaki parça sırası
+# Yorum değişmedikçe id'si de değişmez; artımlı indeksleme bu id'lerle ekler/siler
+CHUNK_ID_BITS = 10
+MAX_CHUNKS_PER_REVIEW = 1 << CHUNK_ID_BITS
+
+# Selenium ile çekilen Türkçe tarihler: "15 Ocak 2024"
+TURKISH_MONTHS = {
+    'ocak': 1, 'şubat': 2, 'mart': 3, 'nisan': 4, 'mayıs': 5, 'haziran': 6,
+    'temmuz': 7, 'ağustos': 8, 'eylül': 9, 'ekim': 10, 'kasım': 11, 'aralık': 12
+}
+ISO_DATE_PATTERN = re.compile(r'(\d{4})-(\d{2})-(\d{2})')
+TURKISH_DATE_PATTERN = re.compile(r'(\d{1,2})\s+([^\s\d]+)\s+(\d{4})')
+EPOCH = datetime.date(1970, 1, 1)
+
+
+def date_to_days(value):
+    """
+    Yorum tarihini (ISO veya "15 Ocak 2024" biçimi) 1970-01-01'den beri gün sayısına çevirir.
+    Çözülemeyen tarihler için NO_DATE döner.
+    """
+    if not value or not isinstance(value, str):
+        return NO_DATE
+    try:
+        match = ISO_DATE_PATTERN.search(value)
+        if match:
+            year, month, day = (int(part) for part in match.groups())
+            return (datetime.date(year, month, day) - EPOCH).days
+        match = TURKISH_DATE_PATTERN.search(value)
+        if match and match.group(2).lower() in TURKISH_MONTHS:
+            day, year = int(match.group(1)), int(match.group(3))
+            return (datetime.date(year, TURKISH_MONTHS[match.group(2).lower()], day) - EPOCH).days
+    except ValueError:
+        pass
+    return NO_DATE
+
+
+def chunk_id(review_id, chunk_no):
+    """Yorum id'si ve yorumdaki parça sırasından kararlı parça id'si üretir"""
+    if not 0 <= chunk_no < MAX_CHUNKS_PER_REVIEW:
+        raise ValueError(f'yorum başına en fazla {MAX_CHUNKS_PER_REVIEW} parça olabilir')
+    return (review_id << CHUNK_ID_BITS) | chunk_no
+
+
+class ChunkStoreError(Exception):
+    """Dosya bu sürümle okunamıyorsa (bozuk, yarım veya farklı sürüm) fırlatılır"""
+
+
+class ChunkStoreWriter:
+    """
+    Parçaları akış halinde yazar: metinler doğrudan geçici dosyaya eklenir,
+    bellekte parça başına sadece 32 byte (offset, yorum id, puan, tarih, parça id) tutulur.
+    Parça id'leri artan sırada eklenmelidir; sorgu tarafı id -> sıra eşlemesini ikili aramayla yapar.
+    close() bölümleri ve başlığı yazıp dosyayı atomik olarak yerine taşır. Index ile birlikte değiştirilecekse
+    finish() (geçici dosyayı tamamlar) ve install() (yerine taşır) ayrı çağrılır.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._tmp_path = f'{path}.tmp'
+        self._file = open(self._tmp_path, 'wb')
+        self._file.write(b'\0' * HEADER_SIZE)
+        self._offsets = array.array('Q', [0])
+        self._review_ids = array.array('q')
+        self._rates = array.array('f')
+        self._dates = array.array('i')
+        self._chunk_ids = array.array('q')
+
+    def __len__(self):
+        return len(self._review_ids)
+
+    def add(self, text, review_id=None, rate=None, date=None, chunk_id=None):
+        """Parçayı ekler ve depodaki sırasını döndürür (chunk_id verilmezse id = sıra)"""
+        position = len(self._review_ids)
+        if chunk_id is None:
+            chunk_id = position
+        if self._chunk_ids and chunk_id <= self._chunk_ids[-1]:
+            raise ValueError('parça id\'leri artan sırada eklenmeli')
+        data = text.encode('utf-8')
+        self._file.write(data)
+        self._offsets.append(self._offsets[-1] + len(data))
+        self._review_ids.append(review_id if review_id is not None else -1)
+        self._rates.append(float(rate) if isinstance(rate, (int, float)) else float('nan'))
+        self._dates.append(date_to_days(date))
+        self._chunk_ids.append(chunk_id)
+        return position
+
+    def close(self):
+        """Bölümleri ve başlığı yazar; dosyayı fsync edip yerine taşır"""
+        self.finish()
+        self.install()
+
+    def finish(self):
+        """Bölümleri ve başlığı geçici dosyaya yazar ve fsync eder; mevcut dosyaya dokunulmaz"""
+        count = len(self._review_ids)
+        blob_pos = HEADER_SIZE
+        sections = []
+        for column in (self._offsets, self._review_ids, self._rates, self._dates, self._chunk_ids):
+            # Her sütun 8 byte hizalı başlar, böylece numpy ile doğrudan okunabilir
+            padding = -self._file.tell() % 8
+            self._file.write(b'\0' * padding)
+            sections.append(self._file.tell())
+            column.tofile(self._file)
+
+        self._file.seek(0)
+        self._file.write(HEADER.pack(MAGIC, CHUNK_STORE_VERSION, 0, count, blob_pos, *sections))
+        self._file.flush()
+        os.fsync(self._file.fileno())
+        self._file.close()
+
+    def install(self):
+        """finish() ile tamamlanan geçici dosyayı atomik olarak yerine taşır"""
+        os.replace(self._tmp_path, self.path)
+
+    def abort(self):
+        """Yarım kalan yazımı iptal eder; mevcut dosyaya dokunulmaz"""
+        self._file.close()
+        if os.path.exists(self._tmp_path):
+            os.remove(self._tmp_path)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.close()
+        else:
+            self.abort()
+
+
+class ChunkStore:
+    """
+    chunks.bin dosyasını mmap ile açar. Sütunlar kopyalanmadan numpy görünümü
+    olarak kullanılır; store[i] sadece i. parçanın byte'larını okur.
+    Liste gibi davranır: len(), indeksleme, dilimleme ve iterasyon desteklenir.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        with open(path, 'rb') as f:
+            if os.fstat(f.fileno()).st_size < HEADER_SIZE:
+                raise ChunkStoreError(f'{path}: dosya başlığı eksik')
+            self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version = VERSION_FIELD.unpack_from(self._mmap, 0)
+        if magic != MAGIC:
+            raise ChunkStoreError(f'{path}: geçersiz dosya türü')
+        if version not in SUPPORTED_VERSIONS:
+            raise ChunkStoreError(f'{path}: desteklenmeyen sürüm {version} (beklenen {CHUNK_STORE_VERSION})')
+        if version >= 3:
+            _, _, _, count, blob_pos, offsets_pos, review_pos, rate_pos, date_pos, chunk_id_pos = \
+                HEADER.unpack_from(self._mmap, 0)
+        else:
+            _, _, _, count, blob_pos, offsets_pos, review_pos, rate_pos, date_pos = \
+                LEGACY_HEADER.unpack_from(self._mmap, 0)
+            chunk_id_pos = None
+
+        self.version = version
+        self._count = count
+        self._blob_pos = blob_pos
+        self.offsets = np.frombuffer(self._mmap, dtype='<u8', count=count + 1, offset=offsets_pos)
+        self.review_ids = np.frombuffer(self._mmap, dtype='<i8', count=count, offset=review_pos)
+        self.rates = np.frombuffer(self._mmap, dtype='<f4', count=count, offset=rate_pos)
+        if version >= 2:
+            self.dates = np.frombuffer(self._mmap, dtype='<i4', count=count, offset=date_pos)
+        else:
+            self.dates = np.full(count, NO_DATE, dtype='<i4')
+        # Sürüm 3 öncesi index'ler düzdür, FAISS id'si parçanın sırasıdır
+        if chunk_id_pos is not None:
+            self.chunk_ids = np.frombuffer(self._mmap, dtype='<i8', count=count, offset=chunk_id_pos)
+        else:
+            self.chunk_ids = None
+
+    def __len__(self):
+        return self._count
+
+    def text(self, i):
+        """i. parçanın metnini döndürür"""
+        if i < 0:
+            i += self._count
+        if not 0 <= i < self._count:
+            raise IndexError('chunk index out of range')
+        start = self._blob_pos + int(self.offsets[i])
+        end = self._blob_pos + int(self.offsets[i + 1])
+        return self._mmap[start:end].decode('utf-8')
+
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            return [self.text(j) for j in range(*i.indices(self._count))]
+        return self.text(int(i))
+
+    def __iter__(self):
+        for i in range(self._count):
+            yield self.text(i)
+
+    def positions(self, ids):
+        """FAISS id'lerini depodaki sıralara çevirir; depoda olmayan id'ler için -1 döner"""
+        ids = np.asarray(ids, dtype=np.int64)
+        if self.chunk_ids is None:
+            return np.where((ids >= 0) & (ids < self._count), ids, -1)
+        if not self._count:
+            return np.full(ids.shape, -1, dtype=np.int64)
+        found = np.minimum(np.searchsorted(self.chunk_ids, ids), self._count - 1)
+        return np.where((ids >= 0) & (self.chunk_ids[found] == ids), found, -1)
+
+    def get_many(self, ids):
+        """index.search sonucundaki id'lerin metinlerini döndürür (-1 ve depoda olmayan id'ler atlanır)"""
+        return [self.text(int(i)) for i in self.positions(ids) if i >= 0]
+
+    def meta(self, i):
+        """i. parçanın yorum id'si, puanı ve tarihi"""
+        review_id = int(self.review_ids[i])
+        rate = float(self.rates[i])
+        days = int(self.dates[i])
+        return {
+            'review_id': review_id if review_id >= 0 else None,
+            'rate': None if np.isnan(rate) else rate,
+            'date': (EPOCH + datetime.timedelta(days=days)).isoformat() if days != NO_DATE else None
+        }
+
+    def close(self):
+        # numpy görünümleri mmap'i tuttuğu için önce onlar bırakılır
+        self.offsets = self.review_ids = self.rates = self.dates = self.chunk_ids = None
+        self._mmap.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+
+def chunks_for_ids(chunks, ids):
+    """index.search sonucundaki id'lere karşılık gelen parçaları döndürür (parça deposu veya eski liste)"""
+    if isinstance(chunks, ChunkStore):
+        return chunks.get_many(ids)
+    return [chunks[i] for i in ids if 0 <= i < len(chunks)]
+
+
+def open_chunks(directory, binary_name='chunks.bin', legacy_name='chunks.json'):
+    """
+    Dizindeki metin parçalarını açar: chunks.bin varsa mmap ile, yoksa eski
+    chunks.json listesi olarak yüklenir. Her iki durumda da liste gibi kullanılabilir.
+    """
+    binary_path = os.path.join(directory, binary_name)
+    if os.path.exists(binary_path):
+        return ChunkStore(binary_path)
+    with open(os.path.join(directory, legacy_name), 'r', encoding='utf-8') as f:
+        return json.load(f)
@@ -0,0 +1,158 @@
+# Akilli Yorum Asistani - Prompt Bağlamı Seçimi
+# Bu dosya Gemini'ye gönderilecek yorum parçalarını seçer: FAISS ile aday parçalar bulunur,
+# MMR (maximal marginal relevance) ile çeşitlendirilir, neredeyse aynı parçalar elenir ve token bütçesi doldurulur
+# Böylece prompt boyutu, LLM gecikmesi ve maliyeti yorum sayısıyla değil bütçeyle sınırlı kalır
+# Hackathon Projesi - AI Destekli Yorum Analizi
+
+import os
+
+import numpy as np
+
+from ann_index import index_metric, prepare_vectors
+from embedding_backends import embedding_identity
+from embedding_cache import EmbeddingCache
+
+# Ayarlar - ortam değişkenleri ile değiştirilebilir, token bütçesi istek başına da verilebilir
+CONTEXT_TOKEN_BUDGET = int(os.getenv('CONTEXT_TOKEN_BUDGET', '4000'))
+CONTEXT_CANDIDATES = int(os.getenv('CONTEXT_CANDIDATES', '100'))   # FAISS'ten alınan aday parça sayısı
+MMR_LAMBDA = float(os.getenv('MMR_LAMBDA', '0.7'))                 # 1: sadece alaka, 0: sadece çeşitlilik
+DEDUP_SIMILARITY = 0.95                                            # bu cosine benzerliğin üstü "aynı parça" sayılır
+
+# Token tahmini: Türkçe metinde Gemini tokenizer'ı ortalama ~4 karakter/token üretir; satır başı ve
+# numara için parça başına birkaç token eklenir
+CHARS_PER_TOKEN = 4
+LINE_OVERHEAD_TOKENS = 4
+
+# Filtreli sorgularda adaylar index'ten fazladan çekilip süzülür; bu sayıdan fazlası aranmaz
+MAX_FETCH = 10000
+
+
+def estimate_tokens(text):
+    """Metnin prompt'ta kaplayacağı yaklaşık token sayısı"""
+    return len(text) // CHARS_PER_TOKEN + LINE_OVERHEAD_TOKENS
+
+
+def chunk_text(chunk):
+    """Parçanın metni (eski chunks.json'da parçalar yorum sözlüğü olabilir)"""
+    return chunk.get('comment', '') if isinstance(chunk, dict) else chunk
+
+
+def chunk_positions(chunks, ids):
+    """FAISS id'lerini parça sıralarına çevirir (parça deposu veya eski liste); bulunamayanlar -1"""
+    if hasattr(chunks, 'positions'):
+        return chunks.positions(ids)
+    ids = np.asarray(ids, dtype=np.int64)
+    return np.where((ids >= 0) & (ids < len(chunks)), ids, -1)
+
+
+def search_candidates(q_vec, index, chunks, candidates, allowed=None):
+    """
+    Soruya en yakın aday parçaların sıralarını döndürür (yakından uzağa).
+    allowed (izin verilen sıralar) verilirse index'ten oranla fazladan aday çekilip süzülür.
+    """
+    return search_candidates_batch(q_vec, index, chunks, candidates, allowed)[0]
+
+
+def search_candidates_batch(q_vecs, index, chunks, candidates, allowed=None):
+    """search_candidates'in soru matrisi için hali: tek index.search çağrısı, soru başına bir sıra dizisi"""
+    empty = [np.empty(0, dtype=np.int64) for _ in range(len(q_vecs))]
+    fetch = candidates
+    if allowed is not None:
+        allowed = np.asarray(allowed, dtype=np.int64)
+        if not len(allowed):
+            return empty
+        fetch = candidates * max(1, -(-len(chunks) // len(allowed)))
+    fetch = min(fetch, MAX_FETCH, index.ntotal)
+    if fetch <= 0:
+        return empty
+    _, I = index.search(q_vecs, fetch)
+    results = []
+    for row in I:
+        positions = chunk_positions(chunks, row)
+        positions = positions[positions >= 0]
+        if allowed is not None:
+            positions = positions[np.isin(positions, allowed)]
+        # Aynı parça birden fazla id ile gelemez ama eski düzende sıra tekrarını yine de ele
+        _, first = np.unique(positions, return_index=True)
+        results.append(positions[np.sort(first)][:candidates])
+    return results
+
+
+def mmr_select(query, vectors, costs, token_budget, mmr_lambda=MMR_LAMBDA, dedup_similarity=DEDUP_SIMILARITY):
+    """
+    MMR ile sırayla parça seçer: skor = λ·benzerlik(soru, parça) − (1−λ)·en büyük benzerlik(parça, seçilenler).
+    Seçilenlerden birine dedup_similarity'den fazla benzeyen parça tekrar sayılıp elenir; bütçeye sığmayan
+    parça atlanır (daha kısa bir aday sığabilir). (seçilen aday sıraları, elenen tekrar sayısı) döner.
+    query ve vectors birim uzunlukta olmalıdır.
+    """
+    relevance = vectors @ query
+    redundancy = np.full(len(vectors), -1.0, dtype=np.float32)
+    available = np.ones(len(vectors), dtype=bool)
+    selected = []
+    duplicates = 0
+    remaining = token_budget
+    while available.any():
+        scores = np.where(available, mmr_lambda * relevance - (1 - mmr_lambda) * np.maximum(redundancy, 0), -np.inf)
+        best = int(np.argmax(scores))
+        available[best] = False
+        if redundancy[best] >= dedup_similarity:
+            duplicates += 1
+            continue
+        if costs[best] > remaining:
+            continue
+        selected.append(best)
+        remaining -= costs[best]
+        redundancy = np.maximum(redundancy, vectors @ vectors[best])
+        # Kalan bütçeye sığacak aday kalmadıysa dur
+        available &= costs <= remaining
+    return selected, duplicates
+
+
+def build_context(question, model, index, chunks, allowed=None, token_budget=None,
+                  candidates=CONTEXT_CANDIDATES, mmr_lambda=MMR_LAMBDA, q_vec=None):
+    """
+    Prompt'a girecek parçaları seçer. Dönen sözlük:
+    {'positions': seçilen parça sıraları (alaka sırasıyla), 'texts': metinleri, 'candidates': aday sayısı,
+     'duplicates': elenen tekrar sayısı, 'tokens': kullanılan tahmini token, 'budget': token bütçesi}
+    Aday vektörleri embedding önbelleğinden okunur (index oluşturulurken yazılmışlardır); bulunamayanlar
+    modelle vektörleştirilir. Soru zaten vektörleştirildiyse q_vec ile verilebilir.
+    """
+    return build_contexts([question], model, index, chunks, allowed, token_budget, candidates, mmr_lambda,
+                          q_vecs=q_vec)[0]
+
+
+def build_contexts(questions, model, index, chunks, allowed=None, token_budget=None,
+                   candidates=CONTEXT_CANDIDATES, mmr_lambda=MMR_LAMBDA, q_vecs=None):
+    """
+    build_context'in soru listesi için hali: sorular tek batch'te vektörleştirilir, adaylar tek index.search
+    ile bulunur ve tüm soruların aday parçaları embedding önbelleğinden birlikte okunur. Soru başına bir sözlük döner.
+    """
+    token_budget = token_budget or CONTEXT_TOKEN_BUDGET
+    if q_vecs is None:
+        q_vecs = model.encode(list(questions), convert_to_numpy=True)
+    candidate_lists = search_candidates_batch(prepare_vectors(q_vecs, index_metric(index)), index, chunks,
+                                              candidates, allowed)
+    results = [{'positions': [], 'texts': [], 'candidates': int(len(positions)), 'duplicates': 0,
+                'tokens': 0, 'budget': token_budget} for positions in candidate_lists]
+    unique = np.unique(np.concatenate(candidate_lists)) if candidate_lists else []
+    if not len(unique):
+        return results
+
+    texts = [chunk_text(chunks[int(position)]) for position in unique]
+    with EmbeddingCache(embedding_identity()) as cache:
+        vectors = cache.encode(texts, lambda missing: model.encode(missing, convert_to_numpy=True))
+    # MMR cosine benzerliğiyle çalışır; index metriğinden bağımsız olarak vektörler normalize edilir
+    vectors = prepare_vectors(vectors, 'cosine')
+    queries = prepare_vectors(q_vecs, 'cosine')
+    costs = np.array([estimate_tokens(text) for text in texts])
+
+    for result, positions, query in zip(results, candidate_lists, queries):
+        if not len(positions):
+            continue
+        rows = np.searchsorted(unique, positions)
+        selected, duplicates = mmr_select(query, vectors[rows], costs[rows], token_budget, mmr_lambda)
+        # Prompt'ta parçalar alaka sırasıyla (FAISS sırası) gösterilir
+        selected.sort()
+        result.update(positions=[int(positions[i]) for i in selected], texts=[texts[rows[i]] for i in selected],
+                      duplicates=duplicates, tokens=int(costs[rows[selected]].sum()))
+    return results
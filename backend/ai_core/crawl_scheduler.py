@@ -0,0 +1,203 @@
+# Akilli Yorum Asistani - Çoklu Ürün Tarama Zamanlayıcısı
+# Bu dosya çok sayıda ürün URL'sini tek bir süreçte, site başına hız sınırı ile tarar
+# Her site için ayrı token bucket (istek/saniye) ve eşzamanlı ürün sınırı uygulanır
+# Hackathon Projesi - AI Destekli Yorum Analizi
+
+import argparse
+import importlib
+import json
+import threading
+import time
+from collections import deque
+from urllib.parse import urlparse, parse_qs, urlencode, urlunparse
+
+from driver_pool import get_pool
+from http_client import register_rate_limiter, unregister_rate_limiter
+
+# 1_fetch_reviews rakamla başladığı için normal import ile yüklenemez
+fetch_module = importlib.import_module('1_fetch_reviews')
+
+# Site başına varsayılan sınırlar
+# rate: saniyedeki HTTP isteği, burst: art arda izin verilen en fazla istek,
+# concurrency: aynı anda taranan en fazla ürün
+DOMAIN_LIMITS = {
+    'trendyol': {'domain': 'trendyol.com', 'rate': 5.0, 'burst': 10, 'concurrency': 4},
+    'hepsiburada': {'domain': 'hepsiburada.com', 'rate': 2.0, 'burst': 4, 'concurrency': 2},
+}
+
+DEFAULT_WORKERS = 6
+
+
+class TokenBucket:
+    """
+    Klasik token bucket: saniyede rate kadar token dolar, en fazla capacity birikir.
+    acquire() token yoksa bir sonraki token dolana kadar bekler.
+    """
+
+    def __init__(self, rate, capacity):
+        self.rate = rate
+        self.capacity = capacity
+        self._tokens = capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self, tokens=1):
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= tokens:
+                    self._tokens -= tokens
+                    return
+                wait = (tokens - self._tokens) / self.rate
+            time.sleep(wait)
+
+
+def canonical_product_url(url):
+    """
+    Aynı ürünü gösteren URL'leri tek biçime indirger (tekrarları birleştirmek için).
+    Sorgu parametrelerinden yalnızca merchantId korunur.
+    """
+    parsed = urlparse(url.strip())
+    merchant_id = parse_qs(parsed.query).get('merchantId', [None])[0]
+    query = urlencode({'merchantId': merchant_id}) if merchant_id else ''
+    return urlunparse(('https', parsed.netloc.lower(), parsed.path.rstrip('/'), '', query, ''))
+
+
+class CrawlScheduler:
+    """
+    Ürün URL kuyruğunu worker havuzunda tarar.
+    URL'ler detect_website_type ile site kuyruklarına ayrılır; worker'lar sırayla
+    eşzamanlılık sınırı dolmamış bir sitenin kuyruğundan iş alır, böylece yavaş bir
+    site diğerlerini bekletmez. Kuyrukta veya çalışmakta olan bir ürün tekrar
+    eklenirse yok sayılır. Selenium'a düşen ürünler bu süreçteki Chrome havuzunu
+    paylaşır; havuz eşzamanlı ürün sayısı kadar büyütülür.
+    """
+
+    def __init__(self, workers=DEFAULT_WORKERS, limits=None, fetch_kwargs=None, fetch_fn=None):
+        self.workers = workers
+        self.limits = limits or DOMAIN_LIMITS
+        self.fetch_kwargs = fetch_kwargs or {}
+        self.fetch_fn = fetch_fn or fetch_module.fetch_reviews
+        self.results = {}
+
+        self._queues = {site: deque() for site in self.limits}
+        self._active = {site: 0 for site in self.limits}
+        self._pending = set()
+        self._sites = list(self.limits)
+        self._next_site = 0
+        self._cond = threading.Condition()
+
+    def submit(self, url):
+        """URL'yi kuyruğa ekler; desteklenmeyen site veya tekrar ise False döner"""
+        site = fetch_module.detect_website_type(url)
+        if site not in self._queues:
+            print(f"Desteklenmeyen web sitesi, atlanıyor: {url}")
+            return False
+
+        key = canonical_product_url(url)
+        with self._cond:
+            if key in self._pending:
+                return False
+            self._pending.add(key)
+            self._queues[site].append((key, url))
+            self._cond.notify()
+        return True
+
+    def submit_many(self, urls):
+        """Birden fazla URL ekler; kuyruğa giren URL sayısını döndürür"""
+        return sum(1 for url in urls if self.submit(url))
+
+    def _take_job(self):
+        """
+        Eşzamanlılık sınırı dolmamış bir sitenin kuyruğundan sıradaki işi alır.
+        Tüm kuyruklar boş ve çalışan iş yoksa None döner.
+        """
+        with self._cond:
+            while True:
+                for offset in range(len(self._sites)):
+                    site = self._sites[(self._next_site + offset) % len(self._sites)]
+                    if self._queues[site] and self._active[site] < self.limits[site]['concurrency']:
+                        self._next_site = (self._next_site + offset + 1) % len(self._sites)
+                        self._active[site] += 1
+                        key, url = self._queues[site].popleft()
+                        return site, key, url
+
+                if not any(self._queues.values()) and not any(self._active.values()):
+                    return None
+                self._cond.wait()
+
+    def _finish_job(self, site, key):
+        with self._cond:
+            self._active[site] -= 1
+            self._pending.discard(key)
+            self._cond.notify_all()
+
+    def _worker(self):
+        while True:
+            job = self._take_job()
+            if job is None:
+                return
+            site, key, url = job
+            started = time.time()
+            # KeyboardInterrupt gibi yakalanmayan hatalarda da finally'deki sonuç kaydı hazır olsun
+            self.results[key] = {'site': site, 'status': 'error'}
+            try:
+                # fetch_reviews collect=False iken yazılan yorum sayısını, aksi halde listeyi döndürür
+                fetched = self.fetch_fn(url=url, **self.fetch_kwargs)
+                count = fetched if isinstance(fetched, int) else len(fetched or [])
+                self.results[key] = {'site': site, 'status': 'ok', 'reviews': count}
+            except Exception as e:
+                print(f"Hata: {url} taranamadı: {e}")
+                self.results[key] = {'site': site, 'status': 'error', 'error': str(e)}
+            finally:
+                self.results[key]['elapsed'] = round(time.time() - started, 2)
+                self._finish_job(site, key)
+
+    def run(self):
+        """Kuyruk boşalana kadar tarar ve ürün başına sonuçları döndürür"""
+        for limit in self.limits.values():
+            register_rate_limiter(limit['domain'], TokenBucket(limit['rate'], limit['burst']))
+        # Tarayıcılar ilk Selenium işinde açılır ve sonraki ürünlerde tekrar kullanılır
+        get_pool(size=min(self.workers, sum(limit['concurrency'] for limit in self.limits.values())), warm=False)
+
+        threads = [threading.Thread(target=self._worker, daemon=True) for _ in range(self.workers)]
+        try:
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+        finally:
+            for limit in self.limits.values():
+                unregister_rate_limiter(limit['domain'])
+        return self.results
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Çok sayıda ürünün yorumlarını site başına hız sınırı ile tarar')
+    parser.add_argument('--urls-file', required=True, help='Her satırda bir ürün URL\'si içeren dosya')
+    parser.add_argument('--workers', type=int, default=DEFAULT_WORKERS, help='Toplam worker sayısı')
+    parser.add_argument('--max-pages', type=int, default=10, help='API için maksimum sayfa sayısı')
+    parser.add_argument('--max-reviews', type=int, default=100, help='Selenium için maksimum yorum sayısı')
+    args = parser.parse_args()
+
+    with open(args.urls_file, 'r', encoding='utf-8') as f:
+        urls = [line.strip() for line in f if line.strip()]
+
+    scheduler = CrawlScheduler(
+        workers=args.workers,
+        fetch_kwargs={'max_pages': args.max_pages, 'max_reviews': args.max_reviews, 'collect': False}
+    )
+    queued = scheduler.submit_many(urls)
+    print(f"{queued}/{len(urls)} ürün kuyruğa alındı (tekrarlar birleştirildi).")
+
+    started = time.time()
+    results = scheduler.run()
+    ok = sum(1 for r in results.values() if r['status'] == 'ok')
+    print(f"\nTarama tamamlandı: {ok}/{len(results)} ürün başarılı, {time.time() - started:.1f} sn.")
+    print(json.dumps(results, ensure_ascii=False, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,294 @@
+# Akilli Yorum Asistani - Chrome Sürücü Havuzu
+# Bu dosya tüm Selenium scraper'larının paylaştığı sıcak (pre-warmed) Chrome havuzunu yönetir
+# ChromeDriver yolu bir kez çözülür, tarayıcılar işler arasında temizlenip tekrar kullanılır
+# Havuz süreç içinde yaşar: server.js yorum çekmeyi sürekli çalışan query_service.py'nin /fetch ucuna gönderir,
+# böylece havuzdaki tarayıcılar istekler arasında açık kalır (servis yoksa 1_fetch_reviews.py kendi havuzunu açar)
+# Hackathon Projesi - AI Destekli Yorum Analizi
+
+import atexit
+import os
+import queue
+import threading
+from contextlib import contextmanager
+
+from selenium import webdriver
+from selenium.webdriver.chrome.options import Options
+from selenium.webdriver.chrome.service import Service
+from webdriver_manager.chrome import ChromeDriverManager
+
+# psutil opsiyonel: varsa tarayıcı süreçlerinin gerçek RSS değeri ölçülür
+try:
+    import psutil
+except ImportError:
+    psutil = None
+
+USER_AGENT = "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36"
+
+# Havuz ayarları - ortam değişkenleri ile değiştirilebilir
+# Havuz oluşturulunca POOL_SIZE tarayıcı arka planda açılır; crawl_scheduler havuzu kendi worker sayısına göre büyütür
+POOL_SIZE = int(os.getenv('DRIVER_POOL_SIZE', '1'))
+MAX_JOBS_PER_DRIVER = int(os.getenv('DRIVER_MAX_JOBS', '25'))
+MAX_DRIVER_MEMORY_MB = int(os.getenv('DRIVER_MAX_MEMORY_MB', '1024'))
+
+# Tarayıcı profilleri - her profil kendi havuzuna sahiptir
+# headless: sunucu tarafındaki Trendyol/Hepsiburada scraper'ları
+# local: ultra dayanıklı scraper'ın görünür tarayıcı modu
+PROFILES = {
+    'headless': [
+        "--headless",
+        "--no-sandbox",
+        "--disable-dev-shm-usage",
+        "--disable-gpu",
+        "--window-size=1920,1080",
+        "--disable-blink-features=AutomationControlled",
+        f"user-agent={USER_AGENT}",
+    ],
+    'local': [
+        "--start-maximized",
+        "--no-sandbox",
+    ],
+}
+
+# navigator.webdriver gizleme betiği - her yeni dokümanda çalışır
+HIDE_WEBDRIVER_JS = "Object.defineProperty(navigator, 'webdriver', {get: () => undefined})"
+
+_driver_path = None
+_driver_path_lock = threading.Lock()
+
+
+def resolve_driver_path():
+    """
+    ChromeDriver binary yolunu süreç başına bir kez çözer.
+    CHROMEDRIVER_PATH tanımlıysa webdriver_manager hiç çağrılmaz.
+    """
+    global _driver_path
+    with _driver_path_lock:
+        if _driver_path is None:
+            _driver_path = os.getenv('CHROMEDRIVER_PATH') or ChromeDriverManager().install()
+            print(f"Bilgi: ChromeDriver yolu çözüldü: {_driver_path}")
+    return _driver_path
+
+
+class _PooledDriver:
+    """Havuzdaki bir tarayıcı ve kaç iş çalıştırdığı bilgisi"""
+
+    def __init__(self, driver):
+        self.driver = driver
+        self.jobs = 0
+
+
+class DriverPool:
+    """
+    Sabit boyutlu Chrome havuzu.
+    lease() ile bir tarayıcı kiralanır; iş bitince çerez ve depolama temizlenip
+    havuza geri konur. Belirli iş sayısına ulaşan veya fazla bellek kullanan
+    tarayıcı kapatılıp yerine yenisi açılır.
+    Sayı kontrolü ile tarayıcı açma _create_lock altında yapılır; warm() ve lease()
+    aynı anda çalışsa da havuz size'dan fazla tarayıcı açmaz.
+    """
+
+    def __init__(self, profile='headless', size=POOL_SIZE,
+                 max_jobs=MAX_JOBS_PER_DRIVER, max_memory_mb=MAX_DRIVER_MEMORY_MB):
+        self.profile = profile
+        self.size = max(1, size)
+        self.max_jobs = max_jobs
+        self.max_memory_mb = max_memory_mb
+        self._idle = queue.Queue()
+        self._slots = threading.BoundedSemaphore(self.size)
+        self._lock = threading.Lock()
+        self._create_lock = threading.Lock()
+        self._all = set()
+        self._closed = False
+        self.warmed = False  # True ise havuz size kadar sıcak tarayıcıyla dolu tutulur
+
+    def _count(self):
+        with self._lock:
+            return len(self._all)
+
+    def _create(self):
+        """Yeni bir Chrome başlatır (çağıran _create_lock'u tutmalıdır)"""
+        chrome_options = Options()
+        for argument in PROFILES[self.profile]:
+            chrome_options.add_argument(argument)
+        if self.profile == 'headless':
+            chrome_options.add_experimental_option("excludeSwitches", ["enable-automation"])
+            chrome_options.add_experimental_option('useAutomationExtension', False)
+
+        service = Service(resolve_driver_path())
+        driver = webdriver.Chrome(service=service, options=chrome_options)
+        if self.profile == 'headless':
+            driver.execute_cdp_cmd('Page.addScriptToEvaluateOnNewDocument', {'source': HIDE_WEBDRIVER_JS})
+
+        pooled = _PooledDriver(driver)
+        with self._lock:
+            self._all.add(pooled)
+        return pooled
+
+    def warm(self, count=None):
+        """Havuzu önceden belirtilen sayıda (varsayılan: havuz boyutu) tarayıcıyla doldurur"""
+        target = self.size if count is None else min(count, self.size)
+        while not self._closed:
+            with self._create_lock:
+                if self._count() >= target:
+                    break
+                try:
+                    self._idle.put(self._create())
+                except Exception as e:
+                    print(f"Hata: Havuz için tarayıcı başlatılamadı: {e}")
+                    break
+
+    def warm_in_background(self, count=None):
+        """warm() işlemini ana akışı bekletmeden arka planda yapar"""
+        self.warmed = True
+        thread = threading.Thread(target=self.warm, args=(count,), daemon=True)
+        thread.start()
+        return thread
+
+    @contextmanager
+    def lease(self, timeout=None):
+        """Havuzdan bir tarayıcı kiralar; with bloğu bitince havuza iade edilir"""
+        if self._closed:
+            raise RuntimeError("Sürücü havuzu kapatılmış.")
+        if not self._slots.acquire(timeout=timeout):
+            raise TimeoutError("Havuzda boş tarayıcı bulunamadı.")
+
+        pooled = None
+        try:
+            pooled = self._acquire(timeout)
+            yield pooled.driver
+        finally:
+            if pooled is not None:
+                pooled.jobs += 1
+                self._release(pooled)
+            self._slots.release()
+
+    def _acquire(self, timeout):
+        """
+        Boştaki bir tarayıcıyı alır; yoksa ve havuz dolmamışsa yenisini açar.
+        Havuz doluysa (ör. warm() son tarayıcıyı açarken) iade edilecek tarayıcı beklenir.
+        """
+        with self._create_lock:
+            try:
+                return self._idle.get_nowait()
+            except queue.Empty:
+                pass
+            if self._count() < self.size:
+                return self._create()
+        try:
+            return self._idle.get(timeout=timeout)
+        except queue.Empty:
+            raise TimeoutError("Havuzda boş tarayıcı bulunamadı.")
+
+    def _release(self, pooled):
+        """
+        Tarayıcıyı temizleyip havuza koyar ya da gerekiyorsa geri dönüştürür.
+        Isıtılmış havuzlarda kapatılan tarayıcının yerine arka planda yenisi açılır.
+        """
+        if self._closed or self._should_recycle(pooled):
+            self._replace(pooled)
+            return
+        try:
+            self._reset(pooled.driver)
+        except Exception as e:
+            print(f"Bilgi: Tarayıcı temizlenemedi, kapatılıyor: {e}")
+            self._replace(pooled)
+            return
+        self._idle.put(pooled)
+
+    def _replace(self, pooled):
+        self._discard(pooled)
+        if self.warmed and not self._closed:
+            self.warm_in_background()
+
+    def _should_recycle(self, pooled):
+        """İş sayısı veya bellek sınırı aşıldıysa True döner"""
+        if pooled.jobs >= self.max_jobs:
+            print(f"Bilgi: Tarayıcı {pooled.jobs} iş sonrası yenileniyor.")
+            return True
+        memory_mb = self._memory_mb(pooled.driver)
+        if memory_mb is not None and memory_mb > self.max_memory_mb:
+            print(f"Bilgi: Tarayıcı {memory_mb:.0f} MB bellek kullanıyor, yenileniyor.")
+            return True
+        return False
+
+    def _memory_mb(self, driver):
+        """
+        Tarayıcının bellek kullanımını MB olarak döndürür.
+        psutil varsa chromedriver altındaki tüm Chrome süreçlerinin RSS toplamı,
+        yoksa sayfanın JS heap boyutu kullanılır.
+        """
+        try:
+            if psutil is not None:
+                root = psutil.Process(driver.service.process.pid)
+                processes = [root] + root.children(recursive=True)
+                return sum(p.memory_info().rss for p in processes) / (1024 * 1024)
+            heap = driver.execute_script("return performance.memory ? performance.memory.usedJSHeapSize : null")
+            return heap / (1024 * 1024) if heap else None
+        except Exception:
+            return None
+
+    def _reset(self, driver):
+        """Bir sonraki iş için çerezleri, önbelleği ve depolamayı temizler"""
+        origin = driver.execute_script("return window.location.origin")
+        driver.execute_cdp_cmd('Network.clearBrowserCookies', {})
+        driver.execute_cdp_cmd('Network.clearBrowserCache', {})
+        if origin and origin.startswith('http'):
+            driver.execute_cdp_cmd('Storage.clearDataForOrigin', {'origin': origin, 'storageTypes': 'all'})
+        driver.get('about:blank')
+
+    def _discard(self, pooled):
+        """Tarayıcıyı kapatır ve havuz kaydından siler"""
+        with self._lock:
+            self._all.discard(pooled)
+        try:
+            pooled.driver.quit()
+        except Exception:
+            pass
+
+    def close(self):
+        """Havuzdaki tüm tarayıcıları kapatır"""
+        self._closed = True
+        with self._lock:
+            remaining = list(self._all)
+        for pooled in remaining:
+            self._discard(pooled)
+
+
+_pools = {}
+_pools_lock = threading.Lock()
+
+
+def get_pool(profile='headless', size=None, warm=True):
+    """
+    Profil için süreç genelinde tek bir havuz döndürür; ilk çağrıda size kadar tarayıcı arka planda açılır.
+    size verilirse POOL_SIZE yerine kullanılır (yalnızca havuz ilk kez oluşturulurken).
+    warm=False ise tarayıcılar ilk ihtiyaçta açılır, sonra aynı süreçteki işler arasında paylaşılır.
+    """
+    with _pools_lock:
+        pool = _pools.get(profile)
+        if pool is None:
+            pool = DriverPool(profile, size=POOL_SIZE if size is None else size)
+            _pools[profile] = pool
+            # Isıtma ile ilk kiralama aynı anda tarayıcı açmaya çalışırsa _create_lock size sınırını korur
+            if warm:
+                pool.warm_in_background()
+    return pool
+
+
+@contextmanager
+def lease_driver(profile='headless', timeout=None):
+    """Kısa yol: with lease_driver() as driver: ..."""
+    with get_pool(profile).lease(timeout=timeout) as driver:
+        yield driver
+
+
+def shutdown_pools():
+    """Süreç kapanırken tüm havuzlardaki tarayıcıları kapatır"""
+    with _pools_lock:
+        pools = list(_pools.values())
+        _pools.clear()
+    for pool in pools:
+        pool.close()
+
+
+atexit.register(shutdown_pools)
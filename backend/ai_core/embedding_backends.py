@@ -0,0 +1,280 @@
+# Akilli Yorum Asistani - Embedding Model Arka Uçları
+# Bu dosya embedding modelini yapılandırmaya göre PyTorch (Sentence Transformers) veya ONNX Runtime ile yükler
+# ONNX arka ucu torch gerektirmez; int8 dinamik nicemlenmiş sürümü CPU'da daha hızlı ve daha az bellek kullanır
+# Dışa aktarılan modellerin torch çıktısıyla tutarlılığı parity kontrolüyle doğrulanır
+# Hackathon Projesi - AI Destekli Yorum Analizi
+
+import argparse
+import inspect
+import json
+import os
+import sys
+
+import numpy as np
+
+EMBEDDING_MODEL = 'all-MiniLM-L6-v2'
+
+# Arka uç seçimi - ortam değişkeni ile değiştirilebilir: torch, onnx veya onnx-int8
+BACKENDS = ('torch', 'onnx', 'onnx-int8')
+EMBEDDING_BACKEND = os.getenv('EMBEDDING_BACKEND', 'torch')
+
+# Dışa aktarılan ONNX modellerinin dizini: <ONNX_DIR>/<model adı>/
+ONNX_DIR = os.getenv('EMBEDDING_ONNX_DIR', os.path.join(os.path.dirname(os.path.abspath(__file__)), 'models'))
+ONNX_FILES = {'onnx': 'model.onnx', 'onnx-int8': 'model_int8.onnx'}
+ONNX_CONFIG_FILE = 'embedding_config.json'
+ONNX_OPSET = 14
+
+# Parity: torch çıktısına göre izin verilen en büyük (1 - cosine benzerliği)
+# fp32 ONNX sayısal olarak aynı olmalı; int8 nicemleme küçük bir sapma getirir
+PARITY_TOLERANCE = {'onnx': 1e-4, 'onnx-int8': 2e-2}
+PARITY_TEXTS = [
+    'Ürün çok kaliteli, kargo hızlı geldi.',
+    'Kumaşı ince, ilk yıkamada çekti. Tavsiye etmem.',
+    'Fiyatına göre gayet iyi ama bedeni biraz dar.',
+    'Satıcı ilgiliydi, paketleme özenliydi, teşekkürler.',
+    'Şarjı bir gün bile dayanmıyor, iade ettim.',
+    'Rengi fotoğraftakinden daha koyu ama yine de beğendim.',
+    'Kutusu hasarlı geldi fakat ürün sağlam çalışıyor.',
+    'Ses kalitesi beklediğimden iyi, bas biraz zayıf.',
+    'Çok güzel',
+    'Berbat.',
+]
+
+
+def embedding_identity(model_name=EMBEDDING_MODEL, backend=EMBEDDING_BACKEND):
+    """
+    Embedding önbelleğinde ve yanıt önbelleğinde vektörlerin ait olduğu model adı.
+    ONNX / int8 vektörleri torch çıktısından biraz saptığı için arka uç da ada eklenir;
+    torch için sadece model adı kullanılır (mevcut önbellek kayıtları geçerli kalır).
+    """
+    return model_name if backend == 'torch' else f'{model_name}:{backend}'
+
+
+def onnx_dir(model_name=EMBEDDING_MODEL):
+    """Modelin ONNX dosyalarının bulunduğu dizin ('org/model' adlarındaki '/' dizin adına uygun hale getirilir)"""
+    return os.path.join(ONNX_DIR, model_name.replace('/', '__'))
+
+
+class _TokenizerAdapter:
+    """tokenizers kütüphanesini transformers tokenizer'ı gibi çağrılabilir yapar (token uzunluğu ölçümü için)"""
+
+    def __init__(self, tokenizer):
+        self._tokenizer = tokenizer
+
+    def __call__(self, texts, add_special_tokens=True, truncation=True, max_length=None):
+        # Tokenizer grubu en uzun metne göre doldurur; pad token'ları (sağda) sayılmaz
+        encodings = self._tokenizer.encode_batch(list(texts), add_special_tokens=add_special_tokens)
+        return {'input_ids': [encoding.ids[:sum(encoding.attention_mask)] for encoding in encodings]}
+
+
+class OnnxEmbedder:
+    """
+    Dışa aktarılmış transformer'ı ONNX Runtime ile çalıştırır; ortalama havuzlama (mean pooling) ve
+    normalizasyon Sentence Transformers'taki gibi numpy ile yapılır.
+    encode / tokenizer / max_seq_length / get_sentence_embedding_dimension arayüzü SentenceTransformer ile
+    aynı olduğu için indexer, vektörleştirme motoru ve sorgu tarafı iki arka ucu ayırt etmeden kullanır.
+    """
+
+    def __init__(self, model_dir, backend='onnx', threads=0):
+        import onnxruntime
+        from tokenizers import Tokenizer
+
+        with open(os.path.join(model_dir, ONNX_CONFIG_FILE), 'r', encoding='utf-8') as f:
+            self.config = json.load(f)
+        self.backend = backend
+        self.max_seq_length = self.config['max_seq_length']
+        self._model_path = os.path.join(model_dir, ONNX_FILES[backend])
+        self._runtime = onnxruntime
+        self._threads = threads
+        self._session = None
+
+        tokenizer = Tokenizer.from_file(os.path.join(model_dir, 'tokenizer.json'))
+        tokenizer.enable_truncation(max_length=self.max_seq_length)
+        tokenizer.enable_padding(pad_id=self.config['pad_token_id'], pad_token=self.config['pad_token'])
+        self._tokenizer = tokenizer
+        self.tokenizer = _TokenizerAdapter(tokenizer)
+
+    def set_num_threads(self, threads):
+        """ONNX Runtime'ın işlem içi thread sayısı (0: çekirdek sayısı); oturum bir sonraki encode'da kurulur"""
+        self._threads = threads
+        self._session = None
+
+    @property
+    def session(self):
+        if self._session is None:
+            options = self._runtime.SessionOptions()
+            if self._threads:
+                options.intra_op_num_threads = self._threads
+            self._session = self._runtime.InferenceSession(self._model_path, options,
+                                                           providers=['CPUExecutionProvider'])
+            self._input_names = {node.name for node in self._session.get_inputs()}
+        return self._session
+
+    def get_sentence_embedding_dimension(self):
+        return self.config['dim']
+
+    def encode(self, texts, batch_size=32, convert_to_numpy=True, show_progress_bar=False, **kwargs):
+        """Metinleri vektörleştirir (float32, girdi sırasıyla); tek metin verilirse tek vektör döner"""
+        single = isinstance(texts, str)
+        texts = [texts] if single else list(texts)
+        if not texts:
+            return np.empty((0, self.config['dim']), dtype=np.float32)
+        parts = [self._encode_batch(texts[i:i + batch_size]) for i in range(0, len(texts), batch_size)]
+        embeddings = np.vstack(parts)
+        return embeddings[0] if single else embeddings
+
+    def _encode_batch(self, texts):
+        # Grup en uzun metne göre doldurulur; pad token'ları attention_mask ile havuzlamadan çıkarılır
+        encodings = self._tokenizer.encode_batch(texts)
+        feed = {
+            'input_ids': np.array([e.ids for e in encodings], dtype=np.int64),
+            'attention_mask': np.array([e.attention_mask for e in encodings], dtype=np.int64),
+            'token_type_ids': np.array([e.type_ids for e in encodings], dtype=np.int64),
+        }
+        session = self.session
+        hidden = session.run(None, {name: value for name, value in feed.items() if name in self._input_names})[0]
+
+        mask = feed['attention_mask'][:, :, None].astype(np.float32)
+        pooled = (hidden * mask).sum(axis=1) / np.clip(mask.sum(axis=1), 1e-9, None)
+        if self.config.get('normalize'):
+            pooled /= np.clip(np.linalg.norm(pooled, axis=1, keepdims=True), 1e-12, None)
+        return pooled.astype(np.float32)
+
+
+def load_embedding_model(model_name=EMBEDDING_MODEL, backend=EMBEDDING_BACKEND):
+    """
+    Yapılandırılan arka uçla embedding modelini yükler. torch dışındaki arka uçlar önceden
+    dışa aktarılmış ONNX dosyalarını kullanır ve torch'u hiç import etmez.
+    """
+    if backend == 'torch':
+        from sentence_transformers import SentenceTransformer
+        return SentenceTransformer(model_name)
+    if backend not in ONNX_FILES:
+        raise ValueError(f'geçersiz embedding arka ucu: {backend} (seçenekler: {", ".join(BACKENDS)})')
+    model_dir = onnx_dir(model_name)
+    if not os.path.exists(os.path.join(model_dir, ONNX_FILES[backend])):
+        raise FileNotFoundError(f'{backend} modeli bulunamadı ({model_dir}); '
+                                f'önce "python embedding_backends.py export" çalıştırın')
+    return OnnxEmbedder(model_dir, backend)
+
+
+def export_onnx(model_name=EMBEDDING_MODEL, quantize=True):
+    """
+    Sentence Transformers modelinin transformer katmanını ONNX'e aktarır, tokenizer'ı ve havuzlama
+    ayarlarını yanına yazar; quantize ise ağırlıkları int8'e çeviren dinamik nicemlenmiş kopyayı da üretir.
+    Sadece dışa aktarma sırasında torch gerekir.
+    """
+    import torch
+    from sentence_transformers import SentenceTransformer
+
+    model = SentenceTransformer(model_name)
+    transformer, pooling = model[0], model[1]
+    if not getattr(pooling, 'pooling_mode_mean_tokens', False):
+        raise ValueError(f'{model_name}: sadece ortalama havuzlamalı (mean pooling) modeller destekleniyor')
+    tokenizer = model.tokenizer
+
+    model_dir = onnx_dir(model_name)
+    os.makedirs(model_dir, exist_ok=True)
+    tokenizer.save_pretrained(model_dir)  # tokenizer.json (hızlı tokenizer) dahil
+
+    # Dinamik eksenler: grup boyutu ve dizi uzunluğu çalışma anında değişir
+    sample = tokenizer(['Örnek bir ürün yorumu.'], return_tensors='pt')
+    input_names = [name for name in ('input_ids', 'attention_mask', 'token_type_ids') if name in sample]
+    dynamic_axes = {name: {0: 'batch', 1: 'sequence'} for name in input_names + ['last_hidden_state']}
+    # Yeni torch sürümlerinde varsayılan dynamo dışa aktarıcısı yerine TorchScript tabanlı olan kullanılır
+    extra = {'dynamo': False} if 'dynamo' in inspect.signature(torch.onnx.export).parameters else {}
+    auto_model = transformer.auto_model.eval()
+    onnx_path = os.path.join(model_dir, ONNX_FILES['onnx'])
+    with torch.no_grad():
+        torch.onnx.export(auto_model, tuple(sample[name] for name in input_names), onnx_path,
+                          input_names=input_names, output_names=['last_hidden_state'],
+                          dynamic_axes=dynamic_axes, opset_version=ONNX_OPSET, **extra)
+
+    config = {
+        'model': model_name,
+        'dim': model.get_sentence_embedding_dimension(),
+        'max_seq_length': model.max_seq_length,
+        'normalize': any(type(module).__name__ == 'Normalize' for module in model),
+        'pad_token': tokenizer.pad_token,
+        'pad_token_id': tokenizer.pad_token_id,
+    }
+    with open(os.path.join(model_dir, ONNX_CONFIG_FILE), 'w', encoding='utf-8') as f:
+        json.dump(config, f, ensure_ascii=False, indent=2)
+    print(f"ONNX modeli '{onnx_path}' olarak kaydedildi.")
+
+    if quantize:
+        from onnxruntime.quantization import QuantType, quantize_dynamic
+        int8_path = os.path.join(model_dir, ONNX_FILES['onnx-int8'])
+        quantize_dynamic(onnx_path, int8_path, weight_type=QuantType.QInt8)
+        print(f"int8 nicemlenmiş model '{int8_path}' olarak kaydedildi "
+              f"({os.path.getsize(onnx_path) / 2 ** 20:.0f} MB -> {os.path.getsize(int8_path) / 2 ** 20:.0f} MB).")
+    return model_dir
+
+
+def check_parity(backend, texts=PARITY_TEXTS, model_name=EMBEDDING_MODEL, reference=None):
+    """
+    Arka ucun embedding'lerini torch çıktısıyla karşılaştırır.
+    {'backend', 'texts', 'min_cosine', 'max_abs_diff', 'tolerance', 'passed'} döndürür.
+    """
+    if reference is None:
+        reference = load_embedding_model(model_name, 'torch').encode(list(texts), convert_to_numpy=True)
+    candidate = load_embedding_model(model_name, backend).encode(list(texts))
+    cosine = (reference * candidate).sum(axis=1) / (
+        np.linalg.norm(reference, axis=1) * np.linalg.norm(candidate, axis=1))
+    tolerance = PARITY_TOLERANCE.get(backend, 0.0)
+    return {
+        'backend': backend,
+        'texts': len(texts),
+        'min_cosine': float(cosine.min()),
+        'max_abs_diff': float(np.abs(reference - candidate).max()),
+        'tolerance': tolerance,
+        'passed': bool(1 - cosine.min() <= tolerance),
+    }
+
+
+def print_parity(result):
+    status = 'GEÇTİ' if result['passed'] else 'KALDI'
+    print(f"{result['backend']}: {status} - {result['texts']} metin, en düşük cosine {result['min_cosine']:.6f} "
+          f"(izin verilen sapma {result['tolerance']}), en büyük mutlak fark {result['max_abs_diff']:.2e}")
+
+
+def parity_texts(product, limit):
+    """Parity için ürünün metin parçaları (ürün verilmezse sabit örnek cümleler)"""
+    if not product:
+        return PARITY_TEXTS
+    from artifact_store import product_dir, resolve_product
+    from chunk_store import open_chunks
+    key = resolve_product(product)
+    chunks = open_chunks(product_dir(key))
+    return [chunks[i] for i in range(min(limit, len(chunks)))] or PARITY_TEXTS
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Embedding modelini ONNX\'e aktarır ve torch ile tutarlılığını kontrol eder')
+    parser.add_argument('command', choices=('export', 'check'), help='export: dışa aktar ve kontrol et, check: sadece kontrol et')
+    parser.add_argument('--model', default=EMBEDDING_MODEL, help='Embedding modeli')
+    parser.add_argument('--backend', choices=[b for b in BACKENDS if b != 'torch'],
+                        help='Kontrol edilecek arka uç (verilmezse tüm ONNX arka uçları)')
+    parser.add_argument('--no-quantize', action='store_true', help='int8 nicemlenmiş modeli üretme')
+    parser.add_argument('--product', help="Parity için ürünün parçalarını kullan (anahtar veya 'latest')")
+    parser.add_argument('--limit', type=int, default=1000, help='Parity için en fazla parça sayısı')
+    args = parser.parse_args()
+
+    if args.command == 'export':
+        export_onnx(args.model, quantize=not args.no_quantize)
+    backends = [args.backend] if args.backend else [b for b in ONNX_FILES
+                                                   if os.path.exists(os.path.join(onnx_dir(args.model), ONNX_FILES[b]))]
+    if not backends:
+        print(f"Dışa aktarılmış ONNX modeli yok ({onnx_dir(args.model)}); önce 'export' çalıştırın.")
+        sys.exit(1)
+    texts = parity_texts(args.product, args.limit)
+    reference = load_embedding_model(args.model, 'torch').encode(texts, convert_to_numpy=True)
+    results = [check_parity(backend, texts, args.model, reference) for backend in backends]
+    for result in results:
+        print_parity(result)
+    if not all(result['passed'] for result in results):
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,107 @@
+# Akilli Yorum Asistani - Kalıcı Embedding Önbelleği
+# Bu dosya metin parçalarının embedding'lerini SQLite'ta saklar; anahtar metin + model adının (arka uç dahil) hash'idir
+# Yeniden indekslemede değişmeyen parçalar ve farklı satıcılarda tekrar eden aynı yorumlar bir daha vektörleştirilmez
+# Hackathon Projesi - AI Destekli Yorum Analizi
+
+import hashlib
+import os
+import sqlite3
+import time
+
+import numpy as np
+
+CACHE_PATH = os.getenv('EMBEDDING_CACHE_PATH',
+                       os.path.join(os.path.dirname(os.path.abspath(__file__)), 'embeddings.db'))
+
+LOOKUP_BATCH_SIZE = 500  # tek sorguda aranan anahtar sayısı (SQLite parametre sınırının altında)
+BUSY_TIMEOUT_MS = 10000
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS embeddings (
+    key BLOB PRIMARY KEY,
+    model TEXT NOT NULL,
+    dim INTEGER NOT NULL,
+    vector BLOB NOT NULL,
+    created_at TEXT
+) WITHOUT ROWID;
+"""
+
+
+def cache_key(text, model_name):
+    """Metin ve model adından önbellek anahtarı üretir (model değişirse eski vektörler kullanılmaz)"""
+    return hashlib.sha1(f'{model_name}\0{text}'.encode('utf-8')).digest()
+
+
+class EmbeddingCache:
+    """
+    Bir embedding modeline ait vektörleri okur/yazar.
+    Vektörler float32 byte dizisi olarak saklanır; WAL modu sayesinde paralel indexer'lar
+    aynı önbelleği paylaşabilir. Sayaçlar bu süreçteki isabet/ıskalama sayılarını tutar.
+    """
+
+    def __init__(self, model_name, path=None):
+        self.model_name = model_name
+        self.stats = {'hits': 0, 'misses': 0}
+        self._conn = sqlite3.connect(path or CACHE_PATH, timeout=BUSY_TIMEOUT_MS / 1000)
+        self._conn.execute('PRAGMA journal_mode=WAL')
+        self._conn.execute('PRAGMA synchronous=NORMAL')
+        self._conn.executescript(SCHEMA)
+
+    def get_many(self, keys):
+        """Bulunan anahtarlar için {anahtar: vektör} sözlüğü döndürür"""
+        keys = list(keys)
+        found = {}
+        for start in range(0, len(keys), LOOKUP_BATCH_SIZE):
+            part = keys[start:start + LOOKUP_BATCH_SIZE]
+            placeholders = ', '.join('?' * len(part))
+            rows = self._conn.execute(
+                f'SELECT key, vector FROM embeddings WHERE model = ? AND key IN ({placeholders})',
+                (self.model_name, *part)
+            )
+            for key, vector in rows:
+                found[key] = np.frombuffer(vector, dtype=np.float32)
+        return found
+
+    def put_many(self, items):
+        """(anahtar, vektör) çiftlerini kaydeder; aynı anahtar başka bir süreçte yazıldıysa atlanır"""
+        now = time.strftime('%Y-%m-%dT%H:%M:%S')
+        rows = []
+        for key, vector in items:
+            vector = np.asarray(vector, dtype=np.float32)
+            rows.append((key, self.model_name, vector.shape[0], vector.tobytes(), now))
+        with self._conn:
+            self._conn.executemany(
+                'INSERT OR IGNORE INTO embeddings (key, model, dim, vector, created_at) VALUES (?, ?, ?, ?, ?)',
+                rows
+            )
+
+    def encode(self, texts, encoder):
+        """
+        Metinlerin embedding'lerini sırasıyla döndürür (float32, satır başına bir metin).
+        Sadece önbellekte olmayan metinler encoder(liste) ile vektörleştirilir; grup içindeki
+        tekrar eden metinler de bir kez vektörleştirilir.
+        """
+        keys = [cache_key(text, self.model_name) for text in texts]
+        vectors = self.get_many(set(keys))
+
+        missing = {}
+        for key, text in zip(keys, texts):
+            if key not in vectors:
+                missing.setdefault(key, text)
+        self.stats['hits'] += len(keys) - sum(1 for key in keys if key in missing)
+        self.stats['misses'] += len(missing)
+
+        if missing:
+            encoded = np.asarray(encoder(list(missing.values())), dtype=np.float32)
+            self.put_many(zip(missing, encoded))
+            vectors.update(zip(missing, encoded))
+        return np.vstack([vectors[key] for key in keys])
+
+    def close(self):
+        self._conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
@@ -0,0 +1,167 @@
+# Akilli Yorum Asistani - Toplu Vektörleştirme Motoru
+# Bu dosya index oluştururken metin parçalarını embedding modeliyle (torch veya ONNX arka ucu) toplu halde vektörleştirir
+# Parçalar token uzunluğuna göre sıralanıp benzer uzunluktakiler aynı gruba konur (daha az padding)
+# Büyük derlemlerde iş birden fazla CPU sürecine dağıtılır; hız parça/saniye olarak raporlanır
+# Hackathon Projesi - AI Destekli Yorum Analizi
+
+import argparse
+import os
+import time
+
+import numpy as np
+
+# Ayarlar - ortam değişkenleri ile değiştirilebilir
+# ENCODE_BATCH_SIZE: modelin tek ileri geçişte işlediği parça sayısı
+# ENCODE_THREADS: torch / ONNX Runtime'ın kullanacağı toplam CPU thread'i (0: kütüphane varsayılanı)
+# ENCODE_WORKERS: süreç havuzundaki işçi sayısı (1: havuz kullanılmaz, sadece torch arka ucunda)
+ENCODE_BATCH_SIZE = int(os.getenv('ENCODE_BATCH_SIZE', '64'))
+ENCODE_THREADS = int(os.getenv('ENCODE_THREADS', '0'))
+ENCODE_WORKERS = int(os.getenv('ENCODE_WORKERS', '1'))
+
+# Süreç havuzu sadece bu kadar parçalık gruplarda kullanılır; küçük gruplarda süreçler arası kopyalama kazancı siler
+MULTI_PROCESS_MIN_TEXTS = 2000
+# Havuzda her işçiye tek seferde verilen parça sayısı (uzunluğa göre sıralı ardışık dilimler)
+POOL_CHUNK_SIZE = 1000
+
+
+class EmbeddingEngine:
+    """
+    Bir embedding modeliyle (SentenceTransformer veya embedding_backends.OnnxEmbedder) metinleri vektörleştirir.
+    encode(metinler) sonuçları girdi sırasıyla döndürür; arada metinler token uzunluğuna göre sıralanıp
+    batch_size'lık gruplar halinde modele verilir. Her grup en uzun metnine göre doldurulduğu (padding)
+    için benzer uzunluktaki metinleri bir araya getirmek boşa yapılan hesabı azaltır.
+    stats: işlenen parça, gerçek token, padding dahil token sayıları ve toplam süre.
+    """
+
+    def __init__(self, model, batch_size=ENCODE_BATCH_SIZE, threads=ENCODE_THREADS, workers=ENCODE_WORKERS):
+        self.model = model
+        self.batch_size = max(1, batch_size)
+        self.workers = max(1, workers)
+        self.stats = {'texts': 0, 'tokens': 0, 'padded_tokens': 0, 'seconds': 0.0}
+        self._pool = None
+        # ONNX arka ucu süreç havuzu kullanmaz; paralellik ONNX Runtime'ın kendi thread'leriyle sağlanır
+        if not hasattr(model, 'start_multi_process_pool'):
+            self.workers = 1
+        if threads:
+            if hasattr(model, 'set_num_threads'):
+                model.set_num_threads(threads)
+            else:
+                import torch
+                torch.set_num_threads(threads if self.workers == 1 else max(1, threads // self.workers))
+        self._threads = threads
+
+    def token_lengths(self, texts):
+        """Her metnin modelin göreceği token sayısı (max_seq_length ile kesilmiş); tokenizer yoksa karakter sayısı"""
+        tokenizer = getattr(self.model, 'tokenizer', None)
+        if tokenizer is None:
+            return np.array([len(text) for text in texts], dtype=np.int64)
+        limit = getattr(self.model, 'max_seq_length', None) or 512
+        encoded = tokenizer(list(texts), add_special_tokens=True, truncation=True, max_length=limit)
+        return np.array([len(ids) for ids in encoded['input_ids']], dtype=np.int64)
+
+    def encode(self, texts):
+        """Metinleri vektörleştirir (float32, girdi sırasıyla)"""
+        texts = list(texts)
+        if not texts:
+            return np.empty((0, self.model.get_sentence_embedding_dimension()), dtype=np.float32)
+        start = time.perf_counter()
+
+        # Uzundan kısaya sırala; ardışık batch_size'lık gruplar benzer uzunlukta olur
+        lengths = self.token_lengths(texts)
+        order = np.argsort(-lengths, kind='stable')
+        sorted_texts = [texts[i] for i in order]
+
+        if self.workers > 1 and len(texts) >= MULTI_PROCESS_MIN_TEXTS:
+            # Sıralı dilimler işçilere dağıtılır; her işçinin dilimi de benzer uzunlukta metinlerden oluşur
+            encoded = self.model.encode_multi_process(sorted_texts, self._start_pool(),
+                                                      batch_size=self.batch_size, chunk_size=POOL_CHUNK_SIZE)
+        else:
+            encoded = np.vstack([
+                self.model.encode(sorted_texts[i:i + self.batch_size], batch_size=self.batch_size,
+                                  convert_to_numpy=True, show_progress_bar=False)
+                for i in range(0, len(sorted_texts), self.batch_size)
+            ])
+
+        embeddings = np.empty_like(encoded, dtype=np.float32)
+        embeddings[order] = encoded
+
+        sorted_lengths = lengths[order]
+        self.stats['texts'] += len(texts)
+        self.stats['tokens'] += int(lengths.sum())
+        self.stats['padded_tokens'] += sum(int(sorted_lengths[i]) * len(sorted_lengths[i:i + self.batch_size])
+                                           for i in range(0, len(sorted_lengths), self.batch_size))
+        self.stats['seconds'] += time.perf_counter() - start
+        return embeddings
+
+    def throughput(self):
+        """Saniyede vektörleştirilen parça sayısı"""
+        return self.stats['texts'] / self.stats['seconds'] if self.stats['seconds'] else 0.0
+
+    def report(self):
+        """Yapı makinesini boyutlandırmak için tek satırlık özet (hız ve padding doluluk oranı)"""
+        if not self.stats['texts']:
+            return 'Vektörleştirme: model çalışmadı (tüm parçalar önbellekte).'
+        fill = self.stats['tokens'] / self.stats['padded_tokens'] if self.stats['padded_tokens'] else 1.0
+        return (f"Vektörleştirme: {self.stats['texts']} parça, {self.stats['seconds']:.1f} sn, "
+                f"{self.throughput():.0f} parça/sn ({getattr(self.model, 'backend', 'torch')}, "
+                f"batch {self.batch_size}, {self.workers} süreç, "
+                f"token doluluğu %{fill * 100:.0f}).")
+
+    def _start_pool(self):
+        if self._pool is None:
+            if self._threads:
+                # İşçi süreçleri torch'u kendileri yükler; thread sayısı ortam değişkeniyle aktarılır
+                os.environ['OMP_NUM_THREADS'] = str(max(1, self._threads // self.workers))
+            self._pool = self.model.start_multi_process_pool(['cpu'] * self.workers)
+        return self._pool
+
+    def close(self):
+        """Süreç havuzunu kapatır"""
+        if self._pool is not None:
+            self.model.stop_multi_process_pool(self._pool)
+            self._pool = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+
+def main():
+    # Yapı makinesi boyutlandırma: bir ürünün parçalarını farklı ayarlarla vektörleştirip hızı karşılaştırır
+    from artifact_store import product_dir, resolve_product
+    from chunk_store import open_chunks
+    from embedding_backends import BACKENDS, EMBEDDING_BACKEND, EMBEDDING_MODEL, load_embedding_model
+
+    parser = argparse.ArgumentParser(description='Vektörleştirme hızını (parça/sn) farklı ayarlarla ölçer')
+    parser.add_argument('--product', default='latest', help="Ürün anahtarı veya en son çekilen ürün için 'latest'")
+    parser.add_argument('--model', default=EMBEDDING_MODEL, help='Embedding modeli')
+    parser.add_argument('--backend', choices=BACKENDS, default=EMBEDDING_BACKEND, help='Embedding arka ucu')
+    parser.add_argument('--limit', type=int, default=20000, help='En fazla bu kadar parça kullanılır')
+    parser.add_argument('--batch-sizes', default=str(ENCODE_BATCH_SIZE), help='Virgülle ayrılmış batch boyutları')
+    parser.add_argument('--workers', default='1', help='Virgülle ayrılmış süreç sayıları')
+    parser.add_argument('--threads', type=int, default=ENCODE_THREADS, help='Toplam torch thread sayısı')
+    args = parser.parse_args()
+
+    try:
+        key = resolve_product(args.product, None)
+    except ValueError as e:
+        parser.error(str(e))
+    if not key:
+        print("Ürün bulunamadı, önce yorumları çekin ve indexleyin.")
+        return
+    chunks = open_chunks(product_dir(key))
+    texts = [chunks[i] for i in range(min(args.limit, len(chunks)))]
+    model = load_embedding_model(args.model, args.backend)
+    print(f"{key}: {len(texts)} parça, {args.model} ({args.backend}), {os.cpu_count()} CPU")
+
+    for workers in (int(value) for value in args.workers.split(',')):
+        for batch_size in (int(value) for value in args.batch_sizes.split(',')):
+            with EmbeddingEngine(model, batch_size, args.threads, workers) as engine:
+                engine.encode(texts)
+                print(engine.report())
+
+
+if __name__ == '__main__':
+    main()
@@ -1,135 +1,411 @@
 import time
 import json
-import random
-from selenium import webdriver
+import math
+import itertools
+from concurrent.futures import ThreadPoolExecutor
 from selenium.webdriver.common.by import By
 from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
-from selenium.webdriver.chrome.options import Options
 from selenium.common.exceptions import TimeoutException, NoSuchElementException
 from bs4 import BeautifulSoup
+import requests
 
-def setup_driver():
-    from selenium.webdriver.chrome.service import Service
-    from webdriver_manager.chrome import ChromeDriverManager
-    
-    chrome_options = Options()
-    chrome_options.add_argument("--headless")  # Headless mod aktif
-    chrome_options.add_argument("--no-sandbox")
-    chrome_options.add_argument("--disable-dev-shm-usage")
-    chrome_options.add_argument("--disable-gpu")
-    chrome_options.add_argument("--window-size=1920,1080")
-    chrome_options.add_argument("user-agent=Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36")
+from http_client import build_session
+from driver_pool import lease_driver
+from review_dedup import ReviewDeduplicator
+from page_waits import install_wait_hooks, wait_for_change, polite_pause
 
-    try:
-        service = Service(ChromeDriverManager().install())
-        driver = webdriver.Chrome(service=service, options=chrome_options)
-    except Exception as e:
-        print(f"Hata: WebDriver başlatılamadı. Hata detayı: {e}")
-        return None
-    return driver
+# Yorum kartı ve kart içindeki yorum metni selector'ları
+REVIEW_CARD_SELECTOR = 'div[class^="hermes-ReviewCard-module-"]'
+COMMENT_SELECTOR = f'{REVIEW_CARD_SELECTOR} > span:not([class])'
+
+# TARAYICISIZ (HTTP) YAKLAŞIM
+# Yorum sayfası (-yorumlari?sayfa=N) HTML'i içinde JSON-LD ve gömülü uygulama durumu
+# olarak yapılandırılmış yorum verisi bulunur; sayfalar doğrudan URL ile istenir.
+HTML_HEADERS = {
+    "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36",
+    "Accept": "text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8",
+    "Accept-Language": "tr-TR,tr;q=0.9,en;q=0.8",
+    "Referer": "https://www.hepsiburada.com/"
+}
+
+# Sayfaları paralel indirirken kullanılacak en fazla worker sayısı
+HTTP_MAX_WORKERS = 4
 
-def scrape_current_page(driver, reviews_list, max_reviews):
+# Gömülü uygulama durumunda yorum nesnelerini tanımak için kullanılan alan adları
+STATE_TEXT_KEYS = ('review', 'comment', 'reviewContent', 'content', 'body')
+STATE_RATING_KEYS = ('star', 'rating', 'rate', 'score')
+STATE_PAGE_KEYS = ('totalPages', 'pageCount', 'totalPageCount')
+STATE_TOTAL_KEYS = ('totalCount', 'totalItemCount', 'totalElements', 'totalReviewCount')
+STATE_PAGE_SIZE_KEYS = ('pageSize', 'size', 'limit')
+
+
+class PaginationError(Exception):
+    """HTTP yolunda sonraki sayfalar yeni yorum getirmediğinde fırlatılır (sayfalama okunamadı)"""
+
+def scrape_current_page(driver, reviews_list, max_reviews, dedup):
     """
     Mevcut sayfadaki yorumları çeker ve verilen listeye ekler.
+    Tekrar kontrolü paylaşılan ReviewDeduplicator ile sabit sürede yapılır.
     """
     soup = BeautifulSoup(driver.page_source, "html.parser")
     
-    comment_selector = 'div[class^="hermes-ReviewCard-module-"] > span:not([class])'
-    comment_elements = soup.select(comment_selector)
+    comment_elements = soup.select(COMMENT_SELECTOR)
     
     new_comments_found = 0
     for element in comment_elements:
         if len(reviews_list) >= max_reviews:
             break
         comment_text = element.get_text(strip=True)
-        if comment_text and not any(r['comment'] == comment_text for r in reviews_list):
+        if comment_text and dedup.add(comment_text):
             reviews_list.append({'comment': comment_text})
             new_comments_found += 1
             
     print(f"Bilgi: Bu sayfadan {new_comments_found} yeni yorum eklendi. Toplam: {len(reviews_list)}")
 
-def fetch_reviews_hepsiburada(url, max_reviews=9999):
+def fetch_reviews_hepsiburada_selenium(url, max_reviews=9999):
+    """Selenium ile sekmeye ve sayfa butonlarına tıklayarak yorumları çeker (yedek yöntem)"""
     reviews = []
-    print(f"Hepsiburada için yorum çekme işlemi başlatıldı: {url}")
+    dedup = ReviewDeduplicator()
+    print(f"Hepsiburada için Selenium ile yorum çekme işlemi başlatıldı: {url}")
     
-    driver = None
     try:
-        driver = setup_driver()
-        if not driver: return []
+        # Havuzdan sıcak bir tarayıcı kirala; iş bitince temizlenip havuza döner
+        with lease_driver() as driver:
+            base_product_url = url.split('?')[0]
+            print(f"Bilgi: Ana ürün sayfasına gidiliyor: {base_product_url}")
+            install_wait_hooks(driver)
+            driver.get(base_product_url)
+            
+            try:
+                WebDriverWait(driver, 5).until(EC.element_to_be_clickable((By.ID, "onetrust-accept-btn-handler"))).click()
+                print("Bilgi: Çerez pop-up'ı kapatıldı.")
+                polite_pause()
+            except Exception:
+                print("Bilgi: Çerez pop-up'ı bulunamadı veya zaten kapalı.")
 
-        base_product_url = url.split('?')[0]
-        print(f"Bilgi: Ana ürün sayfasına gidiliyor: {base_product_url}")
-        driver.get(base_product_url)
-        
-        try:
-            WebDriverWait(driver, 5).until(EC.element_to_be_clickable((By.ID, "onetrust-accept-btn-handler"))).click()
-            print("Bilgi: Çerez pop-up'ı kapatıldı.")
-            time.sleep(random.uniform(1.0, 2.0))
-        except Exception:
-            print("Bilgi: Çerez pop-up'ı bulunamadı veya zaten kapalı.")
+            try:
+                print("Bilgi: 'Değerlendirmeler' sekmesini bulmak için bekleniyor...")
+                selector = (By.XPATH, "//a[contains(@href, '-yorumlari')]")
+                reviews_tab = WebDriverWait(driver, 15).until(EC.element_to_be_clickable(selector))
+                print("Bilgi: 'Değerlendirmeler' sekmesi bulundu. Tıklanıyor...")
+                driver.execute_script("arguments[0].click();", reviews_tab)
+                print("Bilgi: 'Değerlendirmeler' sekmesine başarıyla tıklandı.")
+                # Yorumların ilk sayfası görünene veya sayfa boşta kalana kadar bekle
+                wait_for_change(driver, REVIEW_CARD_SELECTOR, previous_count=0, timeout=15)
 
-        try:
-            print("Bilgi: 'Değerlendirmeler' sekmesini bulmak için bekleniyor...")
-            selector = (By.XPATH, "//a[contains(@href, '-yorumlari')]")
-            reviews_tab = WebDriverWait(driver, 15).until(EC.element_to_be_clickable(selector))
-            print("Bilgi: 'Değerlendirmeler' sekmesi bulundu. Tıklanıyor...")
-            driver.execute_script("arguments[0].click();", reviews_tab)
-            print("Bilgi: 'Değerlendirmeler' sekmesine başarıyla tıklandı.")
-            time.sleep(3) # Yorumların ilk sayfasının yüklenmesi için bekle
-
-        except Exception as e:
-            print(f"\nKRİTİK HATA: 'Değerlendirmeler' sekmesi bulunamadı veya tıklanamadı. Hata: {e}")
-            if driver: driver.quit()
-            return []
-
-        # --- YENİ SAYFALANDIRMA (PAGINATION) MANTIĞI ---
-        print("\n--- Sayfalandırma Döngüsü Başlatılıyor ---")
-        
-        # 1. İlk sayfayı çek
-        print("Bilgi: 1. sayfa taranıyor...")
-        scrape_current_page(driver, reviews, max_reviews)
+            except Exception as e:
+                print(f"\nKRİTİK HATA: 'Değerlendirmeler' sekmesi bulunamadı veya tıklanamadı. Hata: {e}")
+                return []
 
-        page_to_click = 2
-        while len(reviews) < max_reviews:
-            try:
-                # Sonraki sayfanın butonunu bul
-                print(f"Bilgi: {page_to_click}. sayfa butonu aranıyor...")
-                
-                # XPath: İçindeki span'in metni bir sonraki sayfa numarası olan `li` elementini bulur.
-                page_button_xpath = f"//li[.//span[text()='{page_to_click}']]"
-                
-                page_button = WebDriverWait(driver, 5).until(
-                    EC.element_to_be_clickable((By.XPATH, page_button_xpath))
-                )
-                
-                # Butona tıkla
-                driver.execute_script("arguments[0].click();", page_button)
-                print(f"Bilgi: {page_to_click}. sayfaya başarıyla geçildi.")
-                
-                # Yeni sayfanın yüklenmesini bekle
-                time.sleep(random.uniform(0.5, 1.5))
-                
-                # Yeni sayfadaki yorumları çek
-                print(f"Bilgi: {page_to_click}. sayfa taranıyor...")
-                scrape_current_page(driver, reviews, max_reviews)
-
-                # Bir sonraki sayfa için sayacı artır
-                page_to_click += 1
-
-            except (TimeoutException, NoSuchElementException):
-                print(f"Bilgi: {page_to_click}. sayfa butonu bulunamadı. Muhtemelen son sayfa.")
-                break # Döngüyü sonlandır
+            # --- YENİ SAYFALANDIRMA (PAGINATION) MANTIĞI ---
+            print("\n--- Sayfalandırma Döngüsü Başlatılıyor ---")
+            
+            # 1. İlk sayfayı çek
+            print("Bilgi: 1. sayfa taranıyor...")
+            scrape_current_page(driver, reviews, max_reviews, dedup)
+
+            page_to_click = 2
+            while len(reviews) < max_reviews:
+                try:
+                    # Sonraki sayfanın butonunu bul
+                    print(f"Bilgi: {page_to_click}. sayfa butonu aranıyor...")
+                    
+                    # XPath: İçindeki span'in metni bir sonraki sayfa numarası olan `li` elementini bulur.
+                    page_button_xpath = f"//li[.//span[text()='{page_to_click}']]"
+                    
+                    page_button = WebDriverWait(driver, 5).until(
+                        EC.element_to_be_clickable((By.XPATH, page_button_xpath))
+                    )
+                    
+                    # Butona tıkla
+                    driver.execute_script("arguments[0].click();", page_button)
+                    print(f"Bilgi: {page_to_click}. sayfaya başarıyla geçildi.")
+                    
+                    # Yeni sayfanın yüklenmesini bekle: sayfa başına kart sayısı aynı kalabileceği
+                    # için burada asıl sinyal ağ trafiğinin ve DOM değişikliklerinin durmasıdır
+                    wait_for_change(driver, REVIEW_CARD_SELECTOR)
+                    polite_pause()
+                    
+                    # Yeni sayfadaki yorumları çek
+                    print(f"Bilgi: {page_to_click}. sayfa taranıyor...")
+                    scrape_current_page(driver, reviews, max_reviews, dedup)
+
+                    # Bir sonraki sayfa için sayacı artır
+                    page_to_click += 1
+
+                except (TimeoutException, NoSuchElementException):
+                    print(f"Bilgi: {page_to_click}. sayfa butonu bulunamadı. Muhtemelen son sayfa.")
+                    break # Döngüyü sonlandır
             
     except Exception as e:
         print(f"Hata: İşlem sırasında beklenmedik bir hata oluştu: {e}")
-    finally:
-        if driver:
-            driver.quit()
     
     print(f"\nToplam {len(reviews)} adet benzersiz yorum başarıyla çekildi.")
     return reviews
 
+
+def reviews_page_url(url, page):
+    """Ürün URL'sinden N. yorum sayfasının doğrudan URL'sini üretir"""
+    base_url = url.split('?')[0].rstrip('/')
+    if not base_url.endswith('-yorumlari'):
+        base_url += '-yorumlari'
+    return base_url if page <= 1 else f"{base_url}?sayfa={page}"
+
+
+def _iter_json_ld(soup):
+    """Sayfadaki tüm JSON-LD nesnelerini (liste ve @graph dahil) sırayla döndürür"""
+    for script in soup.select('script[type="application/ld+json"]'):
+        try:
+            data = json.loads(script.string or '')
+        except ValueError:
+            continue
+        items = data if isinstance(data, list) else [data]
+        for item in items:
+            if isinstance(item, dict):
+                yield item
+                for node in item.get('@graph', []):
+                    if isinstance(node, dict):
+                        yield node
+
+
+def _parse_count(value):
+    """Yorum sayısı gibi tam sayıları okur: "1.234" / "1,234" binlik ayraçlıdır; okunamazsa None"""
+    if isinstance(value, (int, float)):
+        return int(value)
+    digits = ''.join(ch for ch in str(value or '') if ch.isdigit())
+    return int(digits) if digits else None
+
+
+def _parse_rating(value):
+    """Puanı tam sayıya çevirir: "4,5" ondalık virgüllü olabilir; okunamazsa 0"""
+    try:
+        return int(float(str(value or 0).replace(',', '.')))
+    except (ValueError, OverflowError):
+        return 0
+
+
+def _parse_json_ld(soup):
+    """JSON-LD Product nesnesinden yorumları ve toplam yorum sayısını çıkarır"""
+    reviews = []
+    review_count = None
+    for item in _iter_json_ld(soup):
+        aggregate = item.get('aggregateRating')
+        if isinstance(aggregate, dict) and aggregate.get('reviewCount'):
+            review_count = _parse_count(aggregate['reviewCount']) or review_count
+
+        entries = item.get('review') or []
+        for entry in entries if isinstance(entries, list) else [entries]:
+            if not isinstance(entry, dict):
+                continue
+            comment = entry.get('reviewBody') or entry.get('description') or ''
+            if not isinstance(comment, str) or not comment.strip():
+                continue
+            author = entry.get('author') or {}
+            rating = entry.get('reviewRating')
+            reviews.append({
+                'comment': comment.strip(),
+                'rate': _parse_rating(rating.get('ratingValue') if isinstance(rating, dict) else rating),
+                'user': (author.get('name') if isinstance(author, dict) else author) or 'Anonim',
+                'date': entry.get('datePublished') or '',
+                'source': 'html_json_ld'
+            })
+    return reviews, review_count
+
+
+def _load_embedded_state(soup):
+    """__NEXT_DATA__ / window.__...STATE__ gibi gömülü uygulama durumlarını JSON olarak döndürür"""
+    states = []
+    for script in soup.find_all('script'):
+        text = (script.string or '').strip()
+        if not text:
+            continue
+        if script.get('type') == 'application/json':
+            payload = text
+        elif text.startswith('window.') and '=' in text and 'STATE' in text.split('=', 1)[0].upper():
+            payload = text.split('=', 1)[1].strip().rstrip(';')
+        else:
+            continue
+        try:
+            states.append(json.loads(payload))
+        except ValueError:
+            continue
+    return states
+
+
+def _walk_state(node, reviews, meta):
+    """Uygulama durumunu dolaşıp yorum nesnelerini ve sayfalama alanlarını (sayfa/yorum sayısı, sayfa boyutu) toplar"""
+    if isinstance(node, dict):
+        for meta_key, keys in (('total_pages', STATE_PAGE_KEYS), ('total_count', STATE_TOTAL_KEYS),
+                               ('page_size', STATE_PAGE_SIZE_KEYS)):
+            for key in keys:
+                if isinstance(node.get(key), int) and not isinstance(node[key], bool) and node[key] > 0:
+                    meta[meta_key] = max(meta.get(meta_key, 0), node[key])
+
+        text_key = next((k for k in STATE_TEXT_KEYS if isinstance(node.get(k), str)), None)
+        rating_key = next((k for k in STATE_RATING_KEYS if isinstance(node.get(k), (int, float))), None)
+        if text_key and rating_key and len(node[text_key].strip()) > 3:
+            user = node.get('customer') or node.get('user') or {}
+            reviews.append({
+                'comment': node[text_key].strip(),
+                'rate': int(node[rating_key]),
+                'user': (user.get('name') if isinstance(user, dict) else user) or 'Anonim',
+                'date': node.get('createdAt') or node.get('date') or '',
+                'source': 'html_state'
+            })
+            return
+
+        for value in node.values():
+            _walk_state(value, reviews, meta)
+    elif isinstance(node, list):
+        for value in node:
+            _walk_state(value, reviews, meta)
+
+
+def parse_reviews_html(html):
+    """
+    Yorum sayfası HTML'inden yapılandırılmış yorumları çıkarır.
+    Önce sayfaya özel gömülü uygulama durumu, sonuç yoksa JSON-LD denenir. JSON-LD ürün düzeyindedir
+    ve her sayfada aynı yorumları tekrarlar; bu yüzden sayfa sayısı yalnızca uygulama durumundaki
+    sayfalama alanlarından hesaplanır (toplam sayfa, ya da toplam yorum / sayfa boyutu).
+    Dönüş: (yorumlar, toplam sayfa sayısı veya None, toplam yorum sayısı veya None)
+    """
+    soup = BeautifulSoup(html, "html.parser")
+    json_ld_reviews, review_count = _parse_json_ld(soup)
+
+    meta = {}
+    state_reviews = []
+    for state in _load_embedded_state(soup):
+        _walk_state(state, state_reviews, meta)
+
+    total_pages = meta.get('total_pages')
+    page_size = meta.get('page_size') or len(state_reviews)
+    if not total_pages and meta.get('total_count') and page_size:
+        total_pages = math.ceil(meta['total_count'] / page_size)
+    return state_reviews or json_ld_reviews, total_pages, meta.get('total_count') or review_count
+
+
+def _fetch_reviews_page(session, url, page):
+    """Tek bir yorum sayfasını indirip ayrıştırır; hata durumunda None döner"""
+    page_url = reviews_page_url(url, page)
+    try:
+        resp = session.get(page_url, timeout=30)
+    except requests.exceptions.RequestException as e:
+        print(f"Hata: {page}. sayfa indirilemedi: {e}")
+        return None
+    if resp.status_code != 200:
+        print(f"Hata: {page}. sayfa {resp.status_code} döndürdü.")
+        return None
+    # Bozuk bir sayfa diğer sayfaların indirilmesini durdurmamalı (executor.map hatayı yeniden fırlatır)
+    try:
+        return parse_reviews_html(resp.text)
+    except Exception as e:
+        print(f"Hata: {page}. sayfa ayrıştırılamadı: {e!r}")
+        return None
+
+
+def iter_reviews_hepsiburada_http(url, max_reviews=9999, max_workers=HTTP_MAX_WORKERS):
+    """
+    Tarayıcı açmadan yorumları çeker ve sayfa sırasıyla üretir: ilk sayfadan sayfa
+    sayısı okunur, kalan sayfalar tek bir bağlantı havuzu üzerinden paralel indirilir.
+    Yapılandırılmış veri bulunamazsa hiçbir şey üretmez; sonraki sayfalar hiç yeni yorum
+    getirmezse veya sayfalama bilgisi olmadan yorumların yalnızca bir kısmı alınabildiyse
+    PaginationError fırlatır.
+    """
+    print(f"Hepsiburada için HTTP ile yorum çekme işlemi başlatıldı: {url}")
+    session = build_session(HTML_HEADERS, pool_size=max_workers)
+    executor = None
+    try:
+        first = _fetch_reviews_page(session, url, 1)
+        if not first or not first[0]:
+            print("Bilgi: Sayfada yapılandırılmış yorum verisi bulunamadı.")
+            return
+
+        first_reviews, total_pages, review_count = first
+        page_size = len(first_reviews)
+        # Sayfalama bilgisi yokken yorum sayısı ilk sayfadakinden fazlaysa kalanlar HTTP ile alınamaz
+        unpaged = not total_pages and (review_count or 0) > page_size
+        if not total_pages:
+            # Sayfalama bilgisi yoksa yalnızca ilk sayfa kullanılır; JSON-LD yorum sayısından sayfa tahmin edilmez
+            print(f"Bilgi: Sayfalama bilgisi bulunamadı (toplam yorum: {review_count or 'bilinmiyor'}), yalnızca ilk sayfa kullanılacak.")
+            total_pages = 1
+        # max_reviews'a ulaşmak için gereken sayfadan fazlası istenmez
+        total_pages = min(total_pages, math.ceil(max_reviews / page_size))
+        print(f"Bilgi: Toplam {total_pages} yorum sayfası indirilecek.")
+
+        pages = [(1, first)]
+        if total_pages > 1:
+            # executor.map sonuçları sayfa sırasıyla, indirildikçe verir
+            executor = ThreadPoolExecutor(max_workers=min(max_workers, total_pages - 1))
+            pages = itertools.chain(pages, executor.map(
+                lambda page: (page, _fetch_reviews_page(session, url, page)), range(2, total_pages + 1)))
+
+        count = 0
+        later_count = 0  # 2. ve sonraki sayfalardan gelen yeni yorumlar
+        fetched_pages = 0
+        dedup = ReviewDeduplicator()
+        for page, result in pages:
+            if not result:
+                continue
+            fetched_pages += 1
+            for review in result[0]:
+                if count >= max_reviews:
+                    break
+                if dedup.add(review['comment']):
+                    count += 1
+                    later_count += page > 1
+                    yield review
+
+        print(f"Bilgi: HTTP ile {fetched_pages}/{total_pages} sayfadan {count} yorum çekildi.")
+        if count < max_reviews:
+            if total_pages > 1 and not later_count:
+                raise PaginationError(f"{total_pages - 1} sonraki sayfa yeni yorum getirmedi")
+            if unpaged:
+                raise PaginationError(f"sayfalama bilgisi yok, {review_count} yorumdan {count} tanesi alındı")
+    finally:
+        if executor:
+            executor.shutdown(wait=True, cancel_futures=True)
+        session.close()
+
+
+def fetch_reviews_hepsiburada_http(url, max_reviews=9999, max_workers=HTTP_MAX_WORKERS):
+    """iter_reviews_hepsiburada_http'nin liste döndüren hali"""
+    return list(iter_reviews_hepsiburada_http(url, max_reviews, max_workers))
+
+
+def iter_reviews_hepsiburada(url, max_reviews=9999):
+    """
+    Hepsiburada yorumlarını çekildikçe üretir: önce tarayıcısız HTTP yolu denenir,
+    yapılandırılmış veri alınamazsa veya sayfalama çalışmazsa Selenium yedek olarak kullanılır.
+    """
+    produced = ReviewDeduplicator()
+    try:
+        for review in iter_reviews_hepsiburada_http(url, max_reviews):
+            produced.add(review['comment'])
+            yield review
+        if len(produced):
+            return
+        print("Bilgi: HTTP yolu başarısız, Selenium yedek yöntemine geçiliyor...")
+    except PaginationError as e:
+        print(f"Hata: HTTP sayfalaması başarısız ({e}), Selenium yedek yöntemine geçiliyor...")
+    except Exception as e:
+        print(f"Hata: HTTP ile yorum çekme sırasında beklenmedik hata: {e!r}")
+
+    # Selenium baştan çeker; HTTP yolunda üretilmiş yorumlar tekrar üretilmez
+    count = len(produced)
+    for review in fetch_reviews_hepsiburada_selenium(url, max_reviews):
+        if count >= max_reviews:
+            break
+        if produced.add(review['comment']):
+            count += 1
+            yield review
+
+
+def fetch_reviews_hepsiburada(url, max_reviews=9999):
+    """iter_reviews_hepsiburada'nın liste döndüren hali"""
+    return list(iter_reviews_hepsiburada(url, max_reviews))
+
+
 def main_process(url):
     print(f"İşlem başlatıldı: {url}")
     reviews = fetch_reviews_hepsiburada(url)
@@ -0,0 +1,157 @@
+# Akilli Yorum Asistani - Disk Tabanlı HTTP Yanıt Önbelleği
+# Bu dosya yorum API sayfalarının yanıtlarını diskte saklar
+# Anahtar: ürün slug'ı + merchant ID + sayfa; TTL, LRU boyut sınırı ve ETag/Last-Modified ile yeniden doğrulama
+# Yazmalar atomik (geçici dosya + os.replace) olduğu için birden fazla süreç aynı önbelleği paylaşabilir
+# Hackathon Projesi - AI Destekli Yorum Analizi
+
+import hashlib
+import json
+import os
+import tempfile
+import threading
+import time
+
+CACHE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'http_cache')
+
+# Önbellek ayarları - ortam değişkenleri ile değiştirilebilir
+DEFAULT_TTL = int(os.getenv('HTTP_CACHE_TTL', '900'))                   # saniye
+DEFAULT_MAX_ENTRIES = int(os.getenv('HTTP_CACHE_MAX_ENTRIES', '5000'))  # dosya sayısı
+EVICT_EVERY = 50  # her bu kadar yazmada bir LRU temizliği yapılır
+
+
+class ResponseCache:
+    """
+    Her kayıt ayrı bir JSON dosyasıdır: {stored_at, etag, last_modified, body}.
+    Dosyanın mtime değeri son erişim zamanı olarak kullanılır (LRU).
+    Sayaçlar bu süreçteki isabet/ıskalama sayılarını tutar: her lookup ya isabet (taze kayıt sunuldu)
+    ya da ıskalamadır; 304 ile yeniden doğrulananlar ıskalamaların alt kümesidir.
+    """
+
+    def __init__(self, cache_dir=CACHE_DIR, ttl=DEFAULT_TTL, max_entries=DEFAULT_MAX_ENTRIES):
+        self.cache_dir = cache_dir
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.stats = {'hits': 0, 'misses': 0, 'revalidated': 0, 'stores': 0, 'evictions': 0}
+        self._lock = threading.Lock()
+        self._writes = 0
+
+    @staticmethod
+    def make_key(*parts):
+        """Parçalardan (slug, merchant, sayfa) içerik adresli bir anahtar üretir"""
+        return hashlib.sha256('|'.join(str(part) for part in parts).encode('utf-8')).hexdigest()
+
+    def _path(self, key):
+        return os.path.join(self.cache_dir, key[:2], f'{key}.json')
+
+    def _count(self, name):
+        with self._lock:
+            self.stats[name] += 1
+
+    def lookup(self, key, revalidate=False):
+        """
+        Kaydı okur. Dönüş: (kayıt veya None, taze_mi)
+        Taze kayıt sunulmayan her okuma (yok, bozuk, eski veya revalidate=True) ıskalama sayılır.
+        """
+        path = self._path(key)
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                entry = json.load(f)
+            os.utime(path)  # LRU için son erişim zamanını güncelle
+        except (OSError, ValueError):
+            self._count('misses')
+            return None, False
+
+        fresh = time.time() - entry.get('stored_at', 0) < self.ttl
+        self._count('hits' if fresh and not revalidate else 'misses')
+        return entry, fresh
+
+    @staticmethod
+    def conditional_headers(entry):
+        """Eski bir kayıt için If-None-Match / If-Modified-Since başlıklarını üretir"""
+        headers = {}
+        if entry and entry.get('etag'):
+            headers['If-None-Match'] = entry['etag']
+        if entry and entry.get('last_modified'):
+            headers['If-Modified-Since'] = entry['last_modified']
+        return headers
+
+    def revalidated(self, key, entry):
+        """Sunucu 304 döndürdüğünde kaydın süresini yeniler"""
+        self._count('revalidated')
+        self._write(key, dict(entry, stored_at=time.time()))
+
+    def store(self, key, body, response_headers):
+        """Yeni yanıtı doğrulayıcı başlıklarıyla birlikte kaydeder"""
+        self._write(key, {
+            'stored_at': time.time(),
+            'etag': response_headers.get('ETag'),
+            'last_modified': response_headers.get('Last-Modified'),
+            'body': body
+        })
+
+    def _write(self, key, entry):
+        """Kaydı geçici dosyaya yazıp atomik olarak yerine taşır"""
+        path = self._path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                json.dump(entry, f, ensure_ascii=False)
+            os.replace(tmp_path, path)
+        except OSError:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+
+        self._count('stores')
+        with self._lock:
+            self._writes += 1
+            should_evict = self._writes % EVICT_EVERY == 0
+        if should_evict:
+            self.evict()
+
+    def evict(self):
+        """Kayıt sayısı sınırı aşıldıysa en uzun süredir erişilmeyen kayıtları siler"""
+        entries = []
+        for root, _, files in os.walk(self.cache_dir):
+            for name in files:
+                if not name.endswith('.json'):
+                    continue
+                path = os.path.join(root, name)
+                try:
+                    entries.append((os.path.getmtime(path), path))
+                except OSError:
+                    continue  # başka bir süreç silmiş olabilir
+
+        overflow = len(entries) - self.max_entries
+        if overflow <= 0:
+            return
+        for _, path in sorted(entries)[:overflow]:
+            try:
+                os.remove(path)
+                self._count('evictions')
+            except OSError:
+                continue
+
+    def report(self):
+        """İsabet oranı dahil sayaçların özetini döndürür"""
+        with self._lock:
+            stats = dict(self.stats)
+        # Yeniden doğrulananlar ıskalama olarak da sayıldığı için paydaya tekrar eklenmez
+        served = stats['hits'] + stats['revalidated']
+        total = stats['hits'] + stats['misses']
+        stats['hit_rate'] = round(served / total, 3) if total else 0.0
+        return stats
+
+
+_default_cache = None
+_default_cache_lock = threading.Lock()
+
+
+def get_response_cache():
+    """Süreç genelinde paylaşılan varsayılan önbelleği döndürür"""
+    global _default_cache
+    with _default_cache_lock:
+        if _default_cache is None:
+            _default_cache = ResponseCache()
+    return _default_cache
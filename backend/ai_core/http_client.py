@@ -0,0 +1,66 @@
+# Akilli Yorum Asistani - Ortak HTTP İstemcisi
+# Bu dosya HTTP tabanlı yorum çekicilerin paylaştığı bağlantı havuzlu session'ı oluşturur
+# Tek bir session sayesinde TCP/TLS bağlantıları sayfalar arasında tekrar kullanılır
+# Hackathon Projesi - AI Destekli Yorum Analizi
+
+import threading
+from urllib.parse import urlparse
+
+import requests
+from requests.adapters import HTTPAdapter
+
+# Varsayılan bağlantı havuzu boyutu - eşzamanlı worker sayısı ile aynı tutulmalı
+DEFAULT_POOL_SIZE = 8
+
+# Alan adı -> hız sınırlayıcı (acquire() metodu olan herhangi bir nesne)
+# Tarama zamanlayıcısı (crawl_scheduler) burada site başına token bucket kaydeder
+_rate_limiters = {}
+_rate_limiters_lock = threading.Lock()
+
+
+def register_rate_limiter(domain, limiter):
+    """Alan adı (ve alt alan adları) için istek başına çağrılacak hız sınırlayıcıyı kaydeder"""
+    with _rate_limiters_lock:
+        _rate_limiters[domain] = limiter
+
+
+def unregister_rate_limiter(domain):
+    """Alan adı için kayıtlı hız sınırlayıcıyı kaldırır"""
+    with _rate_limiters_lock:
+        _rate_limiters.pop(domain, None)
+
+
+def _limiter_for(url):
+    """URL'nin host'una uyan hız sınırlayıcıyı döndürür; yoksa None"""
+    host = urlparse(url).hostname or ''
+    with _rate_limiters_lock:
+        for domain, limiter in _rate_limiters.items():
+            if host == domain or host.endswith('.' + domain):
+                return limiter
+    return None
+
+
+class RateLimitedSession(requests.Session):
+    """Her istekten önce host'un hız sınırlayıcısından izin alan Session"""
+
+    def request(self, method, url, *args, **kwargs):
+        limiter = _limiter_for(url)
+        if limiter is not None:
+            limiter.acquire()
+        return super().request(method, url, *args, **kwargs)
+
+
+def build_session(headers, pool_size=DEFAULT_POOL_SIZE):
+    """
+    Verilen header'larla bağlantı havuzlu bir requests.Session oluşturur.
+    Havuz boyutu eşzamanlı istek sayısı kadar olmalı, aksi halde urllib3
+    fazla bağlantıları kapatıp her istekte yeniden açar.
+    Kayıtlı bir hız sınırlayıcı varsa her istek ondan izin alır.
+    """
+    session = RateLimitedSession()
+    session.headers.update(headers)
+
+    adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+    session.mount('https://', adapter)
+    session.mount('http://', adapter)
+    return session
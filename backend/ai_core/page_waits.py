@@ -0,0 +1,136 @@
+# Akilli Yorum Asistani - Olay Tabanlı Bekleme Katmanı
+# Bu dosya Selenium scraper'larındaki sabit time.sleep beklemelerinin yerini alır
+# Bekleme, yorum kartı sayısı değiştiğinde veya sayfanın ağ trafiği durduğunda biter
+# Nezaket amaçlı rastgele bekleme (jitter) ayrı ve ayarlanabilir bir parametredir
+# Hackathon Projesi - AI Destekli Yorum Analizi
+
+import os
+import random
+import time
+
+from selenium.common.exceptions import WebDriverException
+
+# Varsayılan bekleme sınırları
+DEFAULT_TIMEOUT = 10      # saniye - hiçbir olay gelmezse en fazla bu kadar beklenir
+NETWORK_IDLE_MS = 500     # ms - bu süre boyunca istek/DOM değişikliği yoksa sayfa boşta sayılır
+
+# Sayfaya enjekte edilen izleme betiği
+# MutationObserver ile DOM değişikliklerini, XHR/fetch kancaları ile açık istekleri sayar.
+# Aynı dokümanda ikinci kez çalışırsa hiçbir şey yapmaz.
+WAIT_HOOKS_JS = """
+(function () {
+    if (window.__raWait) return;
+    const state = window.__raWait = {inflight: 0, mutations: 0, lastActivity: Date.now()};
+    const touch = () => { state.lastActivity = Date.now(); };
+
+    const observe = () => new MutationObserver(() => { state.mutations++; touch(); })
+        .observe(document.documentElement, {childList: true, subtree: true});
+    if (document.documentElement) observe();
+    else document.addEventListener('DOMContentLoaded', observe);
+
+    const originalSend = XMLHttpRequest.prototype.send;
+    XMLHttpRequest.prototype.send = function () {
+        state.inflight++; touch();
+        this.addEventListener('loadend', () => { state.inflight--; touch(); });
+        return originalSend.apply(this, arguments);
+    };
+
+    if (window.fetch) {
+        const originalFetch = window.fetch;
+        window.fetch = function () {
+            state.inflight++; touch();
+            return originalFetch.apply(this, arguments).finally(() => { state.inflight--; touch(); });
+        };
+    }
+})();
+"""
+
+# Asenkron bekleme betiği - tek bir WebDriver çağrısında sonuçlanır
+# changed: kart sayısı değişti, idle: ağ ve DOM idleMs boyunca sessiz, timeout: üst sınır aşıldı
+WAIT_FOR_CHANGE_JS = WAIT_HOOKS_JS + """
+const [selectors, previous, timeoutMs, idleMs] = arguments;
+const done = arguments[arguments.length - 1];
+const state = window.__raWait;
+const started = Date.now();
+state.lastActivity = Math.max(state.lastActivity, started);
+
+const count = () => {
+    for (const selector of selectors) {
+        const found = document.querySelectorAll(selector).length;
+        if (found) return found;
+    }
+    return 0;
+};
+
+const tick = () => {
+    const now = Date.now();
+    const current = count();
+    const result = reason => done({reason, count: current, elapsed_ms: now - started});
+    if (previous !== null && current !== previous) return result('changed');
+    if (state.inflight <= 0 && now - state.lastActivity >= idleMs) return result('idle');
+    if (now - started >= timeoutMs) return result('timeout');
+    setTimeout(tick, 50);
+};
+tick();
+"""
+
+
+def _parse_jitter(value):
+    """'min,max' biçimindeki ortam değişkenini (min, max) saniye çiftine çevirir"""
+    low, high = (float(part) for part in value.split(','))
+    return (low, high)
+
+
+# Nezaket beklemesi (saniye aralığı) - SCRAPER_POLITENESS_JITTER="0,0.5" ile ayarlanır
+POLITENESS_JITTER = _parse_jitter(os.getenv('SCRAPER_POLITENESS_JITTER', '0,0.5'))
+
+
+def set_politeness_jitter(low, high):
+    """Nezaket beklemesinin aralığını değiştirir; (0, 0) beklemeyi kapatır"""
+    global POLITENESS_JITTER
+    POLITENESS_JITTER = (low, high)
+
+
+def polite_pause():
+    """Siteye nazik davranmak için ayarlı aralıkta rastgele bekler"""
+    low, high = POLITENESS_JITTER
+    if high > 0:
+        time.sleep(random.uniform(low, high))
+
+
+def install_wait_hooks(driver):
+    """
+    İzleme betiğini tarayıcıya kaydeder; sonraki her sayfa yüklemesinde
+    sayfanın kendi betiklerinden önce çalışır. Sürücü başına bir kez kaydedilir.
+    """
+    if getattr(driver, '_ra_wait_hooks', False):
+        return
+    driver.execute_cdp_cmd('Page.addScriptToEvaluateOnNewDocument', {'source': WAIT_HOOKS_JS})
+    driver._ra_wait_hooks = True
+
+
+def wait_for_change(driver, selectors, previous_count=None, timeout=DEFAULT_TIMEOUT, idle_ms=NETWORK_IDLE_MS):
+    """
+    Kart sayısı previous_count'tan farklılaşana veya sayfa ağ açısından boşa
+    düşene kadar bekler; en fazla timeout saniye sürer.
+    selectors sırayla denenir, eşleşen ilk selector'ın eleman sayısı kullanılır.
+
+    Dönüş: {'reason': 'changed' | 'idle' | 'timeout', 'count': int, 'elapsed_ms': int}
+    """
+    if isinstance(selectors, str):
+        selectors = [selectors]
+
+    started = time.time()
+    driver.set_script_timeout(timeout + 5)
+
+    # Bekleme sırasında sayfa değişirse betik yarıda kalır; yeni dokümanda bir kez daha denenir
+    for _ in range(2):
+        remaining = max(timeout - (time.time() - started), 0)
+        try:
+            return driver.execute_async_script(
+                WAIT_FOR_CHANGE_JS, selectors, previous_count, int(remaining * 1000), idle_ms
+            )
+        except WebDriverException:
+            continue
+
+    return {'reason': 'timeout', 'count': previous_count, 'elapsed_ms': int((time.time() - started) * 1000)}
@@ -0,0 +1,374 @@
+# Akilli Yorum Asistani - Sürekli Çalışan Sorgu Servisi
+# Bu dosya embedding modelini, Gemini istemcisini ve ürün index'lerini bir kez yükleyip HTTP üzerinden soru yanıtlar
+# server.js her soru için 3_query_rag.py başlatmak yerine bu servise istek gönderir (servis yoksa script'e döner)
+# Ürünün index dosyaları değişince (yeniden indeksleme) ürün bir sonraki soruda otomatik olarak yeniden yüklenir
+# /query/stream yanıtı Gemini'den geldikçe SSE (text/event-stream) olarak iletir
+# /fetch yorumları bu süreçte çeker; Chrome havuzu (driver_pool) servisle birlikte yaşar ve istekler arasında sıcak kalır
+# Hackathon Projesi - AI Destekli Yorum Analizi
+
+import importlib
+import json
+import os
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from ann_index import apply_search_params
+from answer_cache import ANSWER_CACHE_ENABLED, AnswerCache
+from artifact_store import (CHUNKS_FILE, INDEX_FILE, LEGACY_CHUNKS_FILE, STATS_FILE, is_indexed, load_manifest,
+                            product_dir, product_key, resolve_product, use_legacy)
+from embedding_backends import EMBEDDING_BACKEND, EMBEDDING_MODEL, embedding_identity, load_embedding_model
+
+query_rag = importlib.import_module('3_query_rag')
+
+# Servis adresi - ortam değişkenleri ile değiştirilebilir (server.js QUERY_SERVICE_URL ile aynı olmalı)
+QUERY_SERVICE_HOST = os.getenv('QUERY_SERVICE_HOST', '127.0.0.1')
+QUERY_SERVICE_PORT = int(os.getenv('QUERY_SERVICE_PORT', '5001'))
+
+# Yorum çekme ucu (/fetch) - kapatılırsa server.js her çekimde 1_fetch_reviews.py başlatır
+FETCH_IN_SERVICE = os.getenv('FETCH_IN_SERVICE', '1') != '0'
+
+MAX_BODY_BYTES = 64 * 1024
+DEFAULT_TOP_K = 5
+MAX_BATCH_QUESTIONS = 20
+
+# Ürün belirtilmeyen eski tek dosyalı düzen: index ve parçalar script'in bulunduğu dizindedir
+LEGACY_DIR = os.path.dirname(os.path.abspath(__file__))
+
+
+def file_signature(data_dir, names):
+    """Dosyaların (ad, değişiklik zamanı, boyut) listesi; indexer dosyaları os.replace ile değiştirdiği için her yazımda değişir"""
+    signature = []
+    for name in names:
+        try:
+            stat = os.stat(os.path.join(data_dir, name))
+            signature.append((name, stat.st_mtime_ns, stat.st_size))
+        except FileNotFoundError:
+            signature.append((name, None, None))
+    return tuple(signature)
+
+
+class LoadedProduct:
+    """Bir ürünün bellekteki index'i, parça deposu ve arama ayarları"""
+
+    def __init__(self, key, data_dir, signature):
+        self.key = key
+        self.data_dir = data_dir
+        self.signature = signature
+        # Yanıt önbelleği sürümü index'ten önce okunur (arada yeniden indekslenirse yanıtlar eski sürüme yazılır)
+        self.version = query_rag.index_version(key, data_dir)
+        self.index, self.store = query_rag.load_index_and_chunks(data_dir)
+        if key:
+            apply_search_params(self.index, load_manifest(key).get('search_params'))
+            self.stored_stats = None
+        else:
+            self.stored_stats = query_rag.load_stored_stats(data_dir)
+        self.loaded_at = time.strftime('%Y-%m-%dT%H:%M:%S')
+
+
+class ProductCache:
+    """
+    Yüklenmiş ürünleri tutar. Her soruda ürünün imzası kontrol edilir; değiştiyse ürün yeniden yüklenir.
+    Ürün deposunda imza manifest'teki indexed_at'tir: indexer onu index ve parça deposu yerine taşındıktan
+    sonra yazar, böylece yarım değiştirilmiş bir çift yüklenmez. Yükleme sırasında imza değişirse tekrar yüklenir.
+    Eski index ve parça deposu, onları kullanan istekler bitince çöp toplayıcı tarafından bırakılır
+    (mmap'ler açık kalır, indexer yeni dosyaları os.replace ile yazdığı için eski içerik bozulmaz).
+    """
+
+    def __init__(self):
+        self._products = {}
+        self._locks = {}
+        self._lock = threading.Lock()
+
+    def signature(self, key):
+        if key:
+            data_dir = product_dir(key)
+            # indexed_at indexleme bittiğinde yazılır; yorum çekme manifest'i değiştirse de ürün yeniden yüklenmez
+            return data_dir, (load_manifest(key).get('indexed_at'),)
+        return LEGACY_DIR, file_signature(LEGACY_DIR, (INDEX_FILE, CHUNKS_FILE, LEGACY_CHUNKS_FILE, STATS_FILE))
+
+    def get(self, key):
+        data_dir, signature = self.signature(key)
+        loaded = self._products.get(key)
+        if loaded is not None and loaded.signature == signature:
+            return loaded
+        # Aynı ürün için aynı anda tek yükleme yapılır, diğer ürünlerin soruları beklemez
+        with self._lock:
+            product_lock = self._locks.setdefault(key, threading.Lock())
+        with product_lock:
+            data_dir, signature = self.signature(key)
+            loaded = self._products.get(key)
+            if loaded is None or loaded.signature != signature:
+                action = 'yeniden yüklendi' if loaded is not None else 'yüklendi'
+                start = time.perf_counter()
+                loaded = LoadedProduct(key, data_dir, signature)
+                while key and self.signature(key)[1] != loaded.signature:
+                    # Yükleme sırasında yeniden indekslendi: dosyalar yeni ve eski çiftin karışımı olabilir
+                    loaded = LoadedProduct(key, data_dir, self.signature(key)[1])
+                self._products[key] = loaded
+                print(f"Ürün '{key or 'varsayılan'}' {action} ({len(loaded.store)} parça, "
+                      f"{(time.perf_counter() - start) * 1000:.0f} ms).", flush=True)
+            return loaded
+
+    def summary(self):
+        return [{'key': product.key, 'chunks': len(product.store), 'loaded_at': product.loaded_at}
+                for product in list(self._products.values())]
+
+
+class QueryService:
+    """Modeli, Gemini istemcisini ve ürün önbelleğini tutar; HTTP işleyicisi isteklerini buraya yönlendirir"""
+
+    def __init__(self):
+        start = time.perf_counter()
+        self.model = load_embedding_model()
+        self.gemini = query_rag.configure_gemini()
+        self.products = ProductCache()
+        self.answers = AnswerCache(embedding_identity()) if ANSWER_CACHE_ENABLED else None
+        # Çekici ve Chrome havuzu arka planda hazırlanır; hazır olana kadar /fetch 503 döner
+        self.fetcher = None
+        if FETCH_IN_SERVICE:
+            threading.Thread(target=self.load_fetcher, daemon=True).start()
+        self.started_at = time.strftime('%Y-%m-%dT%H:%M:%S')
+        print(f"Sorgu servisi hazır: {EMBEDDING_MODEL} ({EMBEDDING_BACKEND}), "
+              f"{(time.perf_counter() - start):.1f} sn.", flush=True)
+
+    def load_fetcher(self):
+        """1_fetch_reviews modülünü yükler ve Chrome havuzunu ısıtır (Selenium yoksa /fetch kapalı kalır)"""
+        try:
+            fetcher = importlib.import_module('1_fetch_reviews')
+            from driver_pool import get_pool
+            get_pool()
+        except Exception as e:
+            print(f"Yorum çekme servisi başlatılamadı, server.js script'e döner: {e!r}", flush=True)
+            return
+        self.fetcher = fetcher
+        print("Yorum çekme servisi hazır (Chrome havuzu ısıtılıyor).", flush=True)
+
+    def resolve(self, body):
+        """
+        İstekteki ürünü (product: anahtar veya 'latest', ya da product_url) çözer; (anahtar, hata) döner.
+        İkisi de verilmezse veya 'latest' istendiği halde henüz ürün çekilmemişse 3_query_rag.py'deki gibi
+        eski tek dosyalı düzen kullanılır. Anahtar biçimine uymayan product 400 döner.
+        """
+        if not body.get('product') and not body.get('product_url'):
+            return None, None
+        if use_legacy(body.get('product'), body.get('product_url')):
+            return None, None
+        try:
+            key = resolve_product(body.get('product'), body.get('product_url'))
+        except ValueError as e:
+            return None, (400, {'error': str(e)})
+        if not key or not is_indexed(key):
+            return None, (404, {'error': 'Ürün henüz indekslenmemiş, önce yorumları çekin.', 'product': key})
+        return key, None
+
+    def query(self, body, on_token=None):
+        """
+        Soruyu yanıtlar; (HTTP durum kodu, JSON gövdesi) döner. no_cache: true yanıt önbelleğini atlar.
+        on_token verilirse yanıt parçaları geldikçe iletilir (akış modu) ve timings'e ilk parçanın süresi yazılır.
+        """
+        question = (body.get('question') or '').strip()
+        if not question:
+            return 400, {'error': 'question zorunludur.'}
+        if self.gemini is None:
+            return 503, {'error': 'Gemini API anahtarı .env dosyasında bulunamadı.'}
+        key, error = self.resolve(body)
+        if error:
+            return error
+
+        # timings: ürün yükleme, LLM öncesi hazırlık (filtre, istatistik, prompt) ve LLM süreleri (ms)
+        start = time.perf_counter()
+        product = self.products.get(key)
+        timings = {'load_ms': round((time.perf_counter() - start) * 1000, 1)}
+        answer, context = query_rag.answer_question(question, self.gemini, self.model, product.index, product.store,
+                                                    product.data_dir, key, body.get('min_rating'),
+                                                    body.get('max_rating'), body.get('since'),
+                                                    stored_stats=product.stored_stats, timings=timings,
+                                                    token_budget=int(body.get('token_budget') or 0) or None,
+                                                    answer_cache=None if body.get('no_cache') else self.answers,
+                                                    version=product.version, on_token=on_token)
+        # ttft_ms answer_question başından ölçülür; istek başından ölçülmesi için ürün yükleme süresi eklenir
+        if 'ttft_ms' in timings:
+            timings['ttft_ms'] = round(timings['ttft_ms'] + timings['load_ms'], 1)
+        timings['total_ms'] = round((time.perf_counter() - start) * 1000, 1)
+        return 200, {'answer': answer, 'product': key, 'context': context, 'timings': timings}
+
+    def query_batch(self, body):
+        """
+        Soru listesini (questions) aynı ürün için yanıtlar: sorular tek batch'te vektörleştirilir, adaylar tek
+        index.search ile bulunur, Gemini çağrıları paralel yapılır. concurrency sadece LLM_CONCURRENCY'nin altına indirilebilir.
+        """
+        questions = body.get('questions')
+        if not isinstance(questions, list):
+            return 400, {'error': 'questions (soru listesi) zorunludur.'}
+        questions = [str(question).strip() for question in questions if str(question).strip()]
+        if not questions:
+            return 400, {'error': 'questions (soru listesi) zorunludur.'}
+        if len(questions) > MAX_BATCH_QUESTIONS:
+            return 400, {'error': f'En fazla {MAX_BATCH_QUESTIONS} soru gönderilebilir.'}
+        if self.gemini is None:
+            return 503, {'error': 'Gemini API anahtarı .env dosyasında bulunamadı.'}
+        key, error = self.resolve(body)
+        if error:
+            return error
+
+        start = time.perf_counter()
+        product = self.products.get(key)
+        timings = {'load_ms': round((time.perf_counter() - start) * 1000, 1)}
+        concurrency = min(int(body.get('concurrency') or query_rag.LLM_CONCURRENCY), query_rag.LLM_CONCURRENCY)
+        results = query_rag.answer_questions(questions, self.gemini, self.model, product.index, product.store,
+                                             product.data_dir, key, body.get('min_rating'), body.get('max_rating'),
+                                             body.get('since'), stored_stats=product.stored_stats,
+                                             token_budget=int(body.get('token_budget') or 0) or None,
+                                             answer_cache=None if body.get('no_cache') else self.answers,
+                                             version=product.version, concurrency=concurrency)
+        timings['total_ms'] = round((time.perf_counter() - start) * 1000, 1)
+        return 200, {'product': key, 'timings': timings, 'results': [
+            {'question': question, 'answer': answer, 'context': context, 'timings': question_timings}
+            for question, (answer, context, question_timings) in zip(questions, results)]}
+
+    def fetch(self, body):
+        """
+        Ürünün yorumlarını çekip veritabanına yazar (1_fetch_reviews.py ile aynı iş); indexleme ayrı adımdır.
+        Selenium'a düşen çekimler servisin sıcak Chrome havuzunu kullanır.
+        """
+        url = (body.get('product_url') or '').strip()
+        if not url:
+            return 400, {'error': 'product_url zorunludur.'}
+        if self.fetcher is None:
+            return 503, {'error': 'Yorum çekme bu serviste kullanılamıyor.'}
+        start = time.perf_counter()
+        try:
+            written = self.fetcher.fetch_reviews(url=url, max_pages=int(body.get('max_pages') or 10),
+                                                 max_reviews=int(body.get('max_reviews') or 100),
+                                                 incremental=not body.get('full_refresh'), collect=False)
+        except Exception as e:
+            print(f"Çekme hatası: {e!r}", flush=True)
+            return 500, {'error': 'Yorumlar çekilemedi', 'details': str(e)}
+        return 200, {'product': product_key(url), 'written': written,
+                     'timings': {'total_ms': round((time.perf_counter() - start) * 1000, 1)}}
+
+    def search(self, body):
+        """Sadece anlamsal arama: soruya en yakın parçalar (LLM çağrısı yapılmaz)"""
+        question = (body.get('question') or '').strip()
+        if not question:
+            return 400, {'error': 'question zorunludur.'}
+        key, error = self.resolve(body)
+        if error:
+            return error
+        start = time.perf_counter()
+        product = self.products.get(key)
+        chunks = query_rag.get_top_chunks(question, self.model, product.index, product.store,
+                                          int(body.get('top_k') or DEFAULT_TOP_K))
+        return 200, {'chunks': chunks, 'product': key,
+                     'timings': {'total_ms': round((time.perf_counter() - start) * 1000, 1)}}
+
+    def health(self):
+        return 200, {'status': 'ok', 'model': EMBEDDING_MODEL, 'backend': EMBEDDING_BACKEND,
+                     'gemini': self.gemini is not None, 'fetch': self.fetcher is not None,
+                     'started_at': self.started_at,
+                     'products': self.products.summary(),
+                     'answer_cache': self.answers.stats if self.answers is not None else None}
+
+
+class QueryHandler(BaseHTTPRequestHandler):
+    """
+    JSON istek/yanıt işleyicisi: POST /query, POST /query/stream (SSE), POST /query/batch, POST /search,
+    POST /fetch, GET /health
+    """
+
+    service = None
+    protocol_version = 'HTTP/1.1'
+    streaming = False
+
+    def do_GET(self):
+        if self.path == '/health':
+            self.send_json(*self.service.health())
+        else:
+            self.send_json(404, {'error': 'bulunamadı'})
+
+    def do_POST(self):
+        routes = {'/query': self.service.query, '/query/stream': self.stream_query,
+                  '/query/batch': self.service.query_batch, '/search': self.service.search,
+                  '/fetch': self.service.fetch}
+        if self.path not in routes:
+            self.send_json(404, {'error': 'bulunamadı'})
+            return
+        length = int(self.headers.get('Content-Length') or 0)
+        if length > MAX_BODY_BYTES:
+            self.send_json(413, {'error': 'istek çok büyük'})
+            return
+        try:
+            body = json.loads(self.rfile.read(length) or b'{}')
+        except ValueError:
+            self.send_json(400, {'error': 'geçersiz JSON'})
+            return
+        try:
+            response = routes[self.path](body)
+        except (BrokenPipeError, ConnectionResetError):
+            # İstemci akış sırasında bağlantıyı kapattı; Gemini akışı da burada bırakılır
+            return
+        except Exception as e:
+            print(f"Sorgu hatası: {e!r}", flush=True)
+            error = {'error': 'Soru analiz edilemedi', 'details': str(e)}
+            if self.streaming:
+                self.send_event('error', error)
+            else:
+                self.send_json(500, error)
+            return
+        if response is not None:
+            self.send_json(*response)
+
+    def stream_query(self, body):
+        """
+        Yanıt parçalarını 'token' olayları, sonunda /query gövdesini 'done' olayı olarak gönderir.
+        Akış başlamadan oluşan hatalar (400/404/503) normal JSON yanıtı olarak döner.
+        """
+        status, payload = self.service.query(body, on_token=lambda text: self.send_event('token', {'text': text}))
+        if status != 200 and not self.streaming:
+            return status, payload
+        self.send_event('done', payload)
+        return None
+
+    def send_event(self, event, payload):
+        """SSE olayı yazar; ilk olayda başlıklar gönderilir (uzunluk bilinmediği için bağlantı sonunda kapanır)"""
+        if not self.streaming:
+            self.streaming = True
+            self.close_connection = True
+            self.send_response(200)
+            self.send_header('Content-Type', 'text/event-stream; charset=utf-8')
+            self.send_header('Cache-Control', 'no-cache')
+            self.send_header('Connection', 'close')
+            self.end_headers()
+        data = json.dumps(payload, ensure_ascii=False)
+        self.wfile.write(f'event: {event}\ndata: {data}\n\n'.encode('utf-8'))
+        self.wfile.flush()
+
+    def send_json(self, status, payload):
+        data = json.dumps(payload, ensure_ascii=False).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json; charset=utf-8')
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, format, *args):
+        # İstek satırları stdout'u doldurmasın; hatalar yukarıda ayrıca yazılır
+        pass
+
+
+def main():
+    QueryHandler.service = QueryService()
+    server = ThreadingHTTPServer((QUERY_SERVICE_HOST, QUERY_SERVICE_PORT), QueryHandler)
+    server.daemon_threads = True
+    print(f"Sorgu servisi http://{QUERY_SERVICE_HOST}:{QUERY_SERVICE_PORT} adresinde dinliyor.", flush=True)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,85 @@
+# Akilli Yorum Asistani - Uyarlanabilir Hız ve Tekrar Deneme Kontrolü
+# Bu dosya API isteklerinin hızını AIMD ile ayarlar ve geçici hatalarda tekrar dener
+# Gecikme düşükken hız yavaşça artırılır, 429/5xx alındığında sert şekilde düşürülür
+# Hackathon Projesi - AI Destekli Yorum Analizi
+
+import random
+import threading
+import time
+from email.utils import parsedate_to_datetime
+
+# Tekrar denenecek HTTP durum kodları ve bunlardan hız düşürmeyi gerektirenler
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+THROTTLE_STATUSES = {429, 503}
+
+MAX_RETRIES = 4
+BASE_BACKOFF = 0.5   # saniye
+MAX_BACKOFF = 30.0   # saniye
+
+
+def parse_retry_after(value):
+    """Retry-After başlığını (saniye veya HTTP tarihi) saniyeye çevirir; geçersizse None"""
+    if not value:
+        return None
+    try:
+        return max(float(value), 0.0)
+    except ValueError:
+        pass
+    try:
+        return max(parsedate_to_datetime(value).timestamp() - time.time(), 0.0)
+    except (TypeError, ValueError):
+        return None
+
+
+def backoff_delay(attempt, retry_after=None):
+    """
+    attempt. deneme için bekleme süresi: sunucu Retry-After verdiyse o,
+    yoksa üstel geri çekilme + tam jitter (0 ile BASE * 2^attempt arası rastgele).
+    """
+    if retry_after is not None:
+        return min(retry_after, MAX_BACKOFF)
+    return random.uniform(0, min(MAX_BACKOFF, BASE_BACKOFF * (2 ** attempt)))
+
+
+class AdaptiveRateController:
+    """
+    AIMD (additive increase / multiplicative decrease) hız kontrolcüsü.
+    Tüm worker'lar aynı kontrolcüyü paylaşır; acquire() istekleri mevcut hıza göre aralar.
+    """
+
+    def __init__(self, initial_rate=4.0, min_rate=0.5, max_rate=20.0,
+                 increase=0.5, decrease=0.5, latency_target=1.0):
+        self.rate = initial_rate
+        self.min_rate = min_rate
+        self.max_rate = max_rate
+        self.increase = increase
+        self.decrease = decrease
+        self.latency_target = latency_target
+        self._next_slot = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        """Mevcut hıza göre bir sonraki istek zamanını ayırır ve o zamana kadar bekler"""
+        with self._lock:
+            now = time.monotonic()
+            slot = max(now, self._next_slot)
+            self._next_slot = slot + 1.0 / self.rate
+        if slot > now:
+            time.sleep(slot - now)
+
+    def on_success(self, latency):
+        """Başarılı istek: gecikme hedefin altındaysa hızı toplamsal olarak artır"""
+        with self._lock:
+            if latency < self.latency_target:
+                self.rate = min(self.max_rate, self.rate + self.increase)
+
+    def on_throttle(self, retry_after=None):
+        """Kısıtlama (429/503): hızı çarpımsal düşür, Retry-After süresince yeni istek verme"""
+        with self._lock:
+            self.rate = max(self.min_rate, self.rate * self.decrease)
+            if retry_after:
+                self._next_slot = max(self._next_slot, time.monotonic() + retry_after)
+
+    def snapshot(self):
+        with self._lock:
+            return round(self.rate, 2)
@@ -0,0 +1,364 @@
+# Akilli Yorum Asistani - SQLite Yorum Veritabanı
+# Bu dosya ürünleri, yorumları ve metin parçalarını yerel bir SQLite veritabanında tutar
+# Yorumlar id (yoksa içerik hash'i) üzerinden UPSERT edilir; WAL modu sayesinde
+# birden fazla çekici aynı anda yazarken okuyucular beklemez
+# Hackathon Projesi - AI Destekli Yorum Analizi
+
+import json
+import os
+import sqlite3
+import threading
+import time
+
+from review_dedup import review_key
+
+DB_PATH = os.getenv('REVIEW_DB_PATH',
+                    os.path.join(os.path.dirname(os.path.abspath(__file__)), 'reviews.db'))
+
+WRITE_BATCH_SIZE = 100   # bu kadar yorumda bir toplu yazılır
+BUSY_TIMEOUT_MS = 10000  # başka bir yazıcı kilidi tutuyorsa beklenecek süre
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS products (
+    key TEXT PRIMARY KEY,
+    url TEXT,
+    site TEXT,
+    cursor TEXT,
+    fetched_at TEXT,
+    indexed_at TEXT
+);
+
+CREATE TABLE IF NOT EXISTS reviews (
+    id INTEGER PRIMARY KEY,
+    product_key TEXT NOT NULL REFERENCES products(key),
+    review_id TEXT,
+    content_hash TEXT NOT NULL,
+    comment TEXT NOT NULL,
+    rate REAL,
+    user TEXT,
+    date TEXT,
+    source TEXT,
+    fetched_at TEXT,
+    UNIQUE (product_key, content_hash)
+);
+CREATE UNIQUE INDEX IF NOT EXISTS idx_reviews_review_id
+    ON reviews (product_key, review_id) WHERE review_id IS NOT NULL;
+CREATE INDEX IF NOT EXISTS idx_reviews_rate ON reviews (product_key, rate);
+CREATE INDEX IF NOT EXISTS idx_reviews_date ON reviews (product_key, date);
+
+CREATE TABLE IF NOT EXISTS chunks (
+    product_key TEXT NOT NULL REFERENCES products(key),
+    position INTEGER NOT NULL,
+    review_rowid INTEGER REFERENCES reviews(id),
+    text TEXT NOT NULL,
+    PRIMARY KEY (product_key, position)
+);
+CREATE INDEX IF NOT EXISTS idx_chunks_review ON chunks (review_rowid);
+
+-- İndeksleme sırasında yeni parçalar burada birikir, indeksleme bitince chunks tablosuna tek işlemde taşınır
+CREATE TABLE IF NOT EXISTS chunks_staging (
+    product_key TEXT NOT NULL,
+    position INTEGER NOT NULL,
+    review_rowid INTEGER,
+    text TEXT NOT NULL,
+    PRIMARY KEY (product_key, position)
+);
+"""
+
+# Aynı yorum id ile tekrar gelirse puan/tarih bilgisi güncellenir; aynı metinli yorum (id'siz
+# veya farklı id'li) yok sayılır. Metin güncellenmez, aksi halde içerik hash'i başka bir satırla çakışabilir.
+UPSERT_REVIEW_SQL = """
+INSERT INTO reviews (product_key, review_id, content_hash, comment, rate, user, date, source, fetched_at)
+VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+ON CONFLICT (product_key, review_id) WHERE review_id IS NOT NULL DO UPDATE SET
+    rate = excluded.rate, user = excluded.user, date = excluded.date, fetched_at = excluded.fetched_at
+ON CONFLICT DO NOTHING
+"""
+
+_local = threading.local()
+
+
+def connect(path=None):
+    """Yeni bir bağlantı açar, WAL modunu ve şemayı hazırlar"""
+    conn = sqlite3.connect(path or DB_PATH, timeout=BUSY_TIMEOUT_MS / 1000)
+    conn.row_factory = sqlite3.Row
+    conn.execute('PRAGMA journal_mode=WAL')
+    conn.execute('PRAGMA synchronous=NORMAL')
+    conn.execute('PRAGMA foreign_keys=ON')
+    conn.executescript(SCHEMA)
+    return conn
+
+
+def get_connection():
+    """Thread başına bir bağlantı döndürür (sqlite3 bağlantıları thread'ler arasında paylaşılmaz)"""
+    conn = getattr(_local, 'conn', None)
+    if conn is None or getattr(_local, 'path', None) != DB_PATH:
+        conn = _local.conn = connect()
+        _local.path = DB_PATH
+    return conn
+
+
+def _now():
+    return time.strftime('%Y-%m-%dT%H:%M:%S')
+
+
+# ÜRÜNLER
+
+def upsert_product(key, url=None, site=None):
+    """Ürünü ekler; varsa URL ve site bilgisini günceller"""
+    conn = get_connection()
+    with conn:
+        conn.execute(
+            """INSERT INTO products (key, url, site) VALUES (?, ?, ?)
+               ON CONFLICT (key) DO UPDATE SET url = COALESCE(excluded.url, url),
+                                               site = COALESCE(excluded.site, site)""",
+            (key, url, site)
+        )
+
+
+def mark_product(key, **fields):
+    """Ürünün fetched_at / indexed_at gibi alanlarını günceller"""
+    columns = ', '.join(f'{name} = ?' for name in fields)
+    conn = get_connection()
+    with conn:
+        conn.execute(f'UPDATE products SET {columns} WHERE key = ?', (*fields.values(), key))
+
+
+def load_cursor(key):
+    """Ürünün artımlı çekme cursor'ını döndürür; yoksa None"""
+    row = get_connection().execute('SELECT cursor FROM products WHERE key = ?', (key,)).fetchone()
+    return json.loads(row['cursor']) if row and row['cursor'] else None
+
+
+def save_cursor(key, total_pages):
+    """
+    En yeni yorumun tarihi/id'si ile ürünün cursor'ını günceller (tarih index'i ile tek satır okunur).
+    Cursor API'nin ISO tarihleriyle metin olarak karşılaştırıldığı için sadece ISO biçimli tarihler dikkate alınır;
+    Selenium'dan gelen "3 gün önce" / "15 Ocak 2024" gibi tarihler metin sıralamasında ISO tarihlerin üstüne çıkabilir.
+    """
+    conn = get_connection()
+    newest = conn.execute(
+        """SELECT review_id, date FROM reviews WHERE product_key = ? AND date IS NOT NULL
+           AND date GLOB '[0-9][0-9][0-9][0-9]-[0-9][0-9]-[0-9][0-9]*'
+           ORDER BY date DESC LIMIT 1""",
+        (key,)
+    ).fetchone()
+    cursor = {
+        'newest_date': newest['date'] if newest else None,
+        'newest_id': _restore_id(newest['review_id']) if newest else None,
+        'total_pages': total_pages,
+        'updated_at': _now()
+    }
+    with conn:
+        conn.execute('UPDATE products SET cursor = ? WHERE key = ?', (json.dumps(cursor), key))
+    return cursor
+
+
+def _restore_id(value):
+    """TEXT olarak saklanan sayısal yorum id'lerini API'deki tipine geri çevirir"""
+    return int(value) if value is not None and value.isdigit() else value
+
+
+# YORUMLAR
+
+class ReviewSink:
+    """
+    Yorumları ürüne toplu UPSERT ile yazar; WRITE_BATCH_SIZE yorumda bir commit edilir.
+    Her commit kısa bir yazma kilidi alır, böylece paralel çekiciler birbirini uzun süre bekletmez.
+    """
+
+    def __init__(self, product_key, batch_size=WRITE_BATCH_SIZE):
+        self.product_key = product_key
+        self.batch_size = batch_size
+        self.count = 0
+        self._batch = []
+
+    def write(self, review):
+        review_id = review.get('id')
+        self._batch.append((
+            self.product_key,
+            str(review_id) if review_id is not None else None,
+            review_key(review['comment']).hex(),
+            review['comment'],
+            review.get('rate'),
+            review.get('user'),
+            review.get('date') or None,
+            review.get('source'),
+            _now()
+        ))
+        self.count += 1
+        if len(self._batch) >= self.batch_size:
+            self.flush()
+
+    def flush(self):
+        if not self._batch:
+            return
+        conn = get_connection()
+        with conn:
+            conn.executemany(UPSERT_REVIEW_SQL, self._batch)
+        self._batch = []
+
+    def close(self):
+        self.flush()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+
+def _review_from_row(row):
+    return {
+        'id': _restore_id(row['review_id']),
+        'comment': row['comment'],
+        'rate': row['rate'],
+        'user': row['user'],
+        'date': row['date'] or '',
+        'source': row['source'],
+        'rowid': row['id']
+    }
+
+
+def _review_filters(product_key, min_rate=None, max_rate=None, since=None, alias=''):
+    """
+    Puan ve tarih ön filtrelerini (rate/date index'lerini kullanan) WHERE koşuluna çevirir.
+    alias verilirse sütunlar tablo takma adıyla nitelenir (ör. 'r.').
+    """
+    clauses = [f'{alias}product_key = ?']
+    params = [product_key]
+    if min_rate is not None:
+        clauses.append(f'{alias}rate >= ?')
+        params.append(min_rate)
+    if max_rate is not None:
+        clauses.append(f'{alias}rate <= ?')
+        params.append(max_rate)
+    if since:
+        clauses.append(f'{alias}date >= ?')
+        params.append(since)
+    return ' AND '.join(clauses), params
+
+
+def iter_product_reviews(product_key, min_rate=None, max_rate=None, since=None):
+    """Ürünün yorumlarını eklenme sırasıyla tek tek üretir; tüm tablo belleğe alınmaz"""
+    where, params = _review_filters(product_key, min_rate, max_rate, since)
+    for row in get_connection().execute(f'SELECT * FROM reviews WHERE {where} ORDER BY id', params):
+        yield _review_from_row(row)
+
+
+def sample_reviews(product_key, size):
+    """Ürünün yorumlarından rastgele size tanesini döndürür (index eğitimi için)"""
+    rows = get_connection().execute(
+        'SELECT * FROM reviews WHERE product_key = ? ORDER BY RANDOM() LIMIT ?', (product_key, size)
+    )
+    return [_review_from_row(row) for row in rows]
+
+
+def count_reviews(product_key):
+    row = get_connection().execute('SELECT COUNT(*) FROM reviews WHERE product_key = ?', (product_key,)).fetchone()
+    return row[0]
+
+
+def product_stats(product_key):
+    """Yorum sayısı, ortalama puan ve puan dağılımını SQL ile hesaplar"""
+    conn = get_connection()
+    totals = conn.execute(
+        """SELECT COUNT(*) AS review_count, COUNT(rate) AS rated_count, AVG(rate) AS average
+           FROM reviews WHERE product_key = ?""",
+        (product_key,)
+    ).fetchone()
+    distribution = {str(star): 0 for star in range(1, 6)}
+    for row in conn.execute(
+        """SELECT CAST(ROUND(rate) AS INTEGER) AS star, COUNT(*) AS n FROM reviews
+           WHERE product_key = ? AND rate BETWEEN 1 AND 5 GROUP BY star""",
+        (product_key,)
+    ):
+        distribution[str(row['star'])] = row['n']
+
+    return {
+        'review_count': totals['review_count'],
+        'rated_count': totals['rated_count'],
+        'average_rating': round(totals['average'], 1) if totals['average'] is not None else 0,
+        'rating_distribution': distribution
+    }
+
+
+# METİN PARÇALARI
+
+class ChunkSink:
+    """
+    Ürünün yeni metin parçalarını WRITE_BATCH_SIZE'lık gruplar halinde chunks_staging tablosuna yazar;
+    parçalar bellekte biriktirilmez. Açılışta ürünün yarım kalmış hazırlık kayıtları silinir.
+    commit() eski parçaları silip hazırlananları tek işlemde chunks tablosuna taşır; okuyucular o ana
+    kadar eski parçaları görmeye devam eder. abort() hazırlananları siler.
+    """
+
+    def __init__(self, product_key, batch_size=WRITE_BATCH_SIZE):
+        self.product_key = product_key
+        self.batch_size = batch_size
+        self.count = 0
+        self._batch = []
+        conn = get_connection()
+        with conn:
+            conn.execute('DELETE FROM chunks_staging WHERE product_key = ?', (product_key,))
+
+    def write(self, position, review_rowid, text):
+        self._batch.append((self.product_key, position, review_rowid, text))
+        self.count += 1
+        if len(self._batch) >= self.batch_size:
+            self.flush()
+
+    def flush(self):
+        if not self._batch:
+            return
+        conn = get_connection()
+        with conn:
+            conn.executemany(
+                'INSERT INTO chunks_staging (product_key, position, review_rowid, text) VALUES (?, ?, ?, ?)',
+                self._batch
+            )
+        self._batch = []
+
+    def commit(self):
+        self.flush()
+        conn = get_connection()
+        with conn:
+            conn.execute('DELETE FROM chunks WHERE product_key = ?', (self.product_key,))
+            conn.execute(
+                """INSERT INTO chunks (product_key, position, review_rowid, text)
+                   SELECT product_key, position, review_rowid, text FROM chunks_staging WHERE product_key = ?""",
+                (self.product_key,)
+            )
+            conn.execute('DELETE FROM chunks_staging WHERE product_key = ?', (self.product_key,))
+
+    def abort(self):
+        self._batch = []
+        conn = get_connection()
+        with conn:
+            conn.execute('DELETE FROM chunks_staging WHERE product_key = ?', (self.product_key,))
+
+
+def replace_chunks(product_key, chunk_rows):
+    """
+    Ürünün metin parçalarını yeniler (ChunkSink ile: gruplar halinde hazırlanır, tek işlemde yerine konur).
+    chunk_rows: (index'teki sıra, yorumun rowid'si, metin) üçlüleri - akış olarak verilebilir.
+    """
+    sink = ChunkSink(product_key)
+    try:
+        for position, review_rowid, text in chunk_rows:
+            sink.write(position, review_rowid, text)
+        sink.commit()
+    except BaseException:
+        sink.abort()
+        raise
+
+
+def chunk_positions(product_key, min_rate=None, max_rate=None, since=None):
+    """Puan/tarih filtresine uyan yorumlardan gelen parçaların index sıralarını döndürür"""
+    where, params = _review_filters(product_key, min_rate, max_rate, since, alias='r.')
+    rows = get_connection().execute(
+        f"""SELECT c.position FROM chunks c JOIN reviews r ON r.id = c.review_rowid
+            WHERE {where} ORDER BY c.position""",
+        params
+    )
+    return [row['position'] for row in rows]
@@ -0,0 +1,80 @@
+# Akilli Yorum Asistani - Yorum Tekilleştirme Modülü
+# Bu dosya tüm yorum çekicilerin paylaştığı hash tabanlı tekilleştirme bileşenini içerir
+# Yorumlar normalize edilmiş metnin hash'i ile anahtarlanır, kontrol O(1) sürede yapılır
+# Hackathon Projesi - AI Destekli Yorum Analizi
+
+import hashlib
+import re
+import unicodedata
+
+# Türkçe büyük harfler: casefold() 'İ' harfini 'i̇' (noktalı), 'I' harfini 'i' yapar
+# Bu yüzden casefold'dan önce Türkçe kurallarına göre çevrilir
+_TURKISH_UPPER = str.maketrans({'İ': 'i', 'I': 'ı'})
+
+# Emoji kod noktası aralıkları; Unicode kategorisi (So/Sk) kullanılmaz çünkü
+# ^ ` ´ gibi aksan/işaret karakterleri de o kategorilere girer
+_EMOJI = re.compile(
+    '['
+    '\U0001F000-\U0001FAFF'  # emoji, bayraklar, ten rengi düzenleyicileri
+    '\u2300-\u23FF'          # saat, kum saati vb. teknik semboller
+    '\u2600-\u27BF'          # çeşitli semboller ve dingbat'ler
+    '\u2B00-\u2BFF'          # yıldız, daire vb.
+    '\u200d\ufe0e\ufe0f\u20e3'  # zero-width joiner, varyasyon seçicileri, tuş kutusu
+    '\U000E0020-\U000E007F'  # bayrak etiketleri
+    ']'
+)
+
+_WHITESPACE = re.compile(r'\s+')
+
+
+def normalize_review_text(text):
+    """
+    Yorum metnini karşılaştırma için normalize eder:
+    Unicode NFC, Türkçe kurallarına uygun küçük harf, emojiler boşluğa çevrilir
+    ve ardışık boşluklar teke indirilir. Yalnızca emojiden oluşan yorumlar boş metne
+    inip tek anahtarda birleşmesin diye bu durumda ham metin kullanılır.
+    """
+    raw = unicodedata.normalize('NFC', text or '')
+    text = _EMOJI.sub(' ', raw.translate(_TURKISH_UPPER).casefold())
+    return _WHITESPACE.sub(' ', text).strip() or raw.strip()
+
+
+def review_key(text):
+    """Normalize edilmiş yorum metninin 16 byte'lık hash anahtarını döndürür"""
+    return hashlib.blake2b(normalize_review_text(text).encode('utf-8'), digest_size=16).digest()
+
+
+class ReviewDeduplicator:
+    """
+    Görülen yorumların hash'lerini tutan küme.
+    seen() ve add() sabit sürede çalışır; tam metin yerine 16 byte saklanır.
+    """
+
+    def __init__(self, reviews=()):
+        self._keys = set()
+        for review in reviews:
+            self.add(review['comment'])
+
+    def seen(self, text):
+        """Yorum daha önce eklendiyse True döner"""
+        return review_key(text) in self._keys
+
+    def add(self, text):
+        """Yorumu ekler; yeni bir yorumsa True, tekrar ise False döner"""
+        key = review_key(text)
+        if key in self._keys:
+            return False
+        self._keys.add(key)
+        return True
+
+    def __contains__(self, text):
+        return self.seen(text)
+
+    def __len__(self):
+        return len(self._keys)
+
+
+def dedupe_reviews(reviews):
+    """Yorum listesinden tekrarları (ilk görüleni koruyarak) çıkarır"""
+    dedup = ReviewDeduplicator()
+    return [review for review in reviews if dedup.add(review['comment'])]
@@ -0,0 +1,46 @@
+# Akilli Yorum Asistani - Akışlı Yorum Dosyası (JSONL)
+# Bu dosya eski düzendeki (ürün anahtarı olmayan) reviews.jsonl / reviews.json dosyalarını tembelce okur
+# Yorumlar artık review_db ile SQLite'a yazılır; bu okuyucu yalnızca 2_create_rag_index.py'nin eski düzen yolu içindir
+# Hackathon Projesi - AI Destekli Yorum Analizi
+
+import json
+import os
+
+REVIEWS_JSONL = 'reviews.jsonl'
+REVIEWS_JSON = 'reviews.json'
+
+
+def iter_jsonl(path):
+    """
+    JSONL dosyasındaki kayıtları tek tek üretir; dosya belleğe alınmaz.
+    Bozuk veya yarım satırlar (ör. yazım sırasında çökme) atlanır.
+    """
+    with open(path, 'r', encoding='utf-8') as f:
+        for line_no, line in enumerate(f, 1):
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                yield json.loads(line)
+            except ValueError:
+                print(f"Uyarı: {path} dosyasının {line_no}. satırı okunamadı, atlanıyor.")
+
+
+def iter_reviews_file(directory):
+    """
+    Dizindeki yorumları tembel olarak okur.
+    reviews.jsonl varsa ve reviews.json'dan eski değilse akış olarak okunur;
+    aksi halde eski biçimdeki reviews.json (tek JSON listesi) yüklenir.
+    """
+    jsonl_path = os.path.join(directory, REVIEWS_JSONL)
+    json_path = os.path.join(directory, REVIEWS_JSON)
+
+    use_jsonl = os.path.exists(jsonl_path) and (
+        not os.path.exists(json_path) or os.path.getmtime(jsonl_path) >= os.path.getmtime(json_path)
+    )
+    if use_jsonl:
+        yield from iter_jsonl(jsonl_path)
+        return
+
+    with open(json_path, 'r', encoding='utf-8') as f:
+        yield from json.load(f)
@@ -6,18 +6,27 @@
 const express = require('express');
 const cors = require('cors');
 const { spawn } = require('child_process');
+const http = require('http');
 const path = require('path');
 
 // Express uygulamasını başlat
 const app = express();
 const PORT = 3000; // Server portu
+const NOT_INDEXED_CODE = 3; // 3_query_rag.py: ürün henüz indekslenmemiş
+
+// Sürekli çalışan Python sorgu servisi (ai_core/query_service.py) - model ve index'ler bir kez yüklenir
+// QUERY_SERVICE_URL verilirse dışarıda çalışan servis kullanılır, verilmezse server ile birlikte başlatılır
+// Servise ulaşılamazsa sorular eskisi gibi 3_query_rag.py başlatılarak yanıtlanır
+const QUERY_SERVICE_URL = process.env.QUERY_SERVICE_URL || 'http://127.0.0.1:5001';
+const QUERY_SERVICE_RESTART_MS = 5000;
+const QUERY_TIMEOUT_MS = 120000;
 
 // Middleware ayarları
 app.use(cors()); // CORS desteği
 app.use(express.json()); // JSON body parser
 
 // Yorumları çekme endpoint'i - Trendyol ürün sayfalarından yorumları çeker
-app.post('/fetch-reviews', (req, res) => {
+app.post('/fetch-reviews', async (req, res) => {
   const { product_url } = req.body;
   
   // URL kontrolü
@@ -27,53 +36,27 @@ app.post('/fetch-reviews', (req, res) => {
 
   console.log(`Yorumlar çekiliyor: ${product_url}`);
 
-  // Python scraper scriptini çalıştır
-  // Selenium ile web scraping yaparak yorumları toplar
-  const py = spawn('python', [
-    '1_fetch_reviews.py',
-    '--url', product_url,
-    '--max-pages', '5', // Maksimum sayfa sayısı
-    '--max-reviews', '50' // Maksimum yorum sayısı
-  ], {
-    cwd: path.join(__dirname, 'ai_core') // AI core klasöründe çalıştır
-  });
-
-  let output = '';
-  let errorOutput = '';
+  // API ile, gerekirse Selenium ile yorumları toplar (sorgu servisinde sıcak Chrome havuzuyla)
+  const result = await runFetch(product_url, 5, 50, 300000); // 5 sayfa, 50 yorum, 5 dakika timeout
 
-  // Python script çıktısını yakala
-  py.stdout.on('data', (data) => {
-    output += data.toString();
-    console.log('Python output:', data.toString());
-  });
-
-  // Python script hatalarını yakala
-  py.stderr.on('data', (data) => {
-    errorOutput += data.toString();
-    console.error('Python error:', data.toString());
-  });
-
-  // Python script tamamlandığında
-  py.on('close', (code) => {
-    if (code !== 0) {
-      return res.status(500).json({ 
-        error: 'Yorumlar çekilemedi', 
-        details: errorOutput,
-        output: output 
-      });
-    }
-    
-    // Yorumlar çekildikten sonra RAG index'ini güncelle
-    updateRagIndex(res, output);
-  });
+  if (result.code !== 0) {
+    return res.status(500).json({ 
+      error: 'Yorumlar çekilemedi', 
+      details: result.errorOutput,
+      output: result.output 
+    });
+  }
+  
+  // Yorumlar çekildikten sonra ürünün RAG index'ini güncelle
+  updateRagIndex(res, result.output, product_url);
 });
 
 // RAG index'ini güncelle - Yorumları vektörleştirip arama indexi oluşturur
-function updateRagIndex(res, fetchOutput) {
+function updateRagIndex(res, fetchOutput, productUrl) {
   console.log('RAG index güncelleniyor...');
   
-  // RAG index oluşturma scriptini çalıştır
-  const py = spawn('python', ['2_create_rag_index.py'], {
+  // RAG index oluşturma scriptini ürünün depo dizini için çalıştır
+  const py = spawn('python', ['2_create_rag_index.py', '--product-url', productUrl], {
     cwd: path.join(__dirname, 'ai_core')
   });
 
@@ -113,8 +96,9 @@ function updateRagIndex(res, fetchOutput) {
 }
 
 // Analiz endpoint'i - Mevcut yorumlardan soru yanıtlar
-app.post('/analyze', (req, res) => {
-  const { question } = req.body;
+// product_url verilmezse en son çekilen ürün, hiç ürün yoksa eski tek dosyalı index (ai_core/index.faiss) kullanılır
+app.post('/analyze', async (req, res) => {
+  const { question, product_url, token_budget } = req.body;
   
   // Soru kontrolü
   if (!question) {
@@ -123,169 +107,467 @@ app.post('/analyze', (req, res) => {
 
   console.log(`Soru analiz ediliyor: ${question}`);
 
-  // Python RAG sorgulama scriptini çalıştır
+  // Sorgu servisi (yoksa 3_query_rag.py) ile soruyu yanıtla
   // Gemini AI ile yorumları analiz eder ve soruya yanıt verir
-  const py = spawn('python', [
-    '3_query_rag.py',
-    '--question', question
-  ], {
-    cwd: path.join(__dirname, 'ai_core')
+  const result = await runQuery(question, product_url, QUERY_TIMEOUT_MS, token_budget);
+
+  if (result.code === NOT_INDEXED_CODE) {
+    return res.status(404).json({ error: 'Ürün henüz indekslenmemiş, önce yorumları çekin.' });
+  }
+  if (result.code !== 0) {
+    return res.status(500).json({ error: 'Python script hatası', details: result.errorOutput });
+  }
+  // context: prompt'a giren parça sayısı, aday sayısı ve token bütçesi (sadece sorgu servisiyle)
+  res.json({ answer: result.output.trim(), context: result.context });
+});
+
+// Akışlı analiz endpoint'i - yanıt Gemini'den geldikçe SSE (text/event-stream) olarak gönderilir
+// Olaylar: token ({text}), done ({answer, context, timings}), error ({error, details})
+// Ürün indekslenmemişse akış başlamadan 404 JSON döner
+app.post('/analyze-stream', async (req, res) => {
+  const { question, product_url, token_budget } = req.body;
+
+  if (!question) {
+    return res.status(400).json({ error: 'question zorunludur.' });
+  }
+
+  console.log(`Soru analiz ediliyor (akış): ${question}`);
+  const started = Date.now();
+  const product = product_url ? { product_url: product_url } : { product: 'latest' };
+  let firstToken = null;
+
+  // finished: done veya error olayı gönderildi
+  const stream = {
+    finished: false,
+    sendEvent: (event, payload) => {
+      // İstemci ayrıldıysa veya akış bittiyse yazılmaz
+      if (res.writableEnded || res.destroyed) {
+        return;
+      }
+      if (!res.headersSent) {
+        res.writeHead(200, {
+          'Content-Type': 'text/event-stream; charset=utf-8',
+          'Cache-Control': 'no-cache',
+          'Connection': 'keep-alive'
+        });
+      }
+      if (event === 'token' && firstToken === null) {
+        firstToken = Date.now() - started;
+      }
+      if (event === 'done' || event === 'error') {
+        stream.finished = true;
+      }
+      if (event === 'done') {
+        console.log(`Akış tamamlandı (ilk parça ${firstToken} ms, toplam ${Date.now() - started} ms, ` +
+          `${JSON.stringify(payload.timings)})`);
+      }
+      res.write(`event: ${event}\ndata: ${JSON.stringify(payload)}\n\n`);
+    },
+    end: () => {
+      if (!stream.finished) {
+        return stream.fail(500, 'Yanıt akışı yarıda kesildi', '');
+      }
+      res.end();
+    },
+    fail: (status, error, details) => {
+      if (res.writableEnded || res.destroyed) {
+        return;
+      }
+      if (res.headersSent) {
+        stream.sendEvent('error', { error: error, details: details });
+        return res.end();
+      }
+      res.status(status).json({ error: error, details: details });
+    }
+  };
+
+  const served = await streamFromService({ question: question, token_budget: token_budget, ...product }, stream, res);
+  if (!served) {
+    streamFromPython([
+      '3_query_rag.py',
+      '--question', question,
+      '--stream',
+      ...(product_url ? ['--product-url', product_url] : ['--product', 'latest']),
+      ...(token_budget ? ['--token-budget', String(token_budget)] : [])
+    ], stream, res);
+  }
+});
+
+// Sorgu servisinin /query/stream SSE akışını istemciye iletir; servis çalışmıyorsa false döner
+function streamFromService(body, stream, clientRes) {
+  return new Promise((resolve) => {
+    const data = JSON.stringify(body);
+    const req = http.request(`${QUERY_SERVICE_URL}/query/stream`, {
+      method: 'POST',
+      headers: { 'Content-Type': 'application/json', 'Content-Length': Buffer.byteLength(data) },
+      timeout: QUERY_TIMEOUT_MS
+    }, (response) => {
+      let raw = '';
+      response.setEncoding('utf8');
+      response.on('data', (chunk) => {
+        raw += chunk;
+        if (response.statusCode !== 200) {
+          return;
+        }
+        // SSE olayları boş satırla ayrılır; yarım kalan olay bir sonraki parçayı bekler
+        const events = raw.split('\n\n');
+        raw = events.pop();
+        for (const block of events) {
+          const event = /^event: (.*)$/m.exec(block);
+          const payload = /^data: (.*)$/m.exec(block);
+          if (event && payload) {
+            stream.sendEvent(event[1], JSON.parse(payload[1]));
+          }
+        }
+      });
+      response.on('end', () => {
+        if (response.statusCode === 200) {
+          stream.end();
+          return resolve(true);
+        }
+        let payload = {};
+        try {
+          payload = JSON.parse(raw);
+        } catch (error) {
+          payload = { error: 'Sorgu servisinden geçersiz yanıt', details: raw };
+        }
+        stream.fail(response.statusCode === 404 ? 404 : 500, payload.error, payload.details);
+        resolve(true);
+      });
+    });
+
+    req.on('timeout', () => req.destroy(new Error('Sorgu servisi zaman aşımı')));
+    req.on('error', (error) => {
+      if (error.code === 'ECONNREFUSED') {
+        return resolve(false);
+      }
+      stream.fail(500, 'Sorgu servisi hatası', error.message);
+      resolve(true);
+    });
+
+    // İstemci bağlantıyı kapatırsa servis isteği de kapatılır (Gemini akışı durur)
+    clientRes.on('close', () => req.destroy());
+
+    req.write(data);
+    req.end();
   });
+}
 
-  let output = '';
+// 3_query_rag.py --stream çıktısındaki NDJSON satırlarını SSE olayları olarak iletir
+function streamFromPython(args, stream, clientRes) {
+  const py = spawn('python', args, {
+    cwd: path.join(__dirname, 'ai_core'),
+    timeout: QUERY_TIMEOUT_MS
+  });
+  let pending = '';
   let errorOutput = '';
 
-  // Python script çıktısını yakala
   py.stdout.on('data', (data) => {
-    output += data.toString();
+    pending += data.toString();
+    const lines = pending.split('\n');
+    pending = lines.pop();
+    for (const line of lines) {
+      let message;
+      try {
+        message = JSON.parse(line);
+      } catch (error) {
+        // NDJSON olmayan bilgi satırları (ör. yükleme mesajları) atlanır
+        continue;
+      }
+      const { type, ...payload } = message;
+      stream.sendEvent(type, payload);
+    }
   });
 
-  // Python script hatalarını yakala
   py.stderr.on('data', (data) => {
     errorOutput += data.toString();
   });
 
-  // Python script tamamlandığında
+  py.on('error', (error) => {
+    stream.fail(500, 'Python script hatası', error.message);
+  });
+
   py.on('close', (code) => {
-    if (code !== 0) {
-      return res.status(500).json({ error: 'Python script hatası', details: errorOutput });
+    if (code === 0) {
+      return stream.end();
     }
-    res.json({ answer: output.trim() });
+    if (code === NOT_INDEXED_CODE) {
+      return stream.fail(404, 'Ürün henüz indekslenmemiş, önce yorumları çekin.', '');
+    }
+    stream.fail(500, 'Python script hatası', errorOutput);
+  });
+
+  clientRes.on('close', () => py.kill());
+}
+
+// Python scriptini çalıştırıp bitince {code, output, errorOutput} döndürür
+function runPython(args, timeout) {
+  return new Promise((resolve) => {
+    const py = spawn('python', args, {
+      cwd: path.join(__dirname, 'ai_core'),
+      timeout: timeout
+    });
+
+    let output = '';
+    let errorOutput = '';
+
+    py.stdout.on('data', (data) => {
+      output += data.toString();
+    });
+
+    py.stderr.on('data', (data) => {
+      errorOutput += data.toString();
+    });
+
+    // Script başlatılamazsa (ör. python bulunamadı) hata olarak döndür
+    py.on('error', (error) => {
+      resolve({ code: -1, output: output, errorOutput: error.message });
+    });
+
+    py.on('close', (code) => {
+      resolve({ code: code, output: output, errorOutput: errorOutput });
+    });
   });
+}
+
+// Soruyu sorgu servisine gönderir; {status, body} döner, servis çalışmıyorsa null
+// route: '/query' (varsayılan), '/query/batch' veya '/fetch'
+function queryService(body, timeout, route = '/query') {
+  return new Promise((resolve) => {
+    const data = JSON.stringify(body);
+    const req = http.request(`${QUERY_SERVICE_URL}${route}`, {
+      method: 'POST',
+      headers: { 'Content-Type': 'application/json', 'Content-Length': Buffer.byteLength(data) },
+      timeout: timeout
+    }, (response) => {
+      let raw = '';
+      response.setEncoding('utf8');
+      response.on('data', (chunk) => {
+        raw += chunk;
+      });
+      response.on('end', () => {
+        let payload = {};
+        try {
+          payload = JSON.parse(raw);
+        } catch (error) {
+          payload = { error: 'Sorgu servisinden geçersiz yanıt', details: raw };
+        }
+        resolve({ status: response.statusCode, body: payload });
+      });
+    });
+
+    req.on('timeout', () => req.destroy(new Error('Sorgu servisi zaman aşımı')));
+    req.on('error', (error) => {
+      // Servis başlamadıysa (veya henüz modeli yüklüyorsa) bağlantı reddedilir
+      if (error.code === 'ECONNREFUSED') {
+        return resolve(null);
+      }
+      resolve({ status: 500, body: { error: 'Sorgu servisi hatası', details: error.message } });
+    });
+
+    req.write(data);
+    req.end();
+  });
+}
+
+// Yorumları çeker: önce sorgu servisinin /fetch ucu (Chrome havuzu istekler arasında açık kalır),
+// servis yoksa veya çekiciyi yükleyemediyse (503) 1_fetch_reviews.py
+// runPython ile aynı biçimde {code, output, errorOutput} döndürür
+async function runFetch(productUrl, maxPages, maxReviews, timeout) {
+  const result = await queryService({
+    product_url: productUrl, max_pages: maxPages, max_reviews: maxReviews
+  }, timeout, '/fetch');
+
+  if (result === null || result.status === 503) {
+    return runPython([
+      '1_fetch_reviews.py',
+      '--url', productUrl,
+      '--max-pages', String(maxPages),
+      '--max-reviews', String(maxReviews)
+    ], timeout);
+  }
+  if (result.status === 200) {
+    const output = `Bu çekimde ${result.body.written} benzersiz yorum yazıldı (ürün: ${result.body.product}).`;
+    console.log(`Sorgu servisi yorumları çekti (${JSON.stringify(result.body.timings)})`);
+    return { code: 0, output: output, errorOutput: '' };
+  }
+  return { code: 1, output: '', errorOutput: result.body.details || result.body.error || '' };
+}
+
+// Soruyu yanıtlar: önce sorgu servisi, servis yoksa 3_query_rag.py
+// runPython ile aynı biçimde {code, output, errorOutput} döndürür; tokenBudget prompt'a giren yorumları sınırlar
+async function runQuery(question, productUrl, timeout, tokenBudget) {
+  const product = productUrl ? { product_url: productUrl } : { product: 'latest' };
+  const result = await queryService({ question: question, token_budget: tokenBudget, ...product }, timeout);
+
+  if (result === null) {
+    return runPython([
+      '3_query_rag.py',
+      '--question', question,
+      ...(productUrl ? ['--product-url', productUrl] : ['--product', 'latest']),
+      ...(tokenBudget ? ['--token-budget', String(tokenBudget)] : [])
+    ], timeout);
+  }
+  if (result.status === 200) {
+    console.log(`Sorgu servisi yanıtladı (${JSON.stringify(result.body.timings)})`);
+    return { code: 0, output: result.body.answer, errorOutput: '', context: result.body.context };
+  }
+  if (result.status === 404) {
+    return { code: NOT_INDEXED_CODE, output: '', errorOutput: result.body.error };
+  }
+  return { code: 1, output: '', errorOutput: result.body.details || result.body.error || '' };
+}
+
+// Toplu analiz endpoint'i - aynı ürün için birden fazla soruyu tek istekte yanıtlar
+// Sorular tek batch'te vektörleştirilir, Gemini çağrıları paralel yapılır (LLM_CONCURRENCY / concurrency)
+// Yanıt: {product, timings, results: [{question, answer, context, timings}]}
+app.post('/analyze-batch', async (req, res) => {
+  const { questions, product_url, token_budget, concurrency } = req.body;
+
+  if (!Array.isArray(questions) || questions.length === 0) {
+    return res.status(400).json({ error: 'questions (soru listesi) zorunludur.' });
+  }
+
+  console.log(`${questions.length} soru toplu analiz ediliyor`);
+  const product = product_url ? { product_url: product_url } : { product: 'latest' };
+  const result = await queryService({
+    questions: questions, token_budget: token_budget, concurrency: concurrency, ...product
+  }, QUERY_TIMEOUT_MS, '/query/batch');
+
+  if (result !== null) {
+    if (result.status === 200) {
+      console.log(`Toplu sorgu yanıtlandı (${JSON.stringify(result.body.timings)})`);
+    }
+    return res.status(result.status).json(result.body);
+  }
+
+  // Sorgu servisi yoksa 3_query_rag.py toplu modda çalıştırılır (sonuç son satırda JSON)
+  const pyResult = await runPython([
+    '3_query_rag.py',
+    ...questions.flatMap((question) => ['--question', String(question)]),
+    ...(product_url ? ['--product-url', product_url] : ['--product', 'latest']),
+    ...(token_budget ? ['--token-budget', String(token_budget)] : []),
+    ...(concurrency ? ['--concurrency', String(concurrency)] : [])
+  ], QUERY_TIMEOUT_MS);
+
+  if (pyResult.code === NOT_INDEXED_CODE) {
+    return res.status(404).json({ error: 'Ürün henüz indekslenmemiş, önce yorumları çekin.' });
+  }
+  if (pyResult.code !== 0) {
+    return res.status(500).json({ error: 'Python script hatası', details: pyResult.errorOutput });
+  }
+  const lines = pyResult.output.trim().split('\n');
+  try {
+    // Tek soru gönderildiyse script düz metin yazar
+    res.json(questions.length > 1 ? JSON.parse(lines[lines.length - 1])
+      : { results: [{ question: questions[0], answer: pyResult.output.trim() }] });
+  } catch (error) {
+    res.status(500).json({ error: 'Toplu yanıt okunamadı', details: pyResult.output });
+  }
 });
 
 // Yorumları çek ve analiz et endpoint'i - Tek seferde hem yorum çeker hem analiz eder
+// Ürün daha önce indekslendiyse doğrudan depodaki index'ten yanıtlanır
 app.post('/fetch-and-analyze', async (req, res) => {
-  const { question, product_url } = req.body;
+  const { question, product_url, refresh } = req.body;
   
   // Gerekli parametreleri kontrol et
   if (!question || !product_url) {
     return res.status(400).json({ error: 'question ve product_url zorunludur.' });
   }
 
+  // Önce depodaki index ile yanıtlamayı dene (refresh istenmediyse)
+  if (!refresh) {
+    const cached = await runQuery(question, product_url, QUERY_TIMEOUT_MS);
+    if (cached.code === 0) {
+      console.log(`Ürün depoda bulundu, yeniden çekilmeden yanıtlandı: ${product_url}`);
+      return res.json({ answer: cached.output.trim(), cached: true });
+    }
+    if (cached.code !== NOT_INDEXED_CODE) {
+      return res.status(500).json({ error: 'Soru analiz edilemedi', details: cached.errorOutput });
+    }
+  }
+
   console.log(`Yorumlar çekiliyor ve analiz ediliyor: ${product_url}`);
 
   // İlk adım: Yorumları çek
-  // Selenium ile web scraping yaparak ürün yorumlarını toplar
-  const fetchPy = spawn('python', [
-    '1_fetch_reviews.py',
-    '--url', product_url,
-    '--max-pages', '2', // Maksimum 2 sayfa
-    '--max-reviews', '100' // Maksimum 100 yorum
-  ], {
-    cwd: path.join(__dirname, 'ai_core'),
-    timeout: 300000 // 5 dakika timeout
-  });
-
-  let fetchOutput = '';
-  let fetchError = '';
-
-  // Yorum çekme script çıktısını yakala
-  fetchPy.stdout.on('data', (data) => {
-    fetchOutput += data.toString();
-  });
-
-  // Yorum çekme script hatalarını yakala
-  fetchPy.stderr.on('data', (data) => {
-    fetchError += data.toString();
-  });
+  // API veya Selenium ile ürün yorumlarını toplar, ürünün depo dizinine yazar
+  const fetchResult = await runFetch(product_url, 2, 100, 300000); // 2 sayfa, 100 yorum, 5 dakika timeout
 
-  // Yorum çekme script tamamlandığında
-  fetchPy.on('close', (fetchCode) => {
-    if (fetchCode !== 0) {
-      return res.status(500).json({ 
-        error: 'Yorumlar çekilemedi', 
-        details: fetchError 
-      });
-    }
-
-    // İkinci adım: RAG index'ini güncelle
-    // Yorumları vektörleştirip arama indexi oluşturur
-    const ragPy = spawn('python', ['2_create_rag_index.py'], {
-      cwd: path.join(__dirname, 'ai_core'),
-      timeout: 120000 // 2 dakika timeout
+  if (fetchResult.code !== 0) {
+    return res.status(500).json({ 
+      error: 'Yorumlar çekilemedi', 
+      details: fetchResult.errorOutput 
     });
+  }
 
-    let ragOutput = '';
-    let ragError = '';
+  // İkinci adım: Ürünün RAG index'ini oluştur
+  // Yorumları vektörleştirip arama indexi oluşturur
+  const ragResult = await runPython(['2_create_rag_index.py', '--product-url', product_url], 120000);
 
-    // RAG script çıktısını yakala
-    ragPy.stdout.on('data', (data) => {
-      ragOutput += data.toString();
-    });
-
-    // RAG script hatalarını yakala
-    ragPy.stderr.on('data', (data) => {
-      ragError += data.toString();
+  if (ragResult.code !== 0) {
+    return res.status(500).json({ 
+      error: 'RAG index güncellenemedi', 
+      details: ragResult.errorOutput 
     });
+  }
 
-    // RAG script tamamlandığında
-    ragPy.on('close', (ragCode) => {
-      if (ragCode !== 0) {
-        return res.status(500).json({ 
-          error: 'RAG index güncellenemedi', 
-          details: ragError 
-        });
-      }
+  // Üçüncü adım: Soruyu analiz et
+  // Gemini AI ile yorumları analiz eder ve soruya yanıt verir
+  const queryResult = await runQuery(question, product_url, QUERY_TIMEOUT_MS);
 
-      // Üçüncü adım: Soruyu analiz et
-      // Gemini AI ile yorumları analiz eder ve soruya yanıt verir
-      const queryPy = spawn('python', [
-        '3_query_rag.py',
-        '--question', question
-      ], {
-        cwd: path.join(__dirname, 'ai_core'),
-        timeout: 120000 // 2 dakika timeout
-      });
+  if (queryResult.code !== 0) {
+    return res.status(500).json({ 
+      error: 'Soru analiz edilemedi', 
+      details: queryResult.errorOutput 
+    });
+  }
 
-      let queryOutput = '';
-      let queryError = '';
+  // Başarılı yanıt döndür
+  res.json({ 
+    answer: queryResult.output.trim(),
+    cached: false,
+    fetchOutput: fetchResult.output,
+    ragOutput: ragResult.output
+  });
+});
 
-      // Sorgulama script çıktısını yakala
-      queryPy.stdout.on('data', (data) => {
-        queryOutput += data.toString();
-      });
+// Sorgu servisini başlat - kapanırsa QUERY_SERVICE_RESTART_MS sonra yeniden başlatılır
+// Servis hazır olana kadar sorular 3_query_rag.py ile yanıtlanır
+function startQueryService() {
+  const service = spawn('python', ['query_service.py'], {
+    cwd: path.join(__dirname, 'ai_core'),
+    env: { ...process.env, QUERY_SERVICE_PORT: new URL(QUERY_SERVICE_URL).port || '80' }
+  });
+  let failed = false;
 
-      // Sorgulama script hatalarını yakala
-      queryPy.stderr.on('data', (data) => {
-        queryError += data.toString();
-      });
+  service.stdout.on('data', (data) => {
+    console.log('Sorgu servisi:', data.toString().trim());
+  });
 
-      // Sorgulama script tamamlandığında
-      queryPy.on('close', (queryCode) => {
-        if (queryCode !== 0) {
-          return res.status(500).json({ 
-            error: 'Soru analiz edilemedi', 
-            details: queryError 
-          });
-        }
+  service.stderr.on('data', (data) => {
+    console.error('Sorgu servisi hatası:', data.toString().trim());
+  });
 
-        // Başarılı yanıt döndür
-        res.json({ 
-          answer: queryOutput.trim(),
-          fetchOutput: fetchOutput,
-          ragOutput: ragOutput
-        });
-      });
-    });
+  // Python bulunamazsa yeniden denenmez
+  service.on('error', (error) => {
+    failed = true;
+    console.error('Sorgu servisi başlatılamadı:', error.message);
   });
 
-  // Hata yönetimi - Timeout ve diğer hatalar
-  fetchPy.on('error', (error) => {
-    if (error.code === 'ETIMEDOUT') {
-      return res.status(408).json({ 
-        error: 'Yorum çekme işlemi zaman aşımına uğradı', 
-        details: 'İşlem 2 dakikadan uzun sürdü'
-      });
+  service.on('close', (code) => {
+    if (failed) {
+      return;
     }
-    return res.status(500).json({ 
-      error: 'Yorum çekme hatası', 
-      details: error.message 
-    });
+    console.error(`Sorgu servisi kapandı (kod ${code}), ${QUERY_SERVICE_RESTART_MS / 1000} sn sonra yeniden başlatılacak`);
+    setTimeout(startQueryService, QUERY_SERVICE_RESTART_MS);
   });
-});
+}
 
 // Server'ı başlat
 app.listen(PORT, () => {
   console.log(`Server is running on port ${PORT}`);
+  if (!process.env.QUERY_SERVICE_URL) {
+    startQueryService();
+  }
 });
@@ -0,0 +1,226 @@
+#!/usr/bin/env python3
+"""
+Akilli Yorum Asistani - RAG Index Birim Testleri
+Index planı, parça deposu, MMR bağlam seçimi ve puan istatistikleri için pytest testleri
+Çalıştırma: python -m pytest -q backend/test_rag_index.py
+Hackathon Projesi - AI Destekli Yorum Analizi
+"""
+
+import importlib
+import os
+import sys
+
+import faiss
+import numpy as np
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), 'ai_core'))
+
+import ann_index
+from ann_index import factory_string, plan_index
+from chunk_store import NO_DATE, ChunkStore, ChunkStoreWriter, chunk_id, date_to_days
+from context_builder import mmr_select
+
+
+# --- ann_index ---
+
+def test_plan_index_tiers():
+    flat = plan_index(ann_index.FLAT_MAX_CHUNKS, metric='l2', storage='float32')
+    assert flat['type'] == 'flat' and flat['search_params'] == {}
+
+    hnsw = plan_index(ann_index.FLAT_MAX_CHUNKS + 1, metric='l2', storage='float32')
+    assert hnsw['type'] == 'hnsw'
+    assert hnsw['search_params'] == {'efSearch': ann_index.HNSW_EF_SEARCH}
+
+    ivf = plan_index(ann_index.HNSW_MAX_CHUNKS + 1, metric='cosine', storage='fp16')
+    nlist = ann_index.ivf_nlist(ann_index.HNSW_MAX_CHUNKS + 1)
+    assert ivf['type'] == 'ivf_pq' and ivf['nlist'] == nlist
+    assert ivf['metric'] == 'cosine' and ivf['storage'] == 'fp16'
+    assert ivf['train_size'] == min(ann_index.MAX_TRAIN_SAMPLE, nlist * ann_index.TRAIN_POINTS_PER_LIST)
+    assert ivf['search_params'] == {'nprobe': max(ann_index.MIN_NPROBE, nlist // ann_index.NPROBE_DIVISOR),
+                                    'k_factor_rf': ann_index.REFINE_K_FACTOR}
+
+
+def test_plan_index_int8_needs_training():
+    assert plan_index(10, storage='int8')['train_size'] == ann_index.SQ_TRAIN_SAMPLE
+    assert plan_index(10, storage='float32')['train_size'] == 0
+
+
+def test_plan_index_rejects_unknown_settings():
+    with pytest.raises(ValueError):
+        plan_index(10, metric='hamming')
+    with pytest.raises(ValueError):
+        plan_index(10, storage='fp8')
+
+
+def test_ivf_nlist_power_of_two():
+    assert ann_index.ivf_nlist(1_000_000) == 4096
+    assert ann_index.ivf_nlist(0) == 1
+
+
+@pytest.mark.parametrize('plan, expected', [
+    ({'type': 'flat', 'storage': 'float32'}, 'IDMap,Flat'),
+    ({'type': 'flat', 'storage': 'fp16'}, 'IDMap,SQfp16'),
+    ({'type': 'hnsw', 'storage': 'float32'}, f'IDMap,HNSW{ann_index.HNSW_NEIGHBORS}'),
+    ({'type': 'hnsw', 'storage': 'int8'}, f'IDMap,HNSW{ann_index.HNSW_NEIGHBORS},SQ8'),
+    ({'type': 'ivf_pq', 'nlist': 4096, 'storage': 'float32'}, 'IDMap,IVF4096,PQ48x8np,RFlat'),
+    ({'type': 'ivf_pq', 'nlist': 4096, 'storage': 'fp16'}, 'IDMap,IVF4096,PQ48x8np,Refine(SQfp16)'),
+])
+def test_factory_string(plan, expected):
+    assert factory_string(plan, 384) == expected
+
+
+def test_factory_string_pq_falls_back_to_full_dim():
+    assert factory_string({'type': 'ivf_pq', 'nlist': 16, 'storage': 'float32'}, 100) == 'IDMap,IVF16,PQ100x8np,RFlat'
+
+
+@pytest.mark.parametrize('storage', ['float32', 'fp16', 'int8'])
+def test_factory_string_is_accepted_by_faiss(storage):
+    index = faiss.index_factory(16, factory_string({'type': 'ivf_pq', 'nlist': 4, 'storage': storage}, 16))
+    assert index.d == 16
+
+
+# --- chunk_store ---
+
+def write_store(path, rows):
+    with ChunkStoreWriter(str(path)) as writer:
+        for text, review_id, rate, date, cid in rows:
+            writer.add(text, review_id=review_id, rate=rate, date=date, chunk_id=cid)
+
+
+ROWS = [
+    ('Kargo çok hızlıydı', 1, 5, '2024-01-15', chunk_id(1, 0)),
+    ('ama kutu ezikti', 1, 5, '2024-01-15', chunk_id(1, 1)),
+    ('Puansız yorum', 2, None, '15 Ocak 2024', chunk_id(2, 0)),
+    ('Tarihsiz yorum', None, 3, None, chunk_id(5, 0)),
+]
+
+
+def test_chunk_store_round_trip(tmp_path):
+    path = tmp_path / 'chunks.bin'
+    write_store(path, ROWS)
+    assert not os.path.exists(f'{path}.tmp')
+
+    with ChunkStore(str(path)) as store:
+        assert len(store) == len(ROWS)
+        assert list(store) == [row[0] for row in ROWS]
+        assert store[-1] == 'Tarihsiz yorum'
+        assert store[1:3] == ['ama kutu ezikti', 'Puansız yorum']
+        assert store.chunk_ids.tolist() == [row[4] for row in ROWS]
+        assert store.meta(0) == {'review_id': 1, 'rate': 5.0, 'date': '2024-01-15'}
+        assert store.meta(2) == {'review_id': 2, 'rate': None, 'date': '2024-01-15'}
+        assert store.meta(3) == {'review_id': None, 'rate': 3.0, 'date': None}
+        with pytest.raises(IndexError):
+            store.text(len(ROWS))
+
+
+def test_chunk_store_positions(tmp_path):
+    path = tmp_path / 'chunks.bin'
+    write_store(path, ROWS)
+    with ChunkStore(str(path)) as store:
+        ids = [chunk_id(5, 0), chunk_id(1, 1), -1, chunk_id(3, 0), chunk_id(9, 0)]
+        assert store.positions(ids).tolist() == [3, 1, -1, -1, -1]
+        assert store.get_many(ids) == ['Tarihsiz yorum', 'ama kutu ezikti']
+
+
+def test_chunk_store_positions_empty(tmp_path):
+    path = tmp_path / 'chunks.bin'
+    write_store(path, [])
+    with ChunkStore(str(path)) as store:
+        assert store.positions([0, 1]).tolist() == [-1, -1]
+
+
+def test_chunk_store_requires_increasing_ids(tmp_path):
+    path = tmp_path / 'chunks.bin'
+    write_store(path, ROWS[:1])
+    writer = ChunkStoreWriter(str(path))
+    writer.add('b', chunk_id=chunk_id(2, 0))
+    with pytest.raises(ValueError):
+        writer.add('a', chunk_id=chunk_id(1, 0))
+    with pytest.raises(ValueError):
+        writer.add('tekrar', chunk_id=chunk_id(2, 0))
+    writer.abort()
+    # İptal edilen yazım mevcut dosyaya dokunmaz
+    assert not os.path.exists(f'{path}.tmp')
+    with ChunkStore(str(path)) as store:
+        assert list(store) == ['Kargo çok hızlıydı']
+
+
+def test_chunk_store_finish_then_install(tmp_path):
+    path = tmp_path / 'chunks.bin'
+    write_store(path, ROWS[:1])
+    writer = ChunkStoreWriter(str(path))
+    writer.add('yeni parça')
+    writer.finish()
+    with ChunkStore(str(path)) as store:
+        assert list(store) == ['Kargo çok hızlıydı']
+    writer.install()
+    with ChunkStore(str(path)) as store:
+        assert list(store) == ['yeni parça']
+
+
+def test_date_to_days():
+    assert date_to_days('1970-01-02') == 1
+    assert date_to_days('2 Ocak 1970') == 1
+    assert date_to_days('31 Şubat 2024') == NO_DATE
+    assert date_to_days('dün') == NO_DATE
+
+
+# --- context_builder.mmr_select ---
+
+def unit(*rows):
+    vectors = np.asarray(rows, dtype=np.float32)
+    return vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+
+
+def test_mmr_select_drops_duplicates():
+    query = unit([1, 0, 0])[0]
+    vectors = unit([1, 0, 0], [1, 0, 0], [1, 1, 0])
+    selected, duplicates = mmr_select(query, vectors, np.array([1, 1, 1]), token_budget=10)
+    assert selected == [0, 2]
+    assert duplicates == 1
+
+
+def test_mmr_select_prefers_diverse_candidates():
+    query = unit([1, 0, 0])[0]
+    # 1. aday 0. adaya çok benzer ama tekrar eşiğinin altında; 2. aday daha az alakalı ama farklı
+    vectors = unit([1, 0, 0], [1, 0.4, 0], [1, 0, 1])
+    costs = np.array([1, 1, 1])
+    selected, _ = mmr_select(query, vectors, costs, token_budget=2, mmr_lambda=0.3)
+    assert selected == [0, 2]
+    selected, _ = mmr_select(query, vectors, costs, token_budget=2, mmr_lambda=1.0)
+    assert selected == [0, 1]
+
+
+def test_mmr_select_respects_token_budget():
+    query = unit([1, 0, 0])[0]
+    vectors = unit([1, 0, 0], [1, 0.5, 0], [0, 1, 0])
+    # En alakalı aday bütçeye sığmaz, daha kısa adaylar seçilir
+    selected, _ = mmr_select(query, vectors, np.array([5, 1, 1]), token_budget=2)
+    assert selected == [1, 2]
+    assert mmr_select(query, vectors, np.array([5, 5, 5]), token_budget=2) == ([], 0)
+
+
+# --- 3_query_rag.rating_stats ---
+
+def test_rating_stats():
+    # 3_query_rag Gemini istemcisini içe aktarır; requirements.txt kurulu değilse atlanır
+    pytest.importorskip('dotenv')
+    pytest.importorskip('google.generativeai')
+    query_rag = importlib.import_module('3_query_rag')
+
+    review_ids = [1, 1, 2, -1, -1, 3]
+    rates = [5, 5, 1, 3, np.nan, 9]
+    dates = [date_to_days(d) for d in ('2024-01-10', '2024-01-10', '2024-02-01', None, '2024-02-03', '2024-02-04')]
+    stats = query_rag.rating_stats(review_ids, rates, dates)
+
+    # Parçalara bölünmüş 1 numaralı yorum tek sayılır; id'siz parçalar ayrı yorumdur; 9 puan geçersizdir
+    assert stats['toplamDegerlendirme'] == 5
+    assert stats['ortalamaPuan'] == 3.0
+    assert (stats['pozitifYorumlar'], stats['nötrYorumlar'], stats['negatifYorumlar']) == (1, 1, 1)
+    assert stats['puansizYorumlar'] == 2
+    assert stats['puanDagilimi'] == {'1': 1, '2': 0, '3': 1, '4': 0, '5': 1}
+    assert stats['aylikTrend'] == [
+        {'donem': '2024-01', 'yorumSayisi': 1, 'ortalamaPuan': 5.0},
+        {'donem': '2024-02', 'yorumSayisi': 1, 'ortalamaPuan': 1.0},
+    ]
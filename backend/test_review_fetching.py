@@ -0,0 +1,180 @@
+#!/usr/bin/env python3
+"""
+Akilli Yorum Asistani - Yorum Çekme Birim Testleri
+Tekrar ayıklama, artımlı çekme cursor'ı ve hız kontrolü için pytest testleri
+Çalıştırma: python -m pytest -q backend/test_review_fetching.py
+Hackathon Projesi - AI Destekli Yorum Analizi
+"""
+
+import importlib
+import os
+import sys
+import time
+from email.utils import formatdate
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), 'ai_core'))
+
+import rate_control
+from crawl_scheduler import TokenBucket
+from rate_control import AdaptiveRateController, backoff_delay, parse_retry_after
+from review_dedup import ReviewDeduplicator, dedupe_reviews, normalize_review_text, review_key
+
+fetch_reviews = importlib.import_module('1_fetch_reviews')
+
+
+# --- review_dedup ---
+
+def test_normalize_review_text_turkish_case_and_whitespace():
+    assert normalize_review_text('  Çok   GÜZEL\nürün ') == 'çok güzel ürün'
+    # Türkçe büyük harf kuralları: I -> ı, İ -> i
+    assert normalize_review_text('IŞIK İYİ') == 'ışık iyi'
+
+
+def test_normalize_review_text_strips_emoji():
+    assert normalize_review_text('Harika 😍👍 ürün') == 'harika ürün'
+
+
+def test_normalize_review_text_keeps_emoji_only_reviews():
+    # Yalnızca emojiden oluşan yorumlar boş metinde birleşmemeli
+    assert normalize_review_text(' 😍😍 ') == '😍😍'
+    assert review_key('😍😍') != review_key('👎')
+
+
+def test_review_key_matches_normalized_variants():
+    key = review_key('Kargo HIZLIYDI 👍')
+    assert key == review_key('kargo   hızlıydı')
+    assert len(key) == 16
+    assert key != review_key('kargo yavaştı')
+
+
+def test_review_deduplicator():
+    dedup = ReviewDeduplicator([{'comment': 'İlk yorum'}])
+    assert 'ilk yorum' in dedup
+    assert dedup.add('Yeni yorum') is True
+    assert dedup.add('YENİ   yorum') is False
+    assert len(dedup) == 2
+
+
+def test_dedupe_reviews_keeps_first():
+    reviews = [{'comment': 'Güzel', 'user': 'a'}, {'comment': 'güzel ', 'user': 'b'}, {'comment': 'Kötü', 'user': 'c'}]
+    assert [review['user'] for review in dedupe_reviews(reviews)] == ['a', 'c']
+
+
+# --- artımlı çekme cursor'ı ---
+
+CURSOR = {'newest_id': 7, 'newest_date': '2024-05-01T10:00:00'}
+
+
+def test_cursor_newer_and_older_reviews():
+    assert fetch_reviews._is_newer_than_cursor({'id': 8, 'date': '2024-05-02T09:00:00'}, CURSOR)
+    assert not fetch_reviews._is_newer_than_cursor({'id': 6, 'date': '2024-04-30T09:00:00'}, CURSOR)
+
+
+def test_cursor_same_timestamp_review_is_kept():
+    # Cursor ile aynı zamanda yazılmış başka bir yorum kaçırılmamalı
+    assert fetch_reviews._is_newer_than_cursor({'id': 9, 'date': CURSOR['newest_date']}, CURSOR)
+    # Cursor yorumunun kendisi yeni sayılmaz
+    assert not fetch_reviews._is_newer_than_cursor({'id': 7, 'date': CURSOR['newest_date']}, CURSOR)
+
+
+def test_cursor_without_dates():
+    assert fetch_reviews._is_newer_than_cursor({'id': 1, 'date': ''}, CURSOR)
+    assert fetch_reviews._is_newer_than_cursor({'id': 1, 'date': '2020-01-01'}, {'newest_id': 7})
+
+
+def test_contains_cursor():
+    page = [{'id': 9, 'date': '2024-05-03'}, {'id': 7, 'date': CURSOR['newest_date']}]
+    assert fetch_reviews._contains_cursor(page, CURSOR)
+    assert not fetch_reviews._contains_cursor(page[:1], CURSOR)
+
+
+# --- rate_control ---
+
+def test_parse_retry_after_seconds():
+    assert parse_retry_after('5') == 5.0
+    assert parse_retry_after('1.5') == 1.5
+    assert parse_retry_after('-3') == 0.0
+
+
+def test_parse_retry_after_http_date():
+    assert parse_retry_after(formatdate(time.time() + 60, usegmt=True)) == pytest.approx(60, abs=2)
+    assert parse_retry_after(formatdate(time.time() - 60, usegmt=True)) == 0.0
+
+
+def test_parse_retry_after_invalid():
+    assert parse_retry_after(None) is None
+    assert parse_retry_after('') is None
+    assert parse_retry_after('yarın') is None
+
+
+def test_backoff_delay_uses_retry_after_capped():
+    assert backoff_delay(0, retry_after=2.0) == 2.0
+    assert backoff_delay(0, retry_after=rate_control.MAX_BACKOFF * 10) == rate_control.MAX_BACKOFF
+
+
+def test_backoff_delay_exponential_with_full_jitter(monkeypatch):
+    monkeypatch.setattr(rate_control.random, 'uniform', lambda low, high: high)
+    assert backoff_delay(0) == rate_control.BASE_BACKOFF
+    assert backoff_delay(3) == rate_control.BASE_BACKOFF * 8
+    assert backoff_delay(50) == rate_control.MAX_BACKOFF
+    monkeypatch.undo()
+    for attempt in range(6):
+        assert 0 <= backoff_delay(attempt) <= rate_control.BASE_BACKOFF * 2 ** attempt
+
+
+def test_adaptive_rate_controller_aimd():
+    controller = AdaptiveRateController(initial_rate=4.0, min_rate=1.0, max_rate=5.0,
+                                        increase=0.5, decrease=0.5, latency_target=1.0)
+    controller.on_success(0.2)
+    assert controller.snapshot() == 4.5
+    # Hedefin üstündeki gecikme hızı artırmaz
+    controller.on_success(2.0)
+    assert controller.snapshot() == 4.5
+    for _ in range(5):
+        controller.on_success(0.2)
+    assert controller.snapshot() == 5.0
+    controller.on_throttle()
+    assert controller.snapshot() == 2.5
+    for _ in range(5):
+        controller.on_throttle()
+    assert controller.snapshot() == 1.0
+
+
+def test_adaptive_rate_controller_spaces_requests(monkeypatch):
+    sleeps = []
+    monkeypatch.setattr(rate_control.time, 'sleep', sleeps.append)
+    controller = AdaptiveRateController(initial_rate=10.0)
+    controller.acquire()
+    controller.acquire()
+    assert len(sleeps) == 1 and sleeps[0] == pytest.approx(0.1, abs=0.02)
+
+
+def test_adaptive_rate_controller_honours_retry_after(monkeypatch):
+    sleeps = []
+    monkeypatch.setattr(rate_control.time, 'sleep', sleeps.append)
+    controller = AdaptiveRateController(initial_rate=10.0)
+    controller.on_throttle(retry_after=3.0)
+    controller.acquire()
+    assert sleeps and sleeps[0] == pytest.approx(3.0, abs=0.05)
+
+
+# --- crawl_scheduler.TokenBucket ---
+
+def test_token_bucket_burst_then_waits():
+    bucket = TokenBucket(rate=20.0, capacity=2)
+    start = time.monotonic()
+    bucket.acquire()
+    bucket.acquire()
+    assert time.monotonic() - start < 0.02
+    bucket.acquire()
+    assert time.monotonic() - start >= 0.04
+
+
+def test_token_bucket_refills_up_to_capacity():
+    bucket = TokenBucket(rate=1000.0, capacity=3)
+    bucket.acquire(3)
+    time.sleep(0.05)
+    bucket.acquire()
+    assert bucket._tokens <= bucket.capacity - 1